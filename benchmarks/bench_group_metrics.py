@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error, mean_squared_error
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from data_ingestion import ingest  # noqa: E402
+from model_evaluation import BREAKDOWNS, _add_error_columns, _group_metrics, _safe_mape  # noqa: E402
+
+
+def legacy_group_metrics(df: pd.DataFrame, group_cols: list[str]) -> pd.DataFrame:
+    grouped = df.groupby(group_cols, dropna=False, observed=True)
+    out = grouped.apply(
+        lambda g: pd.Series(
+            {
+                "mae": mean_absolute_error(g["y_true"], g["y_pred"]),
+                "rmse": float(np.sqrt(mean_squared_error(g["y_true"], g["y_pred"]))),
+                "mape": _safe_mape(g["y_true"], g["y_pred"]),
+                "count": len(g),
+            }
+        )
+    )
+    return out.reset_index()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Compare legacy and vectorized group metrics.")
+    parser.add_argument("--data", default=str(Path("data") / "retail_store_inventory.csv"))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    df = ingest(args.data)
+    rng = np.random.default_rng(0)
+    df["y_true"] = df["Units Sold"].astype(np.float64)
+    df["y_pred"] = df["y_true"] + rng.normal(0, 10, len(df))
+
+    def run_legacy():
+        return {name: legacy_group_metrics(df, cols) for name, cols in BREAKDOWNS.items()}
+
+    def run_vectorized():
+        errors = _add_error_columns(df)
+        return {name: _group_metrics(errors, cols) for name, cols in BREAKDOWNS.items()}
+
+    timings = {}
+    for label, fn in [("legacy", run_legacy), ("vectorized", run_vectorized)]:
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = fn()
+            best = min(best, time.perf_counter() - start)
+        timings[label] = (best, result)
+
+    for name in BREAKDOWNS:
+        pd.testing.assert_frame_equal(
+            timings["legacy"][1][name],
+            timings["vectorized"][1][name],
+            check_exact=False,
+            rtol=1e-12,
+        )
+
+    print(f"rows: {len(df)}")
+    for label, (best, _) in timings.items():
+        print(f"{label:>10}: {best * 1000:.1f} ms (best of {args.repeat})")
+    print(f"speedup: {timings['legacy'][0] / timings['vectorized'][0]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+PAYLOAD = {
+    "Store_ID": "S001",
+    "Product_ID": "P001",
+    "Category": "Electronics",
+    "Region": "North",
+    "Inventory_Level": 120,
+    "Units_Ordered": 80,
+    "Demand_Forecast": 140.5,
+    "Price": 49.99,
+    "Discount": 10,
+    "Weather_Condition": "Sunny",
+    "Holiday_Promotion": 0,
+    "Competitor_Pricing": 52.0,
+    "Seasonality": "Summer",
+    "day_of_week": 2,
+    "month": 7,
+    "day": 15,
+    "is_weekend": 0,
+}
+
+
+def _run(backend: str, model_path: str, requests: int, log_calls: int) -> dict:
+    # Loggers are configured at import, so each backend needs a fresh process.
+    workdir = tempfile.mkdtemp()
+    os.chdir(workdir)  # keep the benchmark's logs out of logs/
+    os.environ.update(
+        LOG_BACKEND=backend,
+        LOG_REQUESTS="1",
+        LOG_RATE_LIMIT="0",  # log every record on both backends
+        LOG_DIR=str(Path(workdir) / "logs"),
+        MICROBATCH="0",
+        PREDICTION_CACHE_SIZE="0",
+    )
+    # Both backends also echo to stderr; discard it (before the handlers are
+    # created) so the terminal does not dominate the timings.
+    sys.stderr = open(os.devnull, "w")
+    sys.path.insert(0, str(SRC))
+    import logging
+
+    from fastapi.testclient import TestClient
+
+    import app
+    import logger as logger_module
+    from logger import flush_logs, get_logger
+    from model_registry import get_registry
+
+    get_registry().path = Path(model_path)
+    client = TestClient(app.app)
+
+    for i in range(20):
+        client.post("/predict", json=dict(PAYLOAD, Price=10.0 + i))
+    samples = []
+    for i in range(requests):
+        payload = dict(PAYLOAD, Price=10.0 + i * 0.01)
+        start = time.perf_counter()
+        client.post("/predict", json=payload)
+        samples.append((time.perf_counter() - start) * 1000)
+
+    log = get_logger("bench.logging")
+    start = time.perf_counter()
+    for i in range(log_calls):
+        log.info("scored %d rows in %.2f ms", i, 1.5, extra={"duration_ms": 1.5})
+    call_us = (time.perf_counter() - start) / log_calls * 1e6
+    flush_logs()
+    logging.shutdown()
+
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {
+        "backend": backend,
+        "p50_ms": p50,
+        "p95_ms": p95,
+        "p99_ms": p99,
+        "log_call_us": call_us,
+        "dropped": logger_module._DroppingQueueHandler.dropped,
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare /predict latency with the synchronous and queued log backends."
+    )
+    parser.add_argument("--model", default=str(Path("artifacts") / "models" / "best_model.pkl"))
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--log-calls", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    model_path = str(Path(args.model).resolve())
+    context = multiprocessing.get_context("spawn")
+    for backend in ("sync", "queued"):
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            result = pool.submit(_run, backend, model_path, args.requests, args.log_calls).result()
+        print(
+            f"{result['backend']:>7}: /predict p50 {result['p50_ms']:.2f} ms, "
+            f"p95 {result['p95_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms; "
+            f"logger.info {result['log_call_us']:.1f} us/call "
+            f"({result['dropped']} records dropped on a full queue)"
+        )
+
+
+if __name__ == "__main__":
+    main()
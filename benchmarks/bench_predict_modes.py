@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import argparse
+import pickle
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from compiled_predictor import CompiledPredictor, _predict_kernel  # noqa: E402
+from data_ingestion import ingest  # noqa: E402
+from data_transformation import transform  # noqa: E402
+from feature_schema import FEATURE_COLUMNS  # noqa: E402
+
+
+def _latency_ms(fn, X: pd.DataFrame, repeat: int) -> dict:
+    fn(X)  # warm up (numba compilation, caches)
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(X)
+        samples.append((time.perf_counter() - start) * 1000)
+    p50, p95 = np.percentile(samples, [50, 95])
+    return {"p50_ms": p50, "p95_ms": p95}
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Compare sklearn and compiled predict latency.")
+    parser.add_argument("--model", default=str(Path("artifacts") / "models" / "best_model.pkl"))
+    parser.add_argument("--data", default=str(Path("data") / "retail_store_inventory.csv"))
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 100, 10000])
+    args = parser.parse_args(argv)
+
+    with Path(args.model).open("rb") as f:
+        model = pickle.load(f)
+    df = transform(ingest(args.data))[FEATURE_COLUMNS]
+
+    predictors = {"sklearn": model.predict}
+    predictors["compiled-numpy"] = CompiledPredictor.from_pipeline(model, use_numba=False).predict
+    if _predict_kernel is not None:
+        predictors["compiled-numba"] = CompiledPredictor.from_pipeline(model).predict
+
+    reference = model.predict(df.head(1000))
+    for name, fn in predictors.items():
+        max_diff = float(np.max(np.abs(fn(df.head(1000)) - reference)))
+        print(f"{name:>15} parity max |diff| = {max_diff:.3g}")
+
+    for batch in args.batch_sizes:
+        X = df.head(batch)
+        repeat = max(3, args.repeat // max(1, batch // 100))
+        for name, fn in predictors.items():
+            stats = _latency_ms(fn, X, repeat)
+            print(
+                f"rows={batch:>6} {name:>15}: p50 {stats['p50_ms']:.2f} ms, "
+                f"p95 {stats['p95_ms']:.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
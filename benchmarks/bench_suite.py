@@ -0,0 +1,326 @@
+from __future__ import annotations
+
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+SUITES = ("pipeline", "model_load", "asgi", "uvicorn")
+PAYLOAD = {
+    "Store_ID": "S001",
+    "Product_ID": "P001",
+    "Category": "Electronics",
+    "Region": "North",
+    "Inventory_Level": 120,
+    "Units_Ordered": 80,
+    "Demand_Forecast": 140.5,
+    "Price": 49.99,
+    "Discount": 10,
+    "Weather_Condition": "Sunny",
+    "Holiday_Promotion": 0,
+    "Competitor_Pricing": 52.0,
+    "Seasonality": "Summer",
+    "day_of_week": 2,
+    "month": 7,
+    "day": 15,
+    "is_weekend": 0,
+}
+
+
+def _payload(i: int) -> dict:
+    # Distinct prices so the prediction cache never answers for the model.
+    return dict(PAYLOAD, Price=round(10.0 + i * 0.01, 2))
+
+
+def _percentiles(prefix: str, samples_ms: list[float]) -> dict[str, float]:
+    p50, p95, p99 = np.percentile(samples_ms, [50, 95, 99])
+    return {f"{prefix}.p50_ms": p50, f"{prefix}.p95_ms": p95, f"{prefix}.p99_ms": p99}
+
+
+def _serving_dir(model_path: str) -> Path:
+    """A scratch working directory holding a copy of the model at its default path."""
+    workdir = Path(tempfile.mkdtemp(prefix="bench-"))
+    target = workdir / "artifacts" / "models" / "best_model.pkl"
+    target.parent.mkdir(parents=True)
+    shutil.copy2(model_path, target)
+    return workdir
+
+
+def _latency_samples(post, requests: int, batch_rows: int) -> dict[str, float]:
+    """Time single and batch /predict and /explain calls through ``post(path, json)``."""
+    for i in range(5):
+        post("/predict", _payload(i))
+        post("/explain", _payload(i))
+
+    metrics: dict[str, float] = {}
+    plans = {
+        "predict": lambda i: ("/predict", _payload(1000 + i)),
+        f"predict_batch{batch_rows}": lambda i: (
+            "/predict/batch",
+            {"rows": [_payload(100_000 + i * batch_rows + j) for j in range(batch_rows)]},
+        ),
+        "explain": lambda i: ("/explain", _payload(200_000 + i)),
+    }
+    for name, plan in plans.items():
+        samples = []
+        for i in range(requests):
+            path, body = plan(i)
+            start = time.perf_counter()
+            status = post(path, body)
+            samples.append((time.perf_counter() - start) * 1000)
+            if status != 200:
+                raise RuntimeError(f"{path} returned {status}")
+        metrics.update(_percentiles(name, samples))
+    return metrics
+
+
+def _run_pipeline(data_path: str, rows: int, n_estimators: int) -> dict[str, float]:
+    # Runs in a fresh process so peak RSS belongs to this size alone.
+    sys.path.insert(0, str(SRC))
+    import pandas as pd
+
+    import model_trainer
+    from data_ingestion import ingest
+    from data_transformation import transform
+    from resource_usage import peak_rss_mb
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench-"))
+    os.chdir(workdir)  # keep the benchmark model out of artifacts/
+    source = pd.read_csv(data_path)
+    sample = source.iloc[np.resize(np.arange(len(source)), rows)]
+    csv_path = workdir / "data.csv"
+    sample.to_csv(csv_path, index=False)
+
+    model_trainer.mlflow = None
+    start = time.perf_counter()
+    df = ingest(csv_path)
+    ingest_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    df = transform(df)
+    transform_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    model_trainer.train_model(df, n_estimators=n_estimators)
+    train_seconds = time.perf_counter() - start
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    prefix = f"pipeline.rows={rows}"
+    return {
+        f"{prefix}.ingest_seconds": ingest_seconds,
+        f"{prefix}.transform_seconds": transform_seconds,
+        f"{prefix}.train_seconds": train_seconds,
+        f"{prefix}.peak_rss_mb": peak_rss_mb() or 0.0,
+    }
+
+
+def _run_model_load(model_path: str, repeat: int) -> dict[str, float]:
+    sys.path.insert(0, str(SRC))
+    from model_registry import ModelRegistry
+
+    # The first load also pays for importing sklearn and friends.
+    seconds = [ModelRegistry(path=Path(model_path)).get().load_seconds for _ in range(repeat)]
+    return {
+        "model_load.first_seconds": seconds[0],
+        "model_load.seconds": float(np.median(seconds[1:])),
+    }
+
+
+def _run_asgi(model_path: str, requests: int, batch_rows: int) -> dict[str, float]:
+    os.chdir(_serving_dir(model_path))
+    sys.path.insert(0, str(SRC))
+    from fastapi.testclient import TestClient
+
+    import app
+
+    client = TestClient(app.app)
+
+    def post(path: str, body) -> int:
+        return client.post(path, json=body).status_code
+
+    metrics = _latency_samples(post, requests, batch_rows)
+    return {f"api.asgi.{name}": value for name, value in metrics.items()}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _run_uvicorn(
+    model_path: str, requests: int, batch_rows: int, timeout: float = 60.0
+) -> dict[str, float]:
+    import httpx
+
+    workdir = _serving_dir(model_path)
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app:app",
+            "--app-dir", str(SRC), "--port", str(port), "--log-level", "warning",
+        ],
+        cwd=workdir,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(base_url=url, timeout=timeout) as client:
+            while True:
+                try:
+                    if client.get("/health").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if server.poll() is not None or time.perf_counter() - start > timeout:
+                    raise RuntimeError("uvicorn did not become healthy")
+                time.sleep(0.02)
+            ready_seconds = time.perf_counter() - start
+            # The first prediction pays for model load and lazy initialisation.
+            first = time.perf_counter()
+            client.post("/predict", json=_payload(0)).raise_for_status()
+            first_predict_ms = (time.perf_counter() - first) * 1000
+
+            def post(path: str, body) -> int:
+                return client.post(path, json=body).status_code
+
+            metrics = _latency_samples(post, requests, batch_rows)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    result = {f"api.uvicorn.{name}": value for name, value in metrics.items()}
+    result["cold_start.ready_seconds"] = ready_seconds
+    result["cold_start.first_predict_ms"] = first_predict_ms
+    return result
+
+
+def _in_fresh_process(fn, *args) -> dict[str, float]:
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(fn, *args).result()
+
+
+def compare(
+    metrics: dict[str, float], baseline: dict[str, float], threshold: float
+) -> list[dict]:
+    """Metrics that are more than ``threshold`` (relative) above the baseline."""
+    regressions = []
+    for name, value in sorted(metrics.items()):
+        reference = baseline.get(name)
+        if reference is None or reference <= 0:
+            continue
+        change = value / reference - 1
+        if change > threshold:
+            regressions.append(
+                {"metric": name, "baseline": reference, "value": value, "change": change}
+            )
+    return regressions
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Run the pipeline and API benchmark suite.")
+    parser.add_argument("--model", default=str(Path("artifacts") / "models" / "best_model.pkl"))
+    parser.add_argument("--data", default=str(Path("data") / "retail_store_inventory.csv"))
+    parser.add_argument("--suites", nargs="+", choices=SUITES, default=list(SUITES))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5_000, 20_000, 50_000])
+    parser.add_argument("--n-estimators", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--batch-rows", type=int, default=100)
+    parser.add_argument("--history", default=str(Path("artifacts") / "benchmarks" / "history.jsonl"))
+    parser.add_argument("--baseline", default=str(Path("artifacts") / "benchmarks" / "baseline.json"))
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the baseline")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=float(os.getenv("BENCH_REGRESSION_THRESHOLD", "0.2")),
+        help="Allowed relative slowdown vs. the baseline (default 0.2 = 20%%)",
+    )
+    args = parser.parse_args(argv)
+
+    model_path = str(Path(args.model).resolve())
+    if {"model_load", "asgi", "uvicorn"} & set(args.suites) and not Path(model_path).exists():
+        raise SystemExit(f"Model not found at {model_path}. Train the model first.")
+
+    metrics: dict[str, float] = {}
+    if "pipeline" in args.suites:
+        data_path = str(Path(args.data).resolve())
+        for rows in args.sizes:
+            metrics.update(_in_fresh_process(_run_pipeline, data_path, rows, args.n_estimators))
+    if "model_load" in args.suites:
+        metrics.update(_in_fresh_process(_run_model_load, model_path, 5))
+    if "asgi" in args.suites:
+        metrics.update(_in_fresh_process(_run_asgi, model_path, args.requests, args.batch_rows))
+    if "uvicorn" in args.suites:
+        metrics.update(_run_uvicorn(model_path, args.requests, args.batch_rows))
+    metrics = {name: round(float(value), 6) for name, value in metrics.items()}
+
+    run = {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "metrics": metrics,
+    }
+    history = Path(args.history)
+    history.parent.mkdir(parents=True, exist_ok=True)
+    with history.open("a", encoding="utf-8") as f:
+        f.write(json.dumps(run) + "\n")
+
+    baseline_path = Path(args.baseline)
+    baseline = (
+        json.loads(baseline_path.read_text(encoding="utf-8"))["metrics"]
+        if baseline_path.exists()
+        else {}
+    )
+    for name, value in sorted(metrics.items()):
+        reference = baseline.get(name)
+        delta = f"{value / reference - 1:+.1%}" if reference else ""
+        print(f"{name:<48} {value:>12.4f} {delta:>8}")
+
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(run, indent=2), encoding="utf-8")
+        print(f"Saved baseline to {baseline_path}")
+        return
+
+    regressions = compare(metrics, baseline, args.threshold)
+    for item in regressions:
+        print(
+            f"REGRESSION {item['metric']}: {item['value']:.4f} vs baseline "
+            f"{item['baseline']:.4f} ({item['change']:+.1%} > {args.threshold:.0%})"
+        )
+    if regressions:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC))
+
+
+def _run(data_path: str, encoding: str, n_estimators: int, rows: int | None) -> dict:
+    # Each encoding runs in a fresh process so peak RSS is not shared.
+    sys.path.insert(0, str(SRC))
+    import model_trainer
+    from data_ingestion import ingest
+    from data_transformation import transform
+    from resource_usage import current_rss_mb, peak_rss_mb
+
+    df = transform(ingest(data_path))
+    if rows:
+        df = df.head(rows)
+    baseline = current_rss_mb()
+    model_trainer.mlflow = None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)  # keep the benchmark model out of artifacts/
+        start = time.perf_counter()
+        _model, mae = model_trainer.train_model(
+            df, n_estimators=n_estimators, encoding=encoding
+        )
+        total = time.perf_counter() - start
+        metrics = model_trainer.load_best_metrics()
+    return {
+        "encoding": encoding,
+        "mae": float(mae),
+        "fit_seconds": metrics["train_seconds"],
+        "total_seconds": total,
+        "data_rss_mb": baseline,
+        "fit_peak_rss_mb": metrics["peak_rss_mb"],
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare peak memory and fit time of the one-hot and ordinal training paths."
+    )
+    parser.add_argument("--data", default=str(Path("data") / "retail_store_inventory.csv"))
+    parser.add_argument("--n-estimators", type=int, default=50)
+    parser.add_argument("--rows", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    data_path = str(Path(args.data).resolve())
+    context = multiprocessing.get_context("spawn")
+    for encoding in ("onehot", "ordinal"):
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            result = pool.submit(
+                _run, data_path, encoding, args.n_estimators, args.rows
+            ).result()
+        print(
+            f"{result['encoding']:>8}: MAE {result['mae']:.4f}, "
+            f"fit {result['fit_seconds']:.2f}s (total {result['total_seconds']:.2f}s), "
+            f"RSS after load {result['data_rss_mb']:.1f} MB, "
+            f"peak during fit {result['fit_peak_rss_mb']:.1f} MB, "
+            f"peak incl. save {result['peak_rss_mb']:.1f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
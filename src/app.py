@@ -1,15 +1,135 @@
-from fastapi import FastAPI, HTTPException, Request
+import time
+
+_IMPORT_START = time.perf_counter()
+
+import datetime
+import os
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any
+
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
+import numpy as np
 import pandas as pd
 
-from logger import get_logger
-from predict_pipeline import predict, explain
+from drift_monitor import get_monitor, monitoring_enabled, refresh_monitor
+from feature_schema import FIELD_TO_COLUMN, frame_from_payload, validate_features
+from feature_store import get_feature_store
+from forecast import MEDIA_TYPES, encode_stream, forecast_chunks
+from lag_features import SeriesDateError, SeriesStateNotFoundError
+from logger import get_logger, request_id
+from micro_batcher import BatcherClosedError, QueueFullError, batcher_from_env
+from model_registry import get_registry
+from predict_pipeline import (
+    explain_records,
+    get_segment_router,
+    model_info,
+    predict,
+    predict_records,
+    series_date_errors,
+)
+from prediction_cache import get_cache
+from serving_metrics import REQUEST_SECONDS, REQUESTS_TOTAL, render, render_gauges, stage
+from warmup import PREWARM_MODES, StartupState, prewarm, prewarm_in_background
+
+
+startup = StartupState(
+    started_at=_IMPORT_START, import_seconds=time.perf_counter() - _IMPORT_START
+)
+PREWARM_EXPLAIN = os.getenv("PREWARM_EXPLAIN", "1") == "1"
+PREDICTION_ROUTES = {"/predict", "/predict/batch", "/predict/by-key", "/explain"}
 
 
-app = FastAPI(title="Inventory Analysis API")
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    mode = os.getenv("PREWARM", "background")
+    if mode not in PREWARM_MODES:
+        raise ValueError(f"PREWARM must be one of {PREWARM_MODES}, got {mode!r}.")
+    if monitoring_enabled():
+        # Loaded here so the first requests are already monitored.
+        await run_in_threadpool(refresh_monitor)
+    if mode == "off":
+        startup.phase = "ready"
+    elif mode == "blocking":
+        await run_in_threadpool(prewarm, startup, PREWARM_EXPLAIN)
+    else:
+        prewarm_in_background(startup, PREWARM_EXPLAIN)
+    yield
+    if batcher is not None:
+        await batcher.shutdown()
+
+
+app = FastAPI(title="Inventory Analysis API", lifespan=lifespan)
 logger = get_logger(__name__)
 templates = Jinja2Templates(directory="templates")
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "10000"))
+FORECAST_MAX_DAYS = int(os.getenv("FORECAST_MAX_DAYS", "366"))
+FORECAST_WORKERS = int(os.getenv("FORECAST_WORKERS", "1"))
+LOG_REQUESTS = os.getenv("LOG_REQUESTS", "0") == "1"
+batcher = batcher_from_env(predict_records)
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    rid = request.headers.get("x-request-id") or uuid.uuid4().hex
+    token = request_id.set(rid)
+    try:
+        response = await call_next(request)
+    finally:
+        request_id.reset(token)
+    elapsed = time.perf_counter() - start
+    # Label by route template, not raw path, to keep the series count bounded.
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    REQUEST_SECONDS.observe(elapsed, request.method, route)
+    REQUESTS_TOTAL.inc(request.method, route, str(response.status_code))
+    if response.status_code == 200 and route in PREDICTION_ROUTES:
+        startup.mark_first_prediction()
+    response.headers["X-Request-ID"] = rid
+    if LOG_REQUESTS:
+        logger.info(
+            "request",
+            extra={
+                "request_id": rid,
+                "method": request.method,
+                "route": route,
+                "status": response.status_code,
+                "duration_ms": round(elapsed * 1000, 3),
+            },
+        )
+    return response
+
+
+def _json(content) -> JSONResponse:
+    # JSONResponse encodes in its constructor, so this times serialization.
+    with stage("serialize"):
+        return JSONResponse(content)
+
+
+def _monitor_records(records: list[dict]) -> None:
+    # Monitoring must never fail a prediction.
+    try:
+        monitor = get_monitor()
+        if monitor is not None:
+            with stage("monitor"):
+                for record in records:
+                    monitor.observe_record(record)
+    except Exception:
+        logger.exception("Drift monitoring failed; serving without it")
+
+
+def _monitor_frame(features: pd.DataFrame, invalid_rows: int) -> None:
+    try:
+        monitor = get_monitor()
+        if monitor is not None:
+            with stage("monitor"):
+                monitor.observe_frame(features, invalid_rows=invalid_rows)
+    except Exception:
+        logger.exception("Drift monitoring failed; serving without it")
 
 
 class PredictRequest(BaseModel):
@@ -53,24 +173,150 @@ class PredictRequest(BaseModel):
         }
 
 
+class BatchPredictRequest(BaseModel):
+    rows: list[dict[str, Any]] | None = None
+    columns: dict[str, list[Any]] | None = None
+
+
+class KeyPredictRequest(BaseModel):
+    Store_ID: str
+    Product_ID: str
+    date: datetime.date | None = None
+    overrides: dict[str, Any] = {}
+
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
 
+@app.get("/ready")
+def readiness():
+    """200 once this worker has loaded and warmed the model, 503 until then."""
+    if startup.phase == "failed":
+        # Retry, e.g. once a model has been trained.
+        prewarm_in_background(startup, PREWARM_EXPLAIN)
+    return JSONResponse(startup.info(), status_code=200 if startup.ready else 503)
+
+
+@app.get("/model")
+def model_details():
+    try:
+        return model_info()
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Model not found. Train the model first.")
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    return get_cache().stats()
+
+
+@app.get("/batcher/stats")
+def batcher_stats():
+    if batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **batcher.stats()}
+
+
+@app.get("/segments/stats")
+def segment_stats():
+    try:
+        router = get_segment_router()
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    if router is None:
+        return {"enabled": False}
+    return {"enabled": True, **router.stats()}
+
+
+@app.get("/feature-store/stats")
+def feature_store_stats():
+    try:
+        return get_feature_store().stats()
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+
+
+@app.get("/drift")
+def drift():
+    if not monitoring_enabled():
+        return {"enabled": False}
+    monitor = refresh_monitor()
+    if monitor is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Reference profile not found or unreadable. Train the model first.",
+        )
+    return {"enabled": True, **monitor.scores()}
+
+
+@app.post("/drift/snapshot")
+def drift_snapshot():
+    monitor = refresh_monitor() if monitoring_enabled() else None
+    if monitor is None:
+        raise HTTPException(status_code=404, detail="Drift monitoring is not active.")
+    return {"path": str(monitor.snapshot())}
+
+
+@app.get("/metrics")
+def metrics():
+    cache = get_cache().stats()
+    extra = render_gauges(
+        "inventory_prediction_cache_entries",
+        "Entries in the in-memory prediction cache.",
+        [({}, cache["size"])],
+    ) + render_gauges(
+        "inventory_prediction_cache_lookups",
+        "Prediction cache lookups since start, by result.",
+        [({"result": "hit"}, cache["hits"]), ({"result": "miss"}, cache["misses"])],
+    )
+    if batcher is not None:
+        extra += render_gauges(
+            "inventory_batcher_queue_depth",
+            "Requests waiting in the micro-batcher queue.",
+            [({}, batcher.stats()["queue_depth"])],
+        )
+    try:
+        monitor = get_monitor()
+        if monitor is not None:
+            scores = monitor.scores()["features"]
+            extra += render_gauges(
+                "inventory_feature_psi",
+                "Population stability index of served features vs. the training profile.",
+                [
+                    ({"feature": name}, entry["psi"])
+                    for name, entry in scores.items()
+                    if "psi" in entry
+                ],
+            )
+    except Exception:
+        logger.exception("Drift scores unavailable for /metrics")
+    return PlainTextResponse(render(extra), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/")
 def index(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
 
 @app.post("/predict")
-def predict_units_sold(payload: PredictRequest):
+async def predict_units_sold(payload: PredictRequest):
     try:
-        features = payload.to_feature_dict()
-        df = pd.DataFrame([features])
-        preds = predict(df)
-        prediction = float(preds[0])
-        return {"prediction": prediction}
+        with stage("validate"):
+            features = payload.to_feature_dict()
+        _monitor_records([features])
+        if batcher is not None:
+            prediction = await batcher.submit(features)
+        else:
+            prediction = (await run_in_threadpool(predict_records, [features]))[0]
+        return _json({"prediction": prediction})
+    except (QueueFullError, BatcherClosedError) as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
+    except SeriesStateNotFoundError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    except SeriesDateError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Model not found. Train the model first.")
     except Exception as exc:
@@ -78,15 +324,164 @@ def predict_units_sold(payload: PredictRequest):
         raise HTTPException(status_code=500, detail=str(exc))
 
 
+@app.post("/predict/batch")
+def predict_units_sold_batch(payload: BatchPredictRequest):
+    try:
+        with stage("dataframe"):
+            frame = frame_from_payload(rows=payload.rows, columns=payload.columns)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    if len(frame) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch of {len(frame)} rows exceeds MAX_BATCH_SIZE={MAX_BATCH_SIZE}.",
+        )
+
+    try:
+        with stage("validate"):
+            features, errors = validate_features(frame)
+            valid = pd.isna(errors)
+        _monitor_frame(features[valid], invalid_rows=int((~valid).sum()))
+        predictions = np.full(len(frame), None, dtype=object)
+        if valid.any():
+            # Rows dated other than their series' next day fail on their own.
+            errors[valid] = series_date_errors(features[valid])
+            valid = pd.isna(errors)
+        if valid.any():
+            predictions[valid] = predict(features[valid]).astype(float).tolist()
+        return _json(
+            {
+                "predictions": predictions.tolist(),
+                "errors": [
+                    {"index": int(i), "error": errors[i]} for i in (~valid).nonzero()[0]
+                ],
+            }
+        )
+    except SeriesStateNotFoundError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    except SeriesDateError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Model not found. Train the model first.")
+    except Exception as exc:
+        logger.exception("Batch prediction failed")
+        raise HTTPException(status_code=500, detail=str(exc))
+
+
+@app.post("/predict/by-key")
+def predict_units_sold_by_key(payload: KeyPredictRequest | list[KeyPredictRequest]):
+    rows = payload if isinstance(payload, list) else [payload]
+    if len(rows) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch of {len(rows)} rows exceeds MAX_BATCH_SIZE={MAX_BATCH_SIZE}.",
+        )
+    try:
+        with stage("dataframe"):
+            frame, missing = get_feature_store().build_features(
+                [(row.Store_ID, row.Product_ID) for row in rows],
+                dates=[row.date for row in rows],
+                overrides=[
+                    {FIELD_TO_COLUMN.get(name, name): value for name, value in row.overrides.items()}
+                    for row in rows
+                ],
+            )
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    if missing.any():
+        unknown = [f"{rows[i].Store_ID}/{rows[i].Product_ID}" for i in missing.nonzero()[0]]
+        raise HTTPException(status_code=404, detail=f"Unknown store/product: {unknown}")
+
+    with stage("validate"):
+        features, errors = validate_features(frame)
+        invalid = ~pd.isna(errors)
+    _monitor_frame(features[~invalid], invalid_rows=int(invalid.sum()))
+    if invalid.any():
+        raise HTTPException(
+            status_code=422,
+            detail=[{"index": int(i), "error": errors[i]} for i in invalid.nonzero()[0]],
+        )
+    try:
+        predictions = predict_records(features.to_dict(orient="records"))
+    except SeriesStateNotFoundError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    except SeriesDateError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Model not found. Train the model first.")
+    except Exception as exc:
+        logger.exception("Prediction by key failed")
+        raise HTTPException(status_code=500, detail=str(exc))
+    if isinstance(payload, list):
+        return _json({"predictions": predictions})
+    return _json({"prediction": predictions[0]})
+
+
+@app.get("/forecast")
+def forecast_grid(
+    start: datetime.date | None = None,
+    days: int = 7,
+    format: str = "ndjson",
+    store_id: list[str] | None = Query(None),
+    product_id: list[str] | None = Query(None),
+):
+    if format not in MEDIA_TYPES:
+        raise HTTPException(
+            status_code=422, detail=f"format must be one of {sorted(MEDIA_TYPES)}."
+        )
+    if not 1 <= days <= FORECAST_MAX_DAYS:
+        raise HTTPException(
+            status_code=422, detail=f"days must be between 1 and {FORECAST_MAX_DAYS}."
+        )
+    registry = get_registry()
+    if not registry.path.exists():
+        raise HTTPException(status_code=404, detail="Model not found. Train the model first.")
+    try:
+        store = get_feature_store()
+        if start is None and store.watermark is None:
+            raise FileNotFoundError("Feature store is empty. Materialize it first.")
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+
+    # Chunks are generated, scored and encoded one at a time while streaming.
+    chunks = forecast_chunks(
+        start=start,
+        days=days,
+        stores=store_id,
+        products=product_id,
+        workers=FORECAST_WORKERS,
+        model_path=registry.path,
+        store=store,
+        registry=registry,
+    )
+    return StreamingResponse(
+        encode_stream(chunks, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="forecast.{format}"'},
+    )
+
+
 @app.post("/explain")
-def explain_prediction(payload: PredictRequest, top_n: int = 10):
+def explain_prediction(
+    payload: PredictRequest | list[PredictRequest],
+    top_n: int = 10,
+    fold_categories: bool = False,
+):
     try:
-        features = payload.to_feature_dict()
-        df = pd.DataFrame([features])
-        preds = predict(df)
-        prediction = float(preds[0])
-        contributions = explain(df, top_n=top_n)
-        return {"prediction": prediction, "contributions": contributions}
+        rows = payload if isinstance(payload, list) else [payload]
+        with stage("validate"):
+            records = [row.to_feature_dict() for row in rows]
+        _monitor_records(records)
+        results = explain_records(records, top_n=top_n, fold_categories=fold_categories)
+        if isinstance(payload, list):
+            return _json({"results": results})
+        return _json(results[0])
+    except SeriesStateNotFoundError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    except SeriesDateError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Model not found. Train the model first.")
     except Exception as exc:
@@ -0,0 +1,268 @@
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from threadpoolctl import threadpool_limits
+
+from feature_schema import FEATURE_COLUMNS, TARGET
+from logger import get_logger
+from model_evaluation import BREAKDOWNS, _add_error_columns, _group_metrics, overall_metrics
+from model_trainer import SEARCH_ESTIMATORS, _make_candidate
+
+
+logger = get_logger(__name__)
+
+_fold_data = None
+
+
+@dataclass(frozen=True)
+class Fold:
+    number: int
+    train_start: pd.Timestamp
+    train_end: pd.Timestamp
+    test_start: pd.Timestamp
+    test_end: pd.Timestamp
+    train_idx: np.ndarray
+    test_idx: np.ndarray
+
+    def info(self) -> dict:
+        return {
+            "fold": self.number,
+            "train_start": self.train_start.date().isoformat(),
+            "train_end": self.train_end.date().isoformat(),
+            "test_start": self.test_start.date().isoformat(),
+            "test_end": self.test_end.date().isoformat(),
+            "train_rows": int(len(self.train_idx)),
+            "test_rows": int(len(self.test_idx)),
+        }
+
+
+def rolling_origin_folds(
+    dates: pd.Series,
+    n_folds: int = 4,
+    horizon_days: int = 14,
+    window_days: int | None = None,
+) -> list[Fold]:
+    """Split rows into ``n_folds`` consecutive test windows at the end of ``dates``.
+
+    Each fold trains on everything before its test window (expanding window),
+    or only on the last ``window_days`` before it (rolling window).
+    """
+    days = pd.to_datetime(dates).dt.normalize().to_numpy()
+    last = days.max()
+    horizon = np.timedelta64(horizon_days, "D")
+    folds = []
+    for number in range(n_folds):
+        test_end = last - horizon * (n_folds - 1 - number)
+        test_start = test_end - horizon + np.timedelta64(1, "D")
+        train_mask = days < test_start
+        if window_days is not None:
+            train_mask &= days >= test_start - np.timedelta64(window_days, "D")
+        train_idx = np.flatnonzero(train_mask)
+        test_idx = np.flatnonzero((days >= test_start) & (days <= test_end))
+        if len(train_idx) == 0 or len(test_idx) == 0:
+            raise ValueError(f"Fold {number} has no training or test rows.")
+        folds.append(
+            Fold(
+                number=number,
+                train_start=pd.Timestamp(days[train_idx].min()),
+                train_end=pd.Timestamp(days[train_idx].max()),
+                test_start=pd.Timestamp(test_start),
+                test_end=pd.Timestamp(test_end),
+                train_idx=train_idx,
+                test_idx=test_idx,
+            )
+        )
+    return folds
+
+
+def _init_fold_worker(X, y) -> None:
+    global _fold_data
+    _fold_data = (X, y)
+
+
+def _fit_fold(task: tuple) -> dict:
+    number, train_idx, test_idx, estimator, params, encoding, n_jobs, random_state = task
+    X, y = _fold_data
+    dense = SEARCH_ESTIMATORS[estimator][1]
+    X_train, X_test = X[train_idx], X[test_idx]
+    if dense and hasattr(X_train, "toarray"):
+        X_train, X_test = X_train.toarray(), X_test.toarray()
+
+    with threadpool_limits(limits=n_jobs):
+        model = _make_candidate(estimator, params, n_jobs, random_state, encoding)
+        model = model.named_steps["model"]
+        start = time.perf_counter()
+        model.fit(X_train, y[train_idx])
+        fit_seconds = time.perf_counter() - start
+        y_pred = model.predict(X_test)
+    return {"fold": number, "y_pred": y_pred, "fit_seconds": fit_seconds}
+
+
+def backtest(
+    df: pd.DataFrame,
+    n_folds: int = 4,
+    horizon_days: int = 14,
+    window_days: int | None = None,
+    estimator: str = "random_forest",
+    params: dict | None = None,
+    encoding: str | None = None,
+    workers: int | None = None,
+    random_state: int = 42,
+    output_dir: Path | str = "artifacts/reports/backtest",
+) -> dict:
+    """Time-ordered backtest of one estimator over rolling-origin folds.
+
+    ``df`` must already be transformed. Its features are encoded once with a
+    preprocessor fitted on the whole frame (the encoders only learn the
+    category vocabulary, never the target), and every fold fits the
+    estimator on row slices of that cached matrix. Folds run in a process
+    pool, and the cores are split between workers like ``search_models``.
+    Writes ``backtest_summary.json`` plus pooled and per-fold
+    ``metrics_by_*.csv`` breakdowns to ``output_dir``.
+    """
+    encoding = encoding or os.getenv("TRAIN_ENCODING", "onehot")
+    params = params or {"n_estimators": 100}
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
+
+    folds = rolling_origin_folds(df["Date"], n_folds, horizon_days, window_days)
+    pipeline = _make_candidate(estimator, params, 1, random_state, encoding)
+    X = pipeline.named_steps["preprocess"].fit_transform(df[FEATURE_COLUMNS])
+    if hasattr(X, "tocsr"):
+        X = X.tocsr()
+    y = df[TARGET].to_numpy(dtype=np.float64)
+
+    cores = os.cpu_count() or 1
+    workers = max(1, min(workers or cores, len(folds)))
+    inner_jobs = max(1, cores // workers)
+    tasks = [
+        (
+            fold.number,
+            fold.train_idx,
+            fold.test_idx,
+            estimator,
+            params,
+            encoding,
+            inner_jobs,
+            random_state,
+        )
+        for fold in folds
+    ]
+    if workers > 1:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_fold_worker,
+            initargs=(X, y),
+        ) as pool:
+            results = list(pool.map(_fit_fold, tasks))
+    else:
+        _init_fold_worker(X, y)
+        results = [_fit_fold(task) for task in tasks]
+
+    group_cols = sorted({col for cols in BREAKDOWNS.values() for col in cols})
+    frames = []
+    fold_reports = []
+    for fold, result in zip(folds, results):
+        rows = df.iloc[fold.test_idx]
+        y_true = rows[TARGET]
+        fold_reports.append(
+            {
+                **fold.info(),
+                **overall_metrics(y_true, result["y_pred"]),
+                "fit_seconds": result["fit_seconds"],
+            }
+        )
+        frames.append(
+            rows[group_cols].assign(
+                fold=fold.number, y_true=y_true.to_numpy(), y_pred=result["y_pred"]
+            )
+        )
+        logger.info(
+            "Fold %d (%s..%s): MAE %.4f, fit %.2fs",
+            fold.number,
+            fold.test_start.date(),
+            fold.test_end.date(),
+            fold_reports[-1]["mae"],
+            result["fit_seconds"],
+        )
+
+    eval_df = _add_error_columns(pd.concat(frames, ignore_index=True))
+    for name, cols in BREAKDOWNS.items():
+        _group_metrics(eval_df, cols).to_csv(
+            output_path / f"metrics_by_{name}.csv", index=False
+        )
+        _group_metrics(eval_df, ["fold", *cols]).to_csv(
+            output_path / f"metrics_by_{name}_per_fold.csv", index=False
+        )
+
+    pooled = overall_metrics(eval_df["y_true"], eval_df["y_pred"].to_numpy())
+    maes = [report["mae"] for report in fold_reports]
+    summary = {
+        "estimator": estimator,
+        "params": params,
+        "encoding": encoding,
+        "window": "expanding" if window_days is None else f"rolling-{window_days}d",
+        "horizon_days": horizon_days,
+        "workers": workers,
+        "overall": pooled,
+        "fold_mae_mean": float(np.mean(maes)),
+        "fold_mae_std": float(np.std(maes)),
+        "folds": fold_reports,
+        "seconds": time.perf_counter() - started,
+    }
+    (output_path / "backtest_summary.json").write_text(
+        json.dumps(summary, indent=2, default=str), encoding="utf-8"
+    )
+    logger.info(
+        "Backtest over %d folds: MAE %.4f in %.2fs with %d workers",
+        len(folds),
+        pooled["mae"],
+        summary["seconds"],
+        workers,
+    )
+    return summary
+
+
+def main(argv: list[str] | None = None) -> None:
+    from data_ingestion import ingest
+    from data_transformation import transform
+
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest over the Date column.")
+    parser.add_argument("--data", default=str(Path("data") / "retail_store_inventory.csv"))
+    parser.add_argument("--folds", type=int, default=4)
+    parser.add_argument("--horizon-days", type=int, default=14)
+    parser.add_argument("--window-days", type=int, default=None)
+    parser.add_argument("--estimator", choices=sorted(SEARCH_ESTIMATORS), default="random_forest")
+    parser.add_argument("--params", default='{"n_estimators": 100}', help="JSON estimator params")
+    parser.add_argument("--encoding", default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output-dir", default=str(Path("artifacts") / "reports" / "backtest"))
+    args = parser.parse_args(argv)
+
+    backtest(
+        transform(ingest(args.data)),
+        n_folds=args.folds,
+        horizon_days=args.horizon_days,
+        window_days=args.window_days,
+        estimator=args.estimator,
+        params=json.loads(args.params),
+        encoding=args.encoding,
+        workers=args.workers,
+        output_dir=args.output_dir,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import FunctionTransformer, OrdinalEncoder
+
+from forest_bundle import (
+    MappedForestPipeline,
+    flatten_forest,
+    predict_flat,
+    supports_bundle,
+)
+
+try:
+    from numba import njit, prange  # type: ignore
+except ModuleNotFoundError:
+    njit = None
+
+# Batches at least this large are scored with the multi-threaded kernel.
+PARALLEL_MIN_ROWS = 256
+
+
+def _predict_rows(X, left, right, feature, threshold, value, roots, out):
+    # Tree-major order keeps one tree's nodes hot in cache across all rows,
+    # and adds tree outputs in the same order as sklearn.
+    n_rows = X.shape[0]
+    n_trees = roots.shape[0]
+    out[:] = 0.0
+    for t in range(n_trees):
+        root = roots[t]
+        for i in prange(n_rows):
+            node = root
+            while left[node] != -1:
+                if X[i, feature[node]] <= threshold[node]:
+                    node = left[node]
+                else:
+                    node = right[node]
+            out[i] += value[node]
+    for i in prange(n_rows):
+        out[i] /= n_trees
+
+
+if njit is not None:
+    _predict_kernel = njit(cache=True, nogil=True)(_predict_rows)
+    _predict_kernel_parallel = njit(cache=True, nogil=True, parallel=True)(_predict_rows)
+else:
+    _predict_kernel = None
+    _predict_kernel_parallel = None
+
+
+def _is_passthrough(transformer) -> bool:
+    # Fitted ColumnTransformers store "passthrough" as an identity FunctionTransformer.
+    if isinstance(transformer, str):
+        return transformer == "passthrough"
+    return isinstance(transformer, FunctionTransformer) and transformer.func is None
+
+
+def supports_compiled(model) -> bool:
+    return isinstance(model, MappedForestPipeline) or supports_bundle(model)
+
+
+class CompiledPredictor:
+    """Forest predictor that skips the ColumnTransformer and sparse matrices.
+
+    One-hot (or ordinal code) columns are filled straight from precomputed
+    category -> column maps into a dense float32 block, and the flattened trees are evaluated
+    with a numba kernel when numba is installed, or in NumPy otherwise.
+    Predictions match the sklearn pipeline.
+    """
+
+    def __init__(
+        self,
+        n_features: int,
+        category_maps: dict[str, tuple[pd.Index, int]],
+        numeric_columns: dict[str, int],
+        arrays: dict[str, np.ndarray],
+        use_numba: bool = True,
+        ordinal_maps: dict[str, tuple[pd.Index, int]] | None = None,
+    ):
+        self.n_features = n_features
+        self.category_maps = category_maps
+        self.ordinal_maps = ordinal_maps or {}
+        self.numeric_columns = numeric_columns
+        self.arrays = {
+            name: np.ascontiguousarray(array) for name, array in arrays.items()
+        }
+        if self.arrays["value"].dtype == np.float16:
+            # numba has no float16 arithmetic; half-precision only saves disk.
+            self.arrays["value"] = self.arrays["value"].astype(np.float32)
+        self.use_numba = use_numba and _predict_kernel is not None
+
+    @classmethod
+    def from_pipeline(cls, model, use_numba: bool = True) -> "CompiledPredictor":
+        if isinstance(model, MappedForestPipeline):
+            preprocessor, arrays = model.preprocessor, model.arrays
+        else:
+            preprocessor = model.named_steps["preprocess"]
+            arrays = flatten_forest(model.named_steps["model"])
+
+        category_maps: dict[str, tuple[pd.Index, int]] = {}
+        ordinal_maps: dict[str, tuple[pd.Index, int]] = {}
+        numeric_columns: dict[str, int] = {}
+        offset = 0
+        for _name, transformer, columns in preprocessor.transformers_:
+            if isinstance(transformer, str) and transformer == "drop":
+                continue
+            categories = getattr(transformer, "categories_", None)
+            if isinstance(transformer, OrdinalEncoder):
+                if transformer.unknown_value != -1:
+                    raise ValueError("OrdinalEncoder needs unknown_value=-1.")
+                for column, values in zip(columns, categories):
+                    ordinal_maps[column] = (pd.Index(values), offset)
+                    offset += 1
+            elif categories is not None:
+                if getattr(transformer, "drop_idx_", None) is not None:
+                    raise ValueError("OneHotEncoder(drop=...) is not supported.")
+                for column, values in zip(columns, categories):
+                    category_maps[column] = (pd.Index(values), offset)
+                    offset += len(values)
+            elif _is_passthrough(transformer):
+                for column in columns:
+                    numeric_columns[column] = offset
+                    offset += 1
+            else:
+                raise ValueError(f"Unsupported transformer {transformer!r}.")
+
+        return cls(
+            offset,
+            category_maps,
+            numeric_columns,
+            arrays,
+            use_numba=use_numba,
+            ordinal_maps=ordinal_maps,
+        )
+
+    def transform(self, input_df: pd.DataFrame) -> np.ndarray:
+        n_rows = len(input_df)
+        X = np.zeros((n_rows, self.n_features), dtype=np.float32)
+        rows = np.arange(n_rows)
+        for column, (categories, offset) in self.category_maps.items():
+            # Unknown categories get -1 and stay all-zero, like
+            # OneHotEncoder(handle_unknown="ignore").
+            positions = categories.get_indexer(input_df[column].to_numpy(dtype=object))
+            known = positions >= 0
+            X[rows[known], offset + positions[known]] = 1.0
+        for column, (categories, position) in self.ordinal_maps.items():
+            X[:, position] = categories.get_indexer(input_df[column].to_numpy(dtype=object))
+        for column, position in self.numeric_columns.items():
+            X[:, position] = input_df[column].to_numpy(dtype=np.float32)
+        return X
+
+    def predict(self, input_df: pd.DataFrame) -> np.ndarray:
+        return self.predict_transformed(self.transform(input_df))
+
+    def predict_transformed(self, X: np.ndarray) -> np.ndarray:
+        if not self.use_numba:
+            return predict_flat(self.arrays, X)
+        out = np.empty(len(X), dtype=np.float64)
+        arrays = self.arrays
+        kernel = _predict_kernel_parallel if len(X) >= PARALLEL_MIN_ROWS else _predict_kernel
+        kernel(
+            X,
+            arrays["left"],
+            arrays["right"],
+            arrays["feature"],
+            arrays["threshold"],
+            arrays["value"],
+            arrays["roots"],
+            out,
+        )
+        return out
@@ -1,12 +1,125 @@
-import pandas as pd
+from __future__ import annotations
+
+import glob
+import hashlib
+import json
+import os
+import time
 from pathlib import Path
+
+import pandas as pd
+
+from feature_schema import CATEGORICAL_COLUMNS
 from logger import get_logger
 
+try:
+    import pyarrow  # type: ignore  # noqa: F401
+except ModuleNotFoundError:
+    pyarrow = None
+
 
 logger = get_logger(__name__)
 
+# Bump when the snapshot dtypes change so old snapshots are ignored.
+CACHE_VERSION = 1
+DEFAULT_CACHE_DIR = Path(os.getenv("INGEST_CACHE_DIR", Path("artifacts") / "cache"))
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _source_key(path: Path) -> str:
+    """Cache file prefix unique to this source: same-named files in other
+    directories get their own snapshots and meta."""
+    location = hashlib.sha256(str(path.resolve()).encode("utf-8")).hexdigest()[:12]
+    return f"{path.stem}-{location}"
+
+
+def _source_hash(path: Path, cache_dir: Path) -> str:
+    # The content hash is only recomputed when mtime or size change.
+    stat = path.stat()
+    meta_path = cache_dir / f"{_source_key(path)}.meta.json"
+    if meta_path.exists():
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            if meta["mtime_ns"] == stat.st_mtime_ns and meta["size"] == stat.st_size:
+                return meta["sha256"]
+        except (KeyError, ValueError):
+            pass
+
+    sha256 = _file_sha256(path)
+    meta_path.write_text(
+        json.dumps({"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": sha256}),
+        encoding="utf-8",
+    )
+    return sha256
+
+
+def read_typed_csv(data_path: str | Path) -> pd.DataFrame:
+    header = pd.read_csv(data_path, nrows=0).columns
+    dtypes = {col: "category" for col in CATEGORICAL_COLUMNS if col in header}
+    parse_dates = ["Date"] if "Date" in header else False
+    df = pd.read_csv(data_path, dtype=dtypes, parse_dates=parse_dates)
+
+    for col in df.columns:
+        if pd.api.types.is_integer_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], downcast="integer")
+        elif pd.api.types.is_float_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], downcast="float")
+    return df
+
+
+def ingest(
+    data_path: str | Path,
+    columns: list[str] | None = None,
+    use_cache: bool = True,
+    cache_dir: str | Path | None = None,
+) -> pd.DataFrame:
+    data_path = Path(data_path)
+    start = time.perf_counter()
+
+    if not use_cache or pyarrow is None:
+        df = read_typed_csv(data_path)
+        if columns is not None:
+            df = df[columns]
+        logger.info("Loaded raw data with shape %s", df.shape)
+        return df
+
+    cache_dir = Path(cache_dir) if cache_dir is not None else DEFAULT_CACHE_DIR
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    sha256 = _source_hash(data_path, cache_dir)
+    source_key = _source_key(data_path)
+    snapshot = cache_dir / f"{source_key}-v{CACHE_VERSION}-{sha256[:16]}.parquet"
+
+    if snapshot.exists():
+        df = pd.read_parquet(snapshot, columns=columns)
+        logger.info(
+            "Loaded cached snapshot %s with shape %s in %.3fs",
+            snapshot.name,
+            df.shape,
+            time.perf_counter() - start,
+        )
+        return df
+
+    df = read_typed_csv(data_path)
+    tmp_path = snapshot.with_suffix(".parquet.tmp")
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, snapshot)
+    for stale in cache_dir.glob(f"{glob.escape(source_key)}-v*.parquet"):
+        if stale != snapshot:
+            stale.unlink(missing_ok=True)
 
-def ingest(data_path: str | Path) -> pd.DataFrame:
-    df = pd.read_csv(data_path)
-    logger.info("Loaded raw data with shape %s", df.shape)
+    if columns is not None:
+        df = df[columns]
+    logger.info(
+        "Loaded raw data with shape %s in %.3fs and cached it as %s",
+        df.shape,
+        time.perf_counter() - start,
+        snapshot.name,
+    )
     return df
@@ -0,0 +1,395 @@
+from __future__ import annotations
+
+import bisect
+import copy
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Mapping
+
+import numpy as np
+import pandas as pd
+
+from feature_schema import CATEGORICAL_COLUMNS, NUMERIC_COLUMNS
+from logger import get_logger
+
+
+logger = get_logger(__name__)
+
+PROFILE_FORMAT_VERSION = 1
+MONITORING_DIR = Path("artifacts") / "monitoring"
+DEFAULT_REFERENCE_PATH = Path(
+    os.getenv("MONITOR_REFERENCE", MONITORING_DIR / "reference_profile.json")
+)
+SNAPSHOT_DIR = Path(os.getenv("MONITOR_SNAPSHOT_DIR", MONITORING_DIR / "snapshots"))
+REFERENCE_BINS = 20
+MAX_REFERENCE_CATEGORIES = 1000
+# Distinct unseen values remembered per column; further ones are only counted.
+MAX_UNSEEN_VALUES = 50
+# Floor for empty bins so PSI stays finite.
+PSI_EPSILON = 1e-4
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = float(os.getenv("MONITOR_PSI_ALERT", "0.25"))
+
+
+def build_reference_profile(df: pd.DataFrame, bins: int = REFERENCE_BINS) -> dict:
+    """Summarise the training features: quantile bins for numbers, frequencies for categories."""
+    numeric = {}
+    for column in NUMERIC_COLUMNS:
+        values = df[column].to_numpy(dtype=np.float64)
+        values = values[~np.isnan(values)]
+        edges = np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1]))
+        counts = np.bincount(np.searchsorted(edges, values, side="right"), minlength=len(edges) + 1)
+        numeric[column] = {
+            "edges": edges.tolist(),
+            "proportions": (counts / max(len(values), 1)).tolist(),
+            "min": float(values.min()),
+            "max": float(values.max()),
+            "mean": float(values.mean()),
+            "std": float(values.std()),
+        }
+    categorical = {}
+    for column in CATEGORICAL_COLUMNS:
+        shares = df[column].astype(str).value_counts(normalize=True)
+        categorical[column] = {
+            "proportions": shares.head(MAX_REFERENCE_CATEGORIES).to_dict(),
+        }
+    return {
+        "format_version": PROFILE_FORMAT_VERSION,
+        "created_at": pd.Timestamp.now(tz="UTC").isoformat(),
+        "rows": len(df),
+        "numeric": numeric,
+        "categorical": categorical,
+    }
+
+
+def save_reference_profile(df: pd.DataFrame, path: str | Path = DEFAULT_REFERENCE_PATH) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(build_reference_profile(df), indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+    return path
+
+
+def psi(expected: np.ndarray, actual: np.ndarray) -> float:
+    """Population stability index between two sets of bin proportions."""
+    expected = np.maximum(np.asarray(expected, dtype=np.float64), PSI_EPSILON)
+    actual = np.maximum(np.asarray(actual, dtype=np.float64), PSI_EPSILON)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def binned_ks(expected: np.ndarray, actual: np.ndarray) -> float:
+    """Kolmogorov-Smirnov distance between the two binned CDFs."""
+    return float(np.max(np.abs(np.cumsum(actual) - np.cumsum(expected)), initial=0.0))
+
+
+def _severity(score: float) -> str:
+    if score >= PSI_SIGNIFICANT:
+        return "significant"
+    return "moderate" if score >= PSI_MODERATE else "stable"
+
+
+class DriftMonitor:
+    """Streaming feature profiles of served rows, compared with the training profile.
+
+    Each numeric value is counted into the reference's quantile bins (one
+    bisect) and each categorical value into a counter of the reference
+    categories, so a request costs O(1) and memory is bounded by the
+    reference. Counts are kept for the current window of ``window_rows`` rows
+    and the one before it, and scores cover both.
+    """
+
+    def __init__(
+        self,
+        reference: dict,
+        window_rows: int | None = None,
+        snapshot_dir: Path | None = None,
+        snapshot_on_rotate: bool | None = None,
+    ):
+        self.reference = reference
+        self.window_rows = window_rows or int(os.getenv("MONITOR_WINDOW", "10000"))
+        self.snapshot_dir = Path(snapshot_dir or SNAPSHOT_DIR)
+        self.snapshot_on_rotate = (
+            os.getenv("MONITOR_SNAPSHOTS", "0") == "1"
+            if snapshot_on_rotate is None
+            else snapshot_on_rotate
+        )
+        self._edges = {
+            column: spec["edges"] for column, spec in reference["numeric"].items()
+        }
+        self._ranges = {
+            column: (spec["min"], spec["max"]) for column, spec in reference["numeric"].items()
+        }
+        self._known = {
+            column: set(spec["proportions"]) for column, spec in reference["categorical"].items()
+        }
+        self._lock = threading.Lock()
+        self._current = self._empty_window()
+        self._previous: dict | None = None
+        self.total_rows = 0
+        self.invalid_rows = 0
+
+    def _empty_window(self) -> dict:
+        return {
+            "started_at": time.time(),
+            "rows": 0,
+            "numeric": {
+                column: {
+                    "counts": [0] * (len(edges) + 1),
+                    "out_of_range": 0,
+                    "sum": 0.0,
+                }
+                for column, edges in self._edges.items()
+            },
+            "categorical": {
+                column: {"counts": {}, "unseen": 0, "unseen_values": {}}
+                for column in self._known
+            },
+        }
+
+    def _rotate(self) -> None:
+        finished = self._current
+        self._previous, self._current = finished, self._empty_window()
+        if self.snapshot_on_rotate:
+            try:
+                self._write_snapshot(self._payload([finished]))
+            except OSError:
+                logger.exception("Could not write drift snapshot")
+
+    def observe_record(self, features: Mapping[str, Any]) -> None:
+        """Count one row, keyed by model column names (``"Store ID"``)."""
+        with self._lock:
+            window = self._current
+            window["rows"] += 1
+            for column, edges in self._edges.items():
+                value = float(features[column])
+                stats = window["numeric"][column]
+                stats["counts"][bisect.bisect_right(edges, value)] += 1
+                low, high = self._ranges[column]
+                if value < low or value > high:
+                    stats["out_of_range"] += 1
+                stats["sum"] += value
+            for column, known in self._known.items():
+                value = str(features[column])
+                stats = window["categorical"][column]
+                if value in known:
+                    stats["counts"][value] = stats["counts"].get(value, 0) + 1
+                else:
+                    self._count_unseen(stats, value, 1)
+            self.total_rows += 1
+            if window["rows"] >= self.window_rows:
+                self._rotate()
+
+    def observe_frame(self, df: pd.DataFrame, invalid_rows: int = 0) -> None:
+        """Count the rows of a validated batch with vectorized binning."""
+        if len(df) == 0 and not invalid_rows:
+            return
+        binned = {}
+        for column, edges in self._edges.items():
+            values = df[column].to_numpy(dtype=np.float64)
+            low, high = self._ranges[column]
+            binned[column] = (
+                np.bincount(np.searchsorted(edges, values, side="right"), minlength=len(edges) + 1),
+                int(np.count_nonzero((values < low) | (values > high))),
+                float(values.sum()),
+            )
+        counted = {column: df[column].astype(str).value_counts() for column in self._known}
+
+        with self._lock:
+            self.invalid_rows += invalid_rows
+            window = self._current
+            window["rows"] += len(df)
+            for column, (counts, out_of_range, total) in binned.items():
+                stats = window["numeric"][column]
+                stats["counts"] = [a + int(b) for a, b in zip(stats["counts"], counts)]
+                stats["out_of_range"] += out_of_range
+                stats["sum"] += total
+            for column, counts in counted.items():
+                stats = window["categorical"][column]
+                known = self._known[column]
+                for value, count in counts.items():
+                    if value in known:
+                        stats["counts"][value] = stats["counts"].get(value, 0) + int(count)
+                    else:
+                        self._count_unseen(stats, value, int(count))
+            self.total_rows += len(df)
+            if window["rows"] >= self.window_rows:
+                self._rotate()
+
+    @staticmethod
+    def _count_unseen(stats: dict, value: str, count: int) -> None:
+        stats["unseen"] += count
+        seen = stats["unseen_values"]
+        if value in seen or len(seen) < MAX_UNSEEN_VALUES:
+            seen[value] = seen.get(value, 0) + count
+
+    def _payload(self, windows: list[dict]) -> dict:
+        rows = sum(window["rows"] for window in windows)
+        features = {}
+        for column, spec in self.reference["numeric"].items():
+            counts = np.sum([window["numeric"][column]["counts"] for window in windows], axis=0)
+            entry = {"rows": rows}
+            if rows:
+                actual = counts / rows
+                expected = np.asarray(spec["proportions"])
+                score = psi(expected, actual)
+                entry.update(
+                    psi=score,
+                    ks=binned_ks(expected, actual),
+                    severity=_severity(score),
+                    mean=sum(window["numeric"][column]["sum"] for window in windows) / rows,
+                    reference_mean=spec["mean"],
+                    out_of_range_rate=sum(
+                        window["numeric"][column]["out_of_range"] for window in windows
+                    )
+                    / rows,
+                )
+            features[column] = entry
+        for column, spec in self.reference["categorical"].items():
+            entry = {"rows": rows}
+            if rows:
+                counts: dict[str, int] = {}
+                unseen_values: dict[str, int] = {}
+                unseen = 0
+                for window in windows:
+                    stats = window["categorical"][column]
+                    for value, count in stats["counts"].items():
+                        counts[value] = counts.get(value, 0) + count
+                    for value, count in stats["unseen_values"].items():
+                        unseen_values[value] = unseen_values.get(value, 0) + count
+                    unseen += stats["unseen"]
+                categories = list(spec["proportions"])
+                # Unseen values form one extra bucket the reference never filled.
+                expected = np.append([spec["proportions"][value] for value in categories], 0.0)
+                actual = np.append([counts.get(value, 0) for value in categories], unseen) / rows
+                score = psi(expected, actual)
+                entry.update(
+                    psi=score,
+                    severity=_severity(score),
+                    unseen_rate=unseen / rows,
+                    top_unseen=dict(
+                        sorted(unseen_values.items(), key=lambda item: -item[1])[:10]
+                    ),
+                )
+            features[column] = entry
+        return {
+            "rows": rows,
+            "window_started_at": min(window["started_at"] for window in windows),
+            "features": features,
+            "drifted": sorted(
+                column
+                for column, entry in features.items()
+                if entry.get("severity") == "significant"
+            ),
+        }
+
+    def scores(self) -> dict:
+        with self._lock:
+            windows = [w for w in (self._previous, self._current) if w is not None]
+            windows = copy.deepcopy(windows)  # scored outside the lock
+            total_rows, invalid_rows = self.total_rows, self.invalid_rows
+        return {
+            "reference_created_at": self.reference.get("created_at"),
+            "reference_rows": self.reference.get("rows"),
+            "window_rows": self.window_rows,
+            "total_rows": total_rows,
+            "invalid_rows": invalid_rows,
+            **self._payload(windows),
+        }
+
+    def _write_snapshot(self, payload: dict) -> Path:
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+        path = self.snapshot_dir / f"profile-{stamp}-{os.getpid()}-{self.total_rows}.json"
+        path.write_text(json.dumps(payload, indent=2, default=float), encoding="utf-8")
+        return path
+
+    def snapshot(self) -> Path:
+        """Write the current scores and window counts to ``snapshot_dir``."""
+        with self._lock:
+            windows = copy.deepcopy([self._previous, self._current])
+        payload = self.scores()
+        payload["windows"] = [window for window in windows if window is not None]
+        return self._write_snapshot(payload)
+
+
+_monitor: DriftMonitor | None = None
+_monitor_mtime: int | None = None
+_failed_mtime: int | None = None
+_checked_at = 0.0
+_refreshing = False
+_monitor_lock = threading.Lock()
+# How often (seconds) serving re-checks the reference file for a retrain.
+REFERENCE_CHECK_SECONDS = 5.0
+
+
+def monitoring_enabled() -> bool:
+    return os.getenv("MONITOR_DRIFT", "1") == "1"
+
+
+def refresh_monitor() -> DriftMonitor | None:
+    """Re-read the reference profile if it changed, and return the monitor.
+
+    This does file I/O, so serving calls it off the request path. A profile
+    that cannot be read or has an unknown format is logged once per file
+    version and turns monitoring off until it is replaced.
+    """
+    global _monitor, _monitor_mtime, _failed_mtime, _checked_at
+    with _monitor_lock:
+        _checked_at = time.monotonic()
+        path = DEFAULT_REFERENCE_PATH
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            _monitor = _monitor_mtime = None
+            return None
+        if mtime in (_monitor_mtime, _failed_mtime):
+            return _monitor
+        try:
+            reference = json.loads(path.read_text(encoding="utf-8"))
+            if reference.get("format_version") != PROFILE_FORMAT_VERSION:
+                raise ValueError(f"Unsupported reference profile format in {path}")
+            monitor = DriftMonitor(reference)
+        except Exception:
+            logger.exception("Could not load reference profile %s; drift monitoring is off", path)
+            _monitor, _monitor_mtime, _failed_mtime = None, None, mtime
+            return None
+        _monitor, _monitor_mtime, _failed_mtime = monitor, mtime, None
+        logger.info("Drift monitor using reference profile %s", path)
+        return _monitor
+
+
+def _refresh_in_background() -> None:
+    global _refreshing
+    try:
+        refresh_monitor()
+    finally:
+        _refreshing = False
+
+
+def get_monitor() -> DriftMonitor | None:
+    """The process-wide monitor, or None when monitoring is off or there is no reference.
+
+    Never touches the file system: every ``REFERENCE_CHECK_SECONDS`` it hands
+    a ``refresh_monitor`` call to a background thread, so a retrain's new
+    profile starts a fresh monitor shortly after it is written.
+    """
+    global _refreshing
+    if not monitoring_enabled():
+        return None
+    if time.monotonic() - _checked_at >= REFERENCE_CHECK_SECONDS and not _refreshing:
+        _refreshing = True
+        threading.Thread(
+            target=_refresh_in_background, name="drift-reference", daemon=True
+        ).start()
+    return _monitor
+
+
+def reset_monitor() -> None:
+    global _monitor, _monitor_mtime, _failed_mtime, _checked_at
+    with _monitor_lock:
+        _monitor = _monitor_mtime = _failed_mtime = None
+        _checked_at = 0.0
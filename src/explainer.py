@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+
+def _feature_sources(preprocessor, n_features: int) -> tuple[list[str], np.ndarray]:
+    """Map every transformed feature back to the input column it came from."""
+    from sklearn.preprocessing import OneHotEncoder
+
+    sources: list[str] = []
+    index: list[int] = []
+    for _name, transformer, columns in preprocessor.transformers_:
+        if isinstance(transformer, str) and transformer == "drop":
+            continue
+        one_hot = isinstance(transformer, OneHotEncoder)
+        for position, column in enumerate(columns):
+            width = len(transformer.categories_[position]) if one_hot else 1
+            sources.append(column)
+            index.extend([len(sources) - 1] * width)
+
+    if len(index) != n_features:
+        raise ValueError(
+            f"Could not map {n_features} transformed features to input columns."
+        )
+    return sources, np.asarray(index, dtype=np.intp)
+
+
+def _top_indices(impacts: np.ndarray, top_n: int) -> np.ndarray:
+    """Column indices of the ``top_n`` largest ``|impact|`` per row, sorted."""
+    magnitude = np.abs(impacts)
+    n_rows, n_cols = magnitude.shape
+    top_n = min(max(int(top_n), 0), n_cols)
+    if top_n == 0:
+        return np.empty((n_rows, 0), dtype=np.intp)
+    if top_n < n_cols:
+        candidates = np.argpartition(-magnitude, top_n - 1, axis=1)[:, :top_n]
+    else:
+        candidates = np.tile(np.arange(n_cols), (n_rows, 1))
+    order = np.argsort(
+        -np.take_along_axis(magnitude, candidates, axis=1), axis=1, kind="stable"
+    )
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+class ModelExplainer:
+    """SHAP explanations for a fitted preprocess/model pipeline.
+
+    Built once per loaded model: the ``TreeExplainer`` and the mapping from
+    one-hot columns back to their source column are reused for every call.
+    """
+
+    def __init__(self, model):
+        import shap
+
+        # Memory-mapped bundles hand out the full sklearn pipeline on demand.
+        model = getattr(model, "sklearn_pipeline", model)
+        self.preprocessor = model.named_steps["preprocess"]
+        self.explainer = shap.TreeExplainer(model.named_steps["model"])
+        self.feature_names = np.asarray(
+            [str(name) for name in self.preprocessor.get_feature_names_out()]
+        )
+        self.source_columns, source_index = _feature_sources(
+            self.preprocessor, len(self.feature_names)
+        )
+        self._fold_matrix = np.zeros((len(self.feature_names), len(self.source_columns)))
+        self._fold_matrix[np.arange(len(source_index)), source_index] = 1.0
+
+    def shap_values(self, input_df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+        X = self.preprocessor.transform(input_df)
+        if hasattr(X, "toarray"):
+            X = X.toarray()
+        values = self.explainer.shap_values(X)
+        if isinstance(values, list):
+            values = values[0]
+        return np.asarray(X, dtype=np.float64), np.asarray(values, dtype=np.float64)
+
+    def fold(self, shap_values: np.ndarray) -> np.ndarray:
+        return shap_values @ self._fold_matrix
+
+    def explain(
+        self,
+        input_df: pd.DataFrame,
+        top_n: int = 10,
+        fold_categories: bool = False,
+    ) -> list[list[dict]]:
+        X, values = self.shap_values(input_df)
+        if fold_categories:
+            impacts = self.fold(values)
+            names = np.asarray(self.source_columns)
+            shown = input_df[self.source_columns].to_numpy()
+        else:
+            impacts = values
+            names = self.feature_names
+            shown = X
+
+        top = _top_indices(impacts, top_n)
+        results = []
+        for row, columns in enumerate(top):
+            results.append(
+                [
+                    {
+                        "feature": str(names[col]),
+                        "value": _jsonable(shown[row, col]),
+                        "impact": float(impacts[row, col]),
+                    }
+                    for col in columns
+                ]
+            )
+        return results
+
+
+def _jsonable(value):
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return float(value)
+    return str(value)
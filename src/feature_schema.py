@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+from typing import Any, Mapping
+
+import numpy as np
+import pandas as pd
+
+
+TARGET = "Units Sold"
+
+CATEGORICAL_COLUMNS = [
+    "Store ID",
+    "Product ID",
+    "Category",
+    "Region",
+    "Weather Condition",
+    "Seasonality",
+]
+
+INTEGER_COLUMNS = [
+    "Inventory Level",
+    "Units Ordered",
+    "Discount",
+    "Holiday/Promotion",
+    "day_of_week",
+    "month",
+    "day",
+    "is_weekend",
+]
+
+FLOAT_COLUMNS = [
+    "Demand Forecast",
+    "Price",
+    "Competitor Pricing",
+]
+
+FEATURE_COLUMNS = [
+    "Store ID",
+    "Product ID",
+    "Category",
+    "Region",
+    "Inventory Level",
+    "Units Ordered",
+    "Demand Forecast",
+    "Price",
+    "Discount",
+    "Weather Condition",
+    "Holiday/Promotion",
+    "Competitor Pricing",
+    "Seasonality",
+    "day_of_week",
+    "month",
+    "day",
+    "is_weekend",
+]
+
+NUMERIC_COLUMNS = [c for c in FEATURE_COLUMNS if c not in CATEGORICAL_COLUMNS]
+
+# Derived from Date by data_transformation.transform.
+CALENDAR_COLUMNS = ["day_of_week", "month", "day", "is_weekend"]
+
+# One demand series per store/product pair.
+SERIES_KEYS = ["Store ID", "Product ID"]
+
+# History features built by lag_features; never part of API payloads.
+LAG_FEATURE_COLUMNS = [
+    "units_sold_lag_1",
+    "units_sold_lag_7",
+    "units_sold_lag_14",
+    "units_sold_roll_mean_7",
+    "units_sold_roll_std_7",
+    "units_sold_roll_mean_28",
+    "units_sold_roll_std_28",
+    "days_since_promotion",
+]
+
+# API payloads use identifier-safe names ("Store_ID"); the model uses the CSV
+# headers ("Store ID").
+FIELD_TO_COLUMN = {
+    "Store_ID": "Store ID",
+    "Product_ID": "Product ID",
+    "Category": "Category",
+    "Region": "Region",
+    "Inventory_Level": "Inventory Level",
+    "Units_Ordered": "Units Ordered",
+    "Demand_Forecast": "Demand Forecast",
+    "Price": "Price",
+    "Discount": "Discount",
+    "Weather_Condition": "Weather Condition",
+    "Holiday_Promotion": "Holiday/Promotion",
+    "Competitor_Pricing": "Competitor Pricing",
+    "Seasonality": "Seasonality",
+    "day_of_week": "day_of_week",
+    "month": "month",
+    "day": "day",
+    "is_weekend": "is_weekend",
+}
+
+
+def frame_from_payload(
+    rows: list[Mapping[str, Any]] | None = None,
+    columns: Mapping[str, list[Any]] | None = None,
+) -> pd.DataFrame:
+    if (rows is None) == (columns is None):
+        raise ValueError("Provide exactly one of 'rows' or 'columns'.")
+    if columns is not None:
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("All columns must have the same length.")
+        frame = pd.DataFrame(dict(columns))
+    else:
+        frame = pd.DataFrame.from_records(rows) if rows else pd.DataFrame()
+    return frame.rename(columns=FIELD_TO_COLUMN)
+
+
+def validate_features(frame: pd.DataFrame) -> tuple[pd.DataFrame, np.ndarray]:
+    """Coerce ``frame`` to model dtypes column by column.
+
+    Returns the coerced feature frame and an object array holding an error
+    message for each invalid row (``None`` for valid rows). Validation runs
+    once per column, never once per row.
+    """
+    n_rows = len(frame)
+    errors = np.full(n_rows, None, dtype=object)
+    out = {}
+
+    def flag(mask: np.ndarray, message: str) -> None:
+        pending = mask & pd.isna(errors)
+        errors[pending] = message
+
+    for col in FEATURE_COLUMNS:
+        if col not in frame.columns:
+            errors[pd.isna(errors)] = f"{col}: field required"
+            out[col] = pd.Series(np.nan, index=frame.index)
+            continue
+
+        raw = frame[col]
+        if col in CATEGORICAL_COLUMNS:
+            missing = raw.isna().to_numpy()
+            flag(missing, f"{col}: field required")
+            out[col] = raw.astype(str)
+            continue
+
+        values = pd.to_numeric(raw, errors="coerce")
+        invalid = values.isna().to_numpy()
+        flag(invalid & raw.isna().to_numpy(), f"{col}: field required")
+        flag(invalid, f"{col}: must be a number")
+        if col in INTEGER_COLUMNS:
+            fractional = ~invalid & (values.fillna(0).to_numpy() % 1 != 0)
+            flag(fractional, f"{col}: must be an integer")
+            out[col] = values.fillna(0).astype(np.int64)
+        else:
+            out[col] = values.astype(np.float64)
+
+    features = pd.DataFrame(out, index=frame.index)[FEATURE_COLUMNS]
+    return features, errors
@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from data_transformation import transform
+from feature_schema import (
+    CALENDAR_COLUMNS,
+    CATEGORICAL_COLUMNS,
+    FEATURE_COLUMNS,
+    FLOAT_COLUMNS,
+    INTEGER_COLUMNS,
+    SERIES_KEYS,
+)
+from logger import get_logger
+
+
+logger = get_logger(__name__)
+
+DEFAULT_STORE_PATH = Path(
+    os.getenv("FEATURE_STORE_PATH", Path("artifacts") / "features" / "feature_store.sqlite")
+)
+# Latest known value per series; calendar fields come from the request date.
+STORED_COLUMNS = [
+    c for c in FEATURE_COLUMNS if c not in SERIES_KEYS and c not in CALENDAR_COLUMNS
+]
+# SQLite allows 999 bound variables per statement on older builds.
+FETCH_CHUNK = 400
+
+
+def _quote(column: str) -> str:
+    return '"' + column.replace('"', '""') + '"'
+
+
+def _sql_type(column: str) -> str:
+    if column in INTEGER_COLUMNS:
+        return "INTEGER"
+    if column in FLOAT_COLUMNS:
+        return "REAL"
+    return "TEXT"
+
+
+_COLUMNS = SERIES_KEYS + STORED_COLUMNS + ["as_of"]
+_SELECT = ", ".join(map(_quote, _COLUMNS))
+_KEY = f"({', '.join(map(_quote, SERIES_KEYS))})"
+
+
+class FeatureStore:
+    """Latest feature values per (Store ID, Product ID), kept in SQLite.
+
+    Rows are stored in a ``WITHOUT ROWID`` table clustered on the key, so a
+    lookup is a single primary-key probe, and bulk fetches read many keys
+    per statement. Connections are per thread, in WAL mode, so API workers
+    can read while a refresh job writes.
+    """
+
+    def __init__(self, path: str | Path = DEFAULT_STORE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.keys_requested = 0
+        self.misses = 0
+        self._latencies_ms: deque[float] = deque(maxlen=10_000)
+        columns = ", ".join(
+            f"{_quote(c)} {_sql_type(c)}" for c in SERIES_KEYS + STORED_COLUMNS
+        )
+        with self._connect() as conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS features ({columns}, as_of TEXT, "
+                f"PRIMARY KEY {_KEY}) WITHOUT ROWID"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    @property
+    def watermark(self) -> pd.Timestamp | None:
+        row = self._connect().execute(
+            "SELECT value FROM meta WHERE key = 'watermark'"
+        ).fetchone()
+        return pd.Timestamp(row[0]) if row else None
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM features").fetchone()[0]
+
+    def _upsert(self, df: pd.DataFrame) -> int:
+        latest = (
+            df.sort_values("Date", kind="stable")
+            .drop_duplicates(SERIES_KEYS, keep="last")
+        )
+        as_of = pd.to_datetime(latest["Date"]).dt.strftime("%Y-%m-%d")
+        # Series.tolist() yields Python scalars, which sqlite3 can bind.
+        rows = list(
+            zip(
+                *(
+                    latest[c].astype(str).tolist()
+                    if c in CATEGORICAL_COLUMNS
+                    else latest[c].tolist()
+                    for c in SERIES_KEYS + STORED_COLUMNS
+                ),
+                as_of.tolist(),
+            )
+        )
+        placeholders = ", ".join("?" * (len(STORED_COLUMNS) + 3))
+        watermark = pd.Timestamp(pd.to_datetime(df["Date"]).max()).isoformat()
+        with self._connect() as conn:
+            conn.executemany(f"INSERT OR REPLACE INTO features VALUES ({placeholders})", rows)
+            conn.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('watermark', ?)", (watermark,)
+            )
+        return len(rows)
+
+    def materialize(self, df: pd.DataFrame) -> int:
+        """Rebuild the store from ``df`` (ingested rows with a ``Date``)."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM features")
+            conn.execute("DELETE FROM meta")
+        count = self._upsert(df)
+        logger.info("Materialized %d series into %s", count, self.path)
+        return count
+
+    def refresh(self, df: pd.DataFrame) -> int:
+        """Upsert only the series that have rows newer than the watermark."""
+        watermark = self.watermark
+        if watermark is None:
+            return self.materialize(df)
+        newer = df[pd.to_datetime(df["Date"]) > watermark]
+        if newer.empty:
+            logger.info("Feature store already up to date at %s", watermark.date())
+            return 0
+        count = self._upsert(newer)
+        logger.info("Refreshed %d series from %d new rows", count, len(newer))
+        return count
+
+    def _record(self, start: float, n_keys: int, misses: int) -> None:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.lookups += 1
+            self.keys_requested += n_keys
+            self.misses += misses
+            self._latencies_ms.append(elapsed_ms)
+
+    def fetch(self, keys: list[tuple[str, str]]) -> pd.DataFrame:
+        """Stored rows for ``keys``, in order; unknown keys come back as NaN."""
+        start = time.perf_counter()
+        keys = [(str(store), str(product)) for store, product in keys]
+        unique = list(dict.fromkeys(keys))
+        conn = self._connect()
+        found = {}
+        for offset in range(0, len(unique), FETCH_CHUNK):
+            chunk = unique[offset : offset + FETCH_CHUNK]
+            values = ", ".join(["(?, ?)"] * len(chunk))
+            for row in conn.execute(
+                f"SELECT {_SELECT} FROM features WHERE {_KEY} IN (VALUES {values})",
+                [part for key in chunk for part in key],
+            ):
+                found[row[:2]] = row
+        blank = (None,) * (len(STORED_COLUMNS) + 1)
+        result = pd.DataFrame.from_records(
+            [found.get(key, key + blank) for key in keys], columns=_COLUMNS
+        )
+        self._record(start, len(keys), len(keys) - sum(key in found for key in keys))
+        return result
+
+    def get(self, store_id: str, product_id: str) -> dict | None:
+        """Single-key lookup: one primary-key probe, no DataFrame."""
+        start = time.perf_counter()
+        row = self._connect().execute(
+            f"SELECT {_SELECT} FROM features WHERE {_KEY} = (?, ?)",
+            (str(store_id), str(product_id)),
+        ).fetchone()
+        self._record(start, 1, int(row is None))
+        return None if row is None else dict(zip(_COLUMNS, row))
+
+    def fetch_all(self) -> pd.DataFrame:
+        """Every stored series, ordered by key."""
+        rows = self._connect().execute(
+            f"SELECT {_SELECT} FROM features ORDER BY {_KEY[1:-1]}"
+        ).fetchall()
+        return pd.DataFrame.from_records(rows, columns=_COLUMNS)
+
+    def build_features(
+        self,
+        keys: list[tuple[str, str]],
+        dates: list | None = None,
+        overrides: list[dict] | None = None,
+    ) -> tuple[pd.DataFrame, np.ndarray]:
+        """Feature rows for ``keys``, filled from the store.
+
+        Calendar fields come from ``dates``; by default, that is the day after
+        each series' ``as_of``. ``overrides`` (column name -> value per row)
+        replace stored values. Returns the frame and a mask of unknown keys.
+        """
+        frame = self.fetch(keys)
+        missing = frame["as_of"].isna().to_numpy()
+        as_of = pd.to_datetime(frame["as_of"])
+        date = as_of + pd.Timedelta(days=1)
+        if dates is not None:
+            given = pd.to_datetime(pd.Series(dates, index=frame.index))
+            date = given.fillna(date)
+        frame = transform(frame.assign(Date=date))
+
+        if overrides:
+            patch = pd.DataFrame.from_records(overrides, index=frame.index)
+            unknown = set(patch.columns) - set(FEATURE_COLUMNS)
+            if unknown:
+                raise ValueError(f"Unknown override fields: {sorted(unknown)}")
+            for column in patch.columns:
+                given = patch[column].notna()
+                frame[column] = frame[column].astype(object).where(~given, patch[column])
+        return frame[FEATURE_COLUMNS], missing
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = np.asarray(self._latencies_ms, dtype=float)
+            return {
+                "path": str(self.path),
+                "series": len(self),
+                "watermark": None if self.watermark is None else self.watermark.isoformat(),
+                "lookups": self.lookups,
+                "keys_requested": self.keys_requested,
+                "misses": self.misses,
+                "read_ms_p50": float(np.percentile(latencies, 50)) if latencies.size else 0.0,
+                "read_ms_p95": float(np.percentile(latencies, 95)) if latencies.size else 0.0,
+                "read_ms_p99": float(np.percentile(latencies, 99)) if latencies.size else 0.0,
+            }
+
+
+_store_lock = threading.Lock()
+_stores: dict[Path, FeatureStore] = {}
+
+
+def get_feature_store(path: str | Path = DEFAULT_STORE_PATH) -> FeatureStore:
+    path = Path(path).resolve()
+    if not path.exists():
+        raise FileNotFoundError(
+            f"Feature store not found at {path}. Run `python src/feature_store.py` first."
+        )
+    with _store_lock:
+        if path not in _stores:
+            _stores[path] = FeatureStore(path)
+        return _stores[path]
+
+
+def main(argv: list[str] | None = None) -> None:
+    from data_ingestion import ingest
+
+    parser = argparse.ArgumentParser(description="Materialize or refresh the feature store.")
+    parser.add_argument("--data", default=str(Path("data") / "retail_store_inventory.csv"))
+    parser.add_argument("--store", default=str(DEFAULT_STORE_PATH))
+    parser.add_argument("--full", action="store_true", help="Rebuild instead of refreshing")
+    args = parser.parse_args(argv)
+
+    store = FeatureStore(args.store)
+    df = ingest(args.data)
+    start = time.perf_counter()
+    count = store.materialize(df) if args.full else store.refresh(df)
+    logger.info(
+        "Feature store at %s: %d series updated in %.2fs",
+        store.watermark,
+        count,
+        time.perf_counter() - start,
+    )
+
+
+if __name__ == "__main__":
+    main()
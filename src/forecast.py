@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import argparse
+import io
+import time
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+
+import lag_features
+from feature_store import DEFAULT_STORE_PATH, FeatureStore, get_feature_store
+from logger import get_logger
+from model_registry import DEFAULT_MODEL_PATH, ModelRegistry
+from score import ChunkWriter, _ndjson, _require_pyarrow, score_chunks
+
+try:
+    import pyarrow as pa  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+except ModuleNotFoundError:
+    pa = None
+    pq = None
+
+
+logger = get_logger(__name__)
+
+OUTPUT_COLUMNS = ["Date", "Store ID", "Product ID", "prediction"]
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def grid_chunks(
+    series: pd.DataFrame,
+    start: pd.Timestamp,
+    days: int,
+    chunk_rows: int = 50_000,
+) -> Iterator[pd.DataFrame]:
+    """Yield the ``series`` x dates grid, a few whole days at a time.
+
+    Only one chunk of the grid exists at a time; the calendar fields are
+    left to ``data_transformation.transform`` (via ``score_chunk``).
+    """
+    n_series = len(series)
+    if n_series == 0:
+        return
+    dates = pd.date_range(start, periods=days, freq="D")
+    days_per_chunk = max(1, chunk_rows // n_series)
+    positions = np.arange(n_series)
+    for offset in range(0, days, days_per_chunk):
+        block = dates[offset : offset + days_per_chunk]
+        chunk = series.iloc[np.tile(positions, len(block))].reset_index(drop=True)
+        chunk["Date"] = np.repeat(block.to_numpy(), n_series)
+        yield chunk
+
+
+def forecast_chunks(
+    start: str | pd.Timestamp | None = None,
+    days: int = 7,
+    stores: list[str] | None = None,
+    products: list[str] | None = None,
+    chunk_rows: int = 50_000,
+    workers: int = 1,
+    model_path: str | Path = DEFAULT_MODEL_PATH,
+    store: FeatureStore | None = None,
+    registry: ModelRegistry | None = None,
+) -> Iterator[pd.DataFrame]:
+    """Forecast every stored store/product for ``days`` days from ``start``.
+
+    Non-calendar features are each series' latest values in the feature
+    store. ``start`` defaults to the day after the store's watermark. Lag
+    features, when the model uses them, come from the series state and are
+    not rolled forward day by day.
+    """
+    store = store or get_feature_store()
+    series = store.fetch_all().drop(columns="as_of")
+    if stores:
+        series = series[series["Store ID"].isin(stores)]
+    if products:
+        series = series[series["Product ID"].isin(products)]
+    if start is None:
+        watermark = store.watermark
+        if watermark is None:
+            raise FileNotFoundError("Feature store is empty. Materialize it first.")
+        start = watermark + pd.Timedelta(days=1)
+    start = pd.Timestamp(start).normalize()
+
+    chunks = grid_chunks(series, start, days, chunk_rows)
+    if lag_features.DEFAULT_STATE_PATH.exists():
+        state = lag_features.get_state_store()
+        chunks = (chunk.join(state.lookup(chunk, any_day=True)) for chunk in chunks)
+    for scored in score_chunks(chunks, model_path, workers, registry):
+        yield scored[OUTPUT_COLUMNS]
+
+
+class _ByteSink(io.RawIOBase):
+    """Write-only file that hands out what was written since the last drain."""
+
+    def __init__(self):
+        self._parts: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def encode_stream(chunks: Iterable[pd.DataFrame], fmt: str) -> Iterator[bytes]:
+    """Encode scored chunks as they arrive; Parquet writes one row group each."""
+    if fmt not in MEDIA_TYPES:
+        raise ValueError(f"Unknown format {fmt!r}; expected one of {sorted(MEDIA_TYPES)}.")
+    if fmt == "parquet":
+        _require_pyarrow()
+        sink = _ByteSink()
+        writer = None
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(sink, table.schema)
+            writer.write_table(table)
+            yield sink.drain()
+        if writer is not None:
+            writer.close()
+        yield sink.drain()
+        return
+
+    header = True
+    for chunk in chunks:
+        chunk = chunk.assign(Date=pd.to_datetime(chunk["Date"]).dt.strftime("%Y-%m-%d"))
+        if fmt == "ndjson":
+            yield _ndjson(chunk).encode("utf-8")
+        else:
+            yield chunk.to_csv(index=False, header=header).encode("utf-8")
+            header = False
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Forecast every store x product over a date range."
+    )
+    parser.add_argument("output", help="Output .csv, .ndjson or .parquet file")
+    parser.add_argument("--start", default=None, help="First day (default: day after the store watermark)")
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--store", default=str(DEFAULT_STORE_PATH))
+    parser.add_argument("--model", default=str(DEFAULT_MODEL_PATH))
+    parser.add_argument("--chunk-rows", type=int, default=50_000)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    writer = ChunkWriter(Path(args.output))
+    start = time.perf_counter()
+    total_rows = 0
+    try:
+        for chunk in forecast_chunks(
+            start=args.start,
+            days=args.days,
+            chunk_rows=args.chunk_rows,
+            workers=args.workers,
+            model_path=args.model,
+            store=get_feature_store(args.store),
+        ):
+            writer.write(chunk)
+            total_rows += len(chunk)
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - start
+    logger.info(
+        "Forecast %d rows into %s in %.2fs (%.0f rows/s)",
+        total_rows,
+        args.output,
+        elapsed,
+        total_rows / elapsed if elapsed > 0 else float("inf"),
+    )
+
+
+if __name__ == "__main__":
+    main()
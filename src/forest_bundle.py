@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+BUNDLE_FORMAT_VERSION = 1
+BUNDLE_ARRAYS = ("left", "right", "feature", "threshold", "value", "roots")
+# Rows are traversed in blocks so the (rows x trees) node matrix stays small.
+PREDICT_BLOCK_ROWS = 4096
+
+
+def supports_bundle(pipeline) -> bool:
+    steps = getattr(pipeline, "named_steps", {})
+    estimator = steps.get("model")
+    estimators = getattr(estimator, "estimators_", None)
+    return (
+        "preprocess" in steps
+        and bool(estimators)
+        and all(hasattr(tree, "tree_") for tree in estimators)
+        and getattr(estimator, "n_outputs_", 1) == 1
+    )
+
+
+def flatten_forest(estimator) -> dict[str, np.ndarray]:
+    """Concatenate every tree's node arrays into one contiguous set.
+
+    Child indices are shifted to global node ids; leaves keep ``-1``.
+    """
+    trees = [tree.tree_ for tree in estimator.estimators_]
+    counts = np.array([tree.node_count for tree in trees], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+    def shifted(children: np.ndarray, offset: int) -> np.ndarray:
+        return np.where(children == -1, -1, children + offset).astype(np.int32)
+
+    return {
+        "left": np.concatenate(
+            [shifted(t.children_left, o) for t, o in zip(trees, offsets)]
+        ),
+        "right": np.concatenate(
+            [shifted(t.children_right, o) for t, o in zip(trees, offsets)]
+        ),
+        "feature": np.concatenate([t.feature for t in trees]).astype(np.int32),
+        "threshold": np.concatenate([t.threshold for t in trees]).astype(np.float64),
+        "value": np.concatenate([t.value[:, 0, 0] for t in trees]).astype(np.float64),
+        "roots": offsets.astype(np.int32),
+    }
+
+
+def leaf_nodes(arrays: dict[str, np.ndarray], X: np.ndarray) -> np.ndarray:
+    """(rows x trees) leaf node ids reached by each row of dense float32 ``X``."""
+    left = arrays["left"]
+    right = arrays["right"]
+    feature = arrays["feature"]
+    threshold = arrays["threshold"]
+    roots = np.asarray(arrays["roots"])
+    rows = np.arange(len(X))[:, None]
+    nodes = np.broadcast_to(roots, (len(X), len(roots))).copy()
+    while True:
+        children = left[nodes]
+        internal = children != -1
+        if not internal.any():
+            return nodes
+        go_left = X[rows, feature[nodes]] <= threshold[nodes]
+        nodes = np.where(internal, np.where(go_left, children, right[nodes]), nodes)
+
+
+def predict_flat(arrays: dict[str, np.ndarray], X: np.ndarray) -> np.ndarray:
+    """Average the leaf values of all trees for each row of dense ``X``.
+
+    Mirrors sklearn: features are compared as float32 against float64
+    thresholds and tree outputs are summed in tree order.
+    """
+    X = np.asarray(X, dtype=np.float32)
+    value = arrays["value"]
+    n_trees = len(arrays["roots"])
+
+    out = np.empty(len(X), dtype=np.float64)
+    for start in range(0, len(X), PREDICT_BLOCK_ROWS):
+        block = X[start : start + PREDICT_BLOCK_ROWS]
+        leaf_values = value[leaf_nodes(arrays, block)]
+        total = np.zeros(len(block), dtype=np.float64)
+        for tree in range(leaf_values.shape[1]):
+            total += leaf_values[:, tree]
+        out[start : start + len(block)] = total / n_trees
+    return out
+
+
+class MappedForestPipeline:
+    """Drop-in ``predict`` for a preprocess + forest pipeline stored as a bundle.
+
+    The node arrays are memory-mapped read-only, so workers that load the
+    same bundle share its pages through the OS page cache.
+    """
+
+    def __init__(
+        self,
+        preprocessor,
+        arrays: dict[str, np.ndarray],
+        sklearn_path: Path | None = None,
+        sklearn_sha256: str | None = None,
+    ):
+        self.preprocessor = preprocessor
+        self.arrays = arrays
+        self.sklearn_path = sklearn_path
+        self.sklearn_sha256 = sklearn_sha256
+        self._sklearn_pipeline = None
+
+    @property
+    def n_estimators(self) -> int:
+        return len(self.arrays["roots"])
+
+    def transform(self, input_df: pd.DataFrame) -> np.ndarray:
+        X = self.preprocessor.transform(input_df)
+        if hasattr(X, "toarray"):
+            X = X.toarray()
+        return np.asarray(X, dtype=np.float32)
+
+    def predict(self, input_df: pd.DataFrame) -> np.ndarray:
+        return self.predict_transformed(self.transform(input_df))
+
+    def predict_transformed(self, X: np.ndarray) -> np.ndarray:
+        return predict_flat(self.arrays, X)
+
+    @property
+    def sklearn_pipeline(self):
+        """The full sklearn pipeline, unpickled on first use (e.g. for SHAP).
+
+        The pickle may have been replaced since the bundle was loaded, so its
+        sha256 is checked against ``sklearn_sha256`` before it is used.
+        """
+        if self._sklearn_pipeline is None:
+            if self.sklearn_path is None:
+                raise FileNotFoundError("No pickle fallback available for this bundle.")
+            data = Path(self.sklearn_path).read_bytes()
+            if self.sklearn_sha256 is not None:
+                digest = hashlib.sha256(data).hexdigest()
+                if digest != self.sklearn_sha256:
+                    raise RuntimeError(
+                        f"{self.sklearn_path} changed since bundle {self.sklearn_sha256[:12]} "
+                        f"was loaded (now {digest[:12]}); reload the model."
+                    )
+            self._sklearn_pipeline = pickle.loads(data)
+        return self._sklearn_pipeline
+
+    @property
+    def named_steps(self):
+        return self.sklearn_pipeline.named_steps
+
+
+def save_forest_bundle(pipeline, directory: str | Path, meta: dict | None = None) -> Path:
+    """Write the pipeline's preprocessor and forest node arrays to ``directory``.
+
+    ``pipeline`` may also be a ``MappedForestPipeline`` (e.g. a compressed
+    forest); its arrays are stored with their own dtypes.
+    """
+    directory = Path(directory)
+    if directory.exists():
+        return directory
+
+    tmp_dir = directory.with_name(f"{directory.name}.tmp-{os.getpid()}")
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    tmp_dir.mkdir(parents=True)
+
+    if isinstance(pipeline, MappedForestPipeline):
+        preprocessor, arrays = pipeline.preprocessor, pipeline.arrays
+    else:
+        preprocessor = pipeline.named_steps["preprocess"]
+        arrays = flatten_forest(pipeline.named_steps["model"])
+    for name, array in arrays.items():
+        np.save(tmp_dir / f"{name}.npy", np.ascontiguousarray(array))
+    with (tmp_dir / "preprocess.pkl").open("wb") as f:
+        pickle.dump(preprocessor, f)
+    (tmp_dir / "meta.json").write_text(
+        json.dumps(
+            {
+                "format_version": BUNDLE_FORMAT_VERSION,
+                "n_estimators": len(arrays["roots"]),
+                "n_nodes": len(arrays["left"]),
+                **(meta or {}),
+            },
+            indent=2,
+        ),
+        encoding="utf-8",
+    )
+    os.replace(tmp_dir, directory)
+    return directory
+
+
+def load_forest_bundle(
+    directory: str | Path,
+    mmap: bool = True,
+    sklearn_path: Path | None = None,
+    sklearn_sha256: str | None = None,
+) -> MappedForestPipeline:
+    directory = Path(directory)
+    meta = json.loads((directory / "meta.json").read_text(encoding="utf-8"))
+    if meta.get("format_version") != BUNDLE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported bundle format in {directory}")
+
+    mmap_mode = "r" if mmap else None
+    arrays = {
+        name: np.load(directory / f"{name}.npy", mmap_mode=mmap_mode)
+        for name in BUNDLE_ARRAYS
+    }
+    with (directory / "preprocess.pkl").open("rb") as f:
+        preprocessor = pickle.load(f)
+    return MappedForestPipeline(
+        preprocessor, arrays, sklearn_path=sklearn_path, sklearn_sha256=sklearn_sha256
+    )
+
+
+def bundle_path_for(model_path: Path, version: str) -> Path:
+    return model_path.with_name(f"{model_path.stem}.{version}.bundle")
+
+
+def compressed_bundle_path_for(model_path: Path, version: str) -> Path:
+    """Where the compressed variant of ``model_path`` at ``version`` is stored."""
+    return model_path.with_name(f"{model_path.stem}.{version}.compressed.bundle")
@@ -0,0 +1,368 @@
+from __future__ import annotations
+
+import argparse
+import json
+import pickle
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from forest_bundle import MappedForestPipeline, flatten_forest, leaf_nodes
+from logger import get_logger
+
+
+logger = get_logger(__name__)
+
+VALUE_DTYPES = ("float64", "float32", "float16")
+REPORT_PATH = Path("artifacts") / "reports" / "compression.json"
+
+
+@dataclass
+class CompressionConfig:
+    """How far to shrink a forest.
+
+    ``mae_tolerance`` is relative: 0.01 keeps the smallest tree subset whose
+    MAE is within 1% of the full (pruned) forest's. ``None`` keeps all trees.
+    """
+
+    max_depth: int | None = None
+    max_leaves: int | None = None
+    value_dtype: str = "float32"
+    mae_tolerance: float | None = 0.01
+    min_trees: int = 10
+
+    @classmethod
+    def from_env(cls, environ) -> "CompressionConfig":
+        def optional(name: str, cast, default: str = ""):
+            value = environ.get(name, default)
+            return cast(value) if value not in ("", "none") else None
+
+        return cls(
+            max_depth=optional("COMPRESS_MAX_DEPTH", int),
+            max_leaves=optional("COMPRESS_MAX_LEAVES", int),
+            value_dtype=environ.get("COMPRESS_VALUE_DTYPE", "float32"),
+            mae_tolerance=optional("COMPRESS_MAE_TOLERANCE", float, "0.01"),
+            min_trees=int(environ.get("COMPRESS_MIN_TREES", "10")),
+        )
+
+
+def _subtree_mask(left: np.ndarray, right: np.ndarray, roots: np.ndarray) -> np.ndarray:
+    reachable = np.zeros(len(left), dtype=bool)
+    frontier = np.asarray(roots, dtype=np.int64)
+    while frontier.size:
+        reachable[frontier] = True
+        internal = frontier[left[frontier] != -1]
+        frontier = np.concatenate([left[internal], right[internal]]).astype(np.int64)
+    return reachable
+
+
+def compact(arrays: dict[str, np.ndarray], roots: np.ndarray | None = None) -> dict[str, np.ndarray]:
+    """Drop nodes not reachable from ``roots`` and renumber the rest.
+
+    Node order (and so each tree's contiguous block) is preserved.
+    """
+    left, right = np.asarray(arrays["left"]), np.asarray(arrays["right"])
+    roots = np.asarray(arrays["roots"] if roots is None else roots)
+    keep = _subtree_mask(left, right, roots)
+    new_ids = np.cumsum(keep) - 1
+
+    def remap(children: np.ndarray) -> np.ndarray:
+        children = children[keep]
+        return np.where(children == -1, -1, new_ids[children]).astype(np.int32)
+
+    return {
+        "left": remap(left),
+        "right": remap(right),
+        "feature": np.asarray(arrays["feature"])[keep],
+        "threshold": np.asarray(arrays["threshold"])[keep],
+        "value": np.asarray(arrays["value"])[keep],
+        "roots": new_ids[roots].astype(np.int32),
+    }
+
+
+def prune_depth(arrays: dict[str, np.ndarray], max_depth: int) -> dict[str, np.ndarray]:
+    """Turn every node at ``max_depth`` into a leaf.
+
+    sklearn stores the mean target of each node's training samples, so a
+    collapsed node predicts exactly what its subtree would have on average.
+    """
+    left, right = np.array(arrays["left"]), np.array(arrays["right"])
+    frontier = np.asarray(arrays["roots"], dtype=np.int64)
+    for _depth in range(max_depth):
+        internal = frontier[left[frontier] != -1]
+        frontier = np.concatenate([left[internal], right[internal]]).astype(np.int64)
+    left[frontier] = -1
+    right[frontier] = -1
+    return compact({**arrays, "left": left, "right": right})
+
+
+def prune_leaves(arrays: dict[str, np.ndarray], max_leaves: int) -> dict[str, np.ndarray]:
+    """Keep at most ``max_leaves`` leaves per tree, expanding nodes breadth-first."""
+    left, right = np.array(arrays["left"]), np.array(arrays["right"])
+    for root in np.asarray(arrays["roots"]):
+        leaves, frontier = 1, [int(root)]
+        while frontier:
+            next_frontier = []
+            for node in frontier:
+                if left[node] == -1:
+                    continue
+                if leaves < max_leaves:
+                    leaves += 1  # splitting a leaf adds one
+                    next_frontier += [left[node], right[node]]
+                else:
+                    left[node] = right[node] = -1
+            frontier = next_frontier
+    return compact({**arrays, "left": left, "right": right})
+
+
+def float32_thresholds(threshold: np.ndarray) -> np.ndarray:
+    """Round thresholds down to float32 without changing any split decision.
+
+    Features are float32, so ``x <= t`` equals ``x <= t32`` as long as t32 is
+    the largest float32 not above ``t``.
+    """
+    threshold = np.asarray(threshold, dtype=np.float64)
+    rounded = threshold.astype(np.float32)
+    too_high = rounded.astype(np.float64) > threshold
+    rounded[too_high] = np.nextafter(rounded[too_high], np.float32(-np.inf))
+    return rounded
+
+
+def quantize(arrays: dict[str, np.ndarray], value_dtype: str = "float32") -> dict[str, np.ndarray]:
+    if value_dtype not in VALUE_DTYPES:
+        raise ValueError(f"value_dtype must be one of {VALUE_DTYPES}, got {value_dtype!r}")
+    feature = np.asarray(arrays["feature"])
+    feature_dtype = np.int16 if feature.max(initial=0) < np.iinfo(np.int16).max else np.int32
+    return {
+        **arrays,
+        "feature": feature.astype(feature_dtype),
+        "threshold": float32_thresholds(arrays["threshold"]),
+        "value": np.asarray(arrays["value"]).astype(value_dtype),
+    }
+
+
+def tree_predictions(arrays: dict[str, np.ndarray], X: np.ndarray) -> np.ndarray:
+    """(rows x trees) matrix of each tree's prediction."""
+    X = np.asarray(X, dtype=np.float32)
+    return np.asarray(arrays["value"], dtype=np.float64)[leaf_nodes(arrays, X)]
+
+
+def select_trees(
+    per_tree: np.ndarray, y: np.ndarray, tolerance: float, min_trees: int = 1
+) -> list[int]:
+    """Greedily add the tree that lowers MAE most until within ``tolerance`` of all trees.
+
+    Returns tree indices in their original order.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n_trees = per_tree.shape[1]
+    target = np.abs(per_tree.mean(axis=1) - y).mean() * (1 + tolerance)
+    remaining = np.ones(n_trees, dtype=bool)
+    selected: list[int] = []
+    total = np.zeros(len(y))
+    while remaining.any():
+        candidates = np.flatnonzero(remaining)
+        maes = np.abs(
+            (total[:, None] + per_tree[:, candidates]) / (len(selected) + 1) - y[:, None]
+        ).mean(axis=0)
+        best = candidates[np.argmin(maes)]
+        selected.append(int(best))
+        remaining[best] = False
+        total += per_tree[:, best]
+        if len(selected) >= min_trees and maes.min() <= target:
+            break
+    return sorted(selected)
+
+
+def _forest_parts(pipeline) -> tuple[object, dict[str, np.ndarray]]:
+    if isinstance(pipeline, MappedForestPipeline):
+        return pipeline.preprocessor, pipeline.arrays
+    return pipeline.named_steps["preprocess"], flatten_forest(pipeline.named_steps["model"])
+
+
+def compress_forest(
+    pipeline,
+    X_select: pd.DataFrame,
+    y_select,
+    config: CompressionConfig | None = None,
+) -> MappedForestPipeline:
+    """Prune, subset and quantize a preprocess + forest pipeline.
+
+    ``X_select``/``y_select`` pick the tree subset and should not be the rows
+    used to report the compressed model's MAE.
+    """
+    config = config or CompressionConfig()
+    preprocessor, arrays = _forest_parts(pipeline)
+    if config.max_depth is not None:
+        arrays = prune_depth(arrays, config.max_depth)
+    if config.max_leaves is not None:
+        arrays = prune_leaves(arrays, config.max_leaves)
+    if config.mae_tolerance is not None:
+        X = MappedForestPipeline(preprocessor, arrays).transform(X_select)
+        trees = select_trees(
+            tree_predictions(arrays, X), y_select, config.mae_tolerance, config.min_trees
+        )
+        arrays = compact(arrays, roots=np.asarray(arrays["roots"])[trees])
+    arrays = quantize(arrays, config.value_dtype)
+    return MappedForestPipeline(preprocessor, arrays)
+
+
+def _size_mb(model) -> float:
+    if isinstance(model, MappedForestPipeline):
+        size = sum(array.nbytes for array in model.arrays.values())
+        size += len(pickle.dumps(model.preprocessor, protocol=pickle.HIGHEST_PROTOCOL))
+    else:
+        size = len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+    return size / (1024 * 1024)
+
+
+def _p95_ms(predict, frames: list[pd.DataFrame]) -> float:
+    predict(frames[0])
+    samples = []
+    for frame in frames:
+        start = time.perf_counter()
+        predict(frame)
+        samples.append((time.perf_counter() - start) * 1000)
+    return float(np.percentile(samples, 95))
+
+
+def compression_report(
+    original,
+    compressed: MappedForestPipeline,
+    X_test: pd.DataFrame,
+    y_test,
+    repeat: int = 50,
+    batch_rows: int = 1000,
+) -> dict:
+    """Size, MAE and p95 latency (one row and one batch) of each variant.
+
+    ``flat`` is the uncompressed forest served from its node arrays, which
+    separates the effect of the array format from that of compression.
+    Variants ending in ``+compiled`` use the numba predictor when installed.
+    """
+    from compiled_predictor import CompiledPredictor, _predict_kernel
+
+    preprocessor, arrays = _forest_parts(original)
+    flat = MappedForestPipeline(preprocessor, arrays)
+    # name -> (predictor, forest it serves, object whose size is reported)
+    variants = {
+        "flat": (flat, flat, flat),
+        "compressed": (compressed, compressed, compressed),
+    }
+    if not isinstance(original, MappedForestPipeline):
+        variants = {"original": (original, flat, original), **variants}
+    if _predict_kernel is not None:
+        variants["flat+compiled"] = (CompiledPredictor.from_pipeline(flat), flat, flat)
+        variants["compressed+compiled"] = (
+            CompiledPredictor.from_pipeline(compressed), compressed, compressed
+        )
+
+    y_test = np.asarray(y_test, dtype=np.float64)
+    singles = [X_test.iloc[[i % len(X_test)]] for i in range(repeat)]
+    batches = [X_test.iloc[:batch_rows]] * max(5, repeat // 10)
+    report = {}
+    for name, (model, forest, sized) in variants.items():
+        report[name] = {
+            "size_mb": round(_size_mb(sized), 3),
+            "n_trees": int(len(forest.arrays["roots"])),
+            "n_nodes": int(len(forest.arrays["left"])),
+            "mae": float(np.abs(model.predict(X_test) - y_test).mean()),
+            "p95_ms_1_row": round(_p95_ms(model.predict, singles), 4),
+            f"p95_ms_{batch_rows}_rows": round(_p95_ms(model.predict, batches), 4),
+        }
+    base = report.get("original", report["flat"])
+    report["compressed"]["vs_original"] = {
+        "size": round(report["compressed"]["size_mb"] / base["size_mb"], 4),
+        "mae": round(report["compressed"]["mae"] / base["mae"] - 1, 4),
+    }
+    return report
+
+
+def compress_and_report(
+    pipeline,
+    X_holdout: pd.DataFrame,
+    y_holdout,
+    config: CompressionConfig | None = None,
+    random_state: int = 42,
+) -> tuple[MappedForestPipeline, dict]:
+    """Select trees on one half of the holdout and report on the other."""
+    config = config or CompressionConfig()
+    order = np.random.default_rng(random_state).permutation(len(X_holdout))
+    select, report_rows = order[: len(order) // 2], order[len(order) // 2 :]
+    y_holdout = np.asarray(y_holdout)
+    start = time.perf_counter()
+    compressed = compress_forest(pipeline, X_holdout.iloc[select], y_holdout[select], config)
+    compress_seconds = time.perf_counter() - start
+    report = {
+        "config": asdict(config),
+        "compress_seconds": round(compress_seconds, 3),
+        "report_rows": len(report_rows),
+        "variants": compression_report(
+            pipeline, compressed, X_holdout.iloc[report_rows], y_holdout[report_rows]
+        ),
+    }
+    summary = report["variants"]["compressed"]
+    logger.info(
+        "Compressed forest to %d trees / %d nodes (%.1f%% of original size, MAE %+.2f%%) in %.2fs",
+        summary["n_trees"],
+        summary["n_nodes"],
+        summary["vs_original"]["size"] * 100,
+        summary["vs_original"]["mae"] * 100,
+        compress_seconds,
+    )
+    return compressed, report
+
+
+def write_report(report: dict, path: Path = REPORT_PATH) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return path
+
+
+def main(argv: list[str] | None = None) -> None:
+    from data_ingestion import ingest
+    from data_transformation import transform
+    from feature_schema import FEATURE_COLUMNS, TARGET
+    from forest_bundle import compressed_bundle_path_for, save_forest_bundle
+    from model_registry import DEFAULT_MODEL_PATH, ModelRegistry
+
+    parser = argparse.ArgumentParser(description="Compress the saved forest and report the trade-off.")
+    parser.add_argument("--model", default=str(DEFAULT_MODEL_PATH))
+    parser.add_argument("--data", default=str(Path("data") / "retail_store_inventory.csv"))
+    parser.add_argument("--rows", type=int, default=20_000, help="Holdout rows to sample from --data")
+    parser.add_argument("--max-depth", type=int, default=None)
+    parser.add_argument("--max-leaves", type=int, default=None)
+    parser.add_argument("--value-dtype", choices=VALUE_DTYPES, default="float32")
+    parser.add_argument("--mae-tolerance", type=float, default=0.01)
+    parser.add_argument("--min-trees", type=int, default=10)
+    parser.add_argument("--save", action="store_true", help="Store the bundle next to the model")
+    args = parser.parse_args(argv)
+
+    loaded = ModelRegistry(path=Path(args.model), model_format="pickle").get()
+    df = transform(ingest(args.data))
+    df = df.sample(min(args.rows, len(df)), random_state=0)
+    config = CompressionConfig(
+        max_depth=args.max_depth,
+        max_leaves=args.max_leaves,
+        value_dtype=args.value_dtype,
+        mae_tolerance=args.mae_tolerance,
+        min_trees=args.min_trees,
+    )
+    compressed, report = compress_and_report(loaded.model, df[FEATURE_COLUMNS], df[TARGET], config)
+    print(json.dumps(report["variants"], indent=2))
+    print(f"Report: {write_report(report)}")
+    if args.save:
+        bundle = save_forest_bundle(
+            compressed,
+            compressed_bundle_path_for(loaded.path, loaded.version),
+            meta={"compression": report},
+        )
+        print(f"Compressed bundle: {bundle}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from exception import InventoryAnalysisError
+from feature_schema import LAG_FEATURE_COLUMNS, SERIES_KEYS, TARGET
+from logger import get_logger
+
+
+logger = get_logger(__name__)
+
+LAGS = (1, 7, 14)
+WINDOWS = (7, 28)
+# Observations kept per series; enough for the longest lag and window.
+HISTORY = max(max(LAGS), max(WINDOWS))
+PROMOTION = "Holiday/Promotion"
+# Written in place of features that have no history yet (a new series, or
+# no promotion so far). Units sold are never negative, and the forest
+# predictors do not support NaN.
+MISSING = -1.0
+
+DEFAULT_STATE_PATH = Path(
+    os.getenv("SERIES_STATE_PATH", Path("artifacts") / "features" / "series_state.npz")
+)
+
+
+class SeriesStateNotFoundError(InventoryAnalysisError):
+    """Raised when a model needs lag features but no series state was saved."""
+
+
+class SeriesDateError(InventoryAnalysisError, ValueError):
+    """Raised for rows dated other than the day the series state describes."""
+
+
+def _day_numbers(dates: pd.Series) -> np.ndarray:
+    return pd.to_datetime(dates).to_numpy().astype("datetime64[D]").astype(np.int64)
+
+
+def _series_keys(df: pd.DataFrame) -> pd.MultiIndex:
+    return pd.MultiIndex.from_arrays(
+        [df[column].astype(str).to_numpy() for column in SERIES_KEYS], names=SERIES_KEYS
+    )
+
+
+def _history_features(
+    series: np.ndarray,
+    units: np.ndarray,
+    day: np.ndarray,
+    promo: np.ndarray,
+) -> dict[str, np.ndarray]:
+    """Lag features for rows already sorted by (series, day).
+
+    Every feature only looks at earlier rows of the same series, using
+    position arithmetic and prefix sums, so there is no loop over series.
+    """
+    n = len(series)
+    positions = np.arange(n)
+    is_start = np.r_[True, series[1:] != series[:-1]] if n else np.zeros(0, bool)
+    group_start = np.maximum.accumulate(np.where(is_start, positions, 0))
+    pos = positions - group_start
+
+    features: dict[str, np.ndarray] = {}
+    for lag in LAGS:
+        values = np.full(n, np.nan)
+        has = pos >= lag
+        values[has] = units[positions[has] - lag]
+        features[f"units_sold_lag_{lag}"] = values
+
+    sums = np.r_[0.0, np.cumsum(units)]
+    squares = np.r_[0.0, np.cumsum(units * units)]
+    for window in WINDOWS:
+        lo = np.maximum(group_start, positions - window)
+        count = (positions - lo).astype(np.float64)
+        total = sums[positions] - sums[lo]
+        total_sq = squares[positions] - squares[lo]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = np.where(count > 0, total / count, np.nan)
+            var = (total_sq - total * total / count) / (count - 1)
+        std = np.where(count > 1, np.sqrt(np.clip(var, 0, None)), np.nan)
+        features[f"units_sold_roll_mean_{window}"] = mean
+        features[f"units_sold_roll_std_{window}"] = std
+
+    # Running max of (series, promotion day) keys; series are sorted, so a
+    # later series can never see an earlier series' promotions.
+    base = day.min() - 1 if n else 0
+    span = (day.max() - base + 1) if n else 1
+    encoded = series * span + np.where(promo > 0, day - base, 0)
+    running = np.maximum.accumulate(encoded) if n else encoded
+    previous = np.r_[-1, running[:-1]] if n else running
+    last = previous - series * span
+    seen = (pos > 0) & (last > 0)
+    features["days_since_promotion"] = np.where(seen, day - (last + base), np.nan)
+    return features
+
+
+def compute_lag_features(
+    df: pd.DataFrame, state: "SeriesStateStore | None" = None
+) -> pd.DataFrame:
+    """Return ``df`` with ``LAG_FEATURE_COLUMNS`` added, in its original order.
+
+    With ``state``, each series' stored history is placed before its rows,
+    so features for just-appended days match a full recomputation.
+    """
+    n = len(df)
+    series_index = _series_keys(df)
+    series_codes, uniques = series_index.factorize()
+    units = df[TARGET].to_numpy(dtype=np.float64)
+    day = _day_numbers(df["Date"])
+    promo = df[PROMOTION].to_numpy(dtype=np.int64)
+
+    prefix_series = np.zeros(0, dtype=np.int64)
+    prefix_units = np.zeros(0)
+    state_promo = np.full(len(uniques), np.nan)
+    if state is not None and len(uniques):
+        rows = state.keys.get_indexer(uniques)
+        known = rows >= 0
+        history = state.values[rows[known]]
+        present = ~np.isnan(history)
+        prefix_series = np.repeat(np.flatnonzero(known), present.sum(axis=1))
+        prefix_units = history[present].astype(np.float64)
+        state_promo[known] = state.last_promo_day[rows[known]]
+
+    m = len(prefix_series)
+    all_series = np.r_[prefix_series, series_codes]
+    all_units = np.r_[prefix_units, units]
+    all_day = np.r_[np.full(m, day.min() if n else 0), day]
+    all_promo = np.r_[np.zeros(m, dtype=np.int64), promo]
+    is_new = np.r_[np.zeros(m, dtype=np.int8), np.ones(n, dtype=np.int8)]
+    # Stored history (is_new=0) keeps its order and sorts before new days.
+    order = np.lexsort((all_day, is_new, all_series))
+
+    features = _history_features(
+        all_series[order], all_units[order], all_day[order], all_promo[order]
+    )
+    new_rows = is_new[order] == 1
+    original = order[new_rows] - m
+
+    out = {}
+    for name in LAG_FEATURE_COLUMNS:
+        values = np.empty(n)
+        values[original] = features[name][new_rows]
+        out[name] = values
+    # Promotions older than the stored window come from the state.
+    fallback = day - state_promo[series_codes]
+    out["days_since_promotion"] = np.where(
+        np.isnan(out["days_since_promotion"]), fallback, out["days_since_promotion"]
+    )
+    lag_frame = pd.DataFrame(out, index=df.index).fillna(MISSING).astype(np.float32)
+    return df.drop(columns=LAG_FEATURE_COLUMNS, errors="ignore").join(lag_frame)
+
+
+@dataclass
+class SeriesStateStore:
+    """Last ``HISTORY`` units sold per store/product series, for serving.
+
+    ``values`` holds one row per series, oldest first and left-padded with
+    NaN. Lookups describe the day after each series' last recorded day.
+    """
+
+    keys: pd.MultiIndex
+    values: np.ndarray
+    last_day: np.ndarray
+    last_promo_day: np.ndarray
+    version: str = field(init=False)
+
+    def __post_init__(self) -> None:
+        digest = hashlib.sha256()
+        for array in (self.values, self.last_day, self.last_promo_day):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        digest.update("\x1f".join(map(str, self.keys)).encode("utf-8"))
+        self.version = digest.hexdigest()[:12]
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "SeriesStateStore":
+        series_index = _series_keys(df)
+        codes, uniques = series_index.factorize()
+        day = _day_numbers(df["Date"])
+        order = np.lexsort((day, codes))
+        codes, day = codes[order], day[order]
+        units = df[TARGET].to_numpy(dtype=np.float64)[order]
+        promo = df[PROMOTION].to_numpy()[order]
+
+        n = len(codes)
+        is_end = np.r_[codes[1:] != codes[:-1], True] if n else np.zeros(0, bool)
+        ends = np.flatnonzero(is_end)
+        from_end = ends[np.searchsorted(ends, np.arange(n))] - np.arange(n)
+        keep = from_end < HISTORY
+        values = np.full((len(uniques), HISTORY), np.nan, dtype=np.float32)
+        values[codes[keep], HISTORY - 1 - from_end[keep]] = units[keep]
+
+        last_promo = np.full(len(uniques), np.nan)
+        promo_rows = promo > 0
+        if promo_rows.any():
+            np.fmax.at(last_promo, codes[promo_rows], day[promo_rows].astype(np.float64))
+        return cls(uniques, values, day[ends], last_promo)
+
+    def update(self, df: pd.DataFrame) -> tuple[pd.DataFrame, "SeriesStateStore"]:
+        """Features for newly appended days, and the state that includes them."""
+        rows = self.keys.get_indexer(_series_keys(df))
+        known = rows >= 0
+        if (_day_numbers(df["Date"])[known] <= self.last_day[rows[known]]).any():
+            raise ValueError(
+                "Appended rows must be newer than each series' last recorded day."
+            )
+        features = compute_lag_features(df, self)
+        return features, self.merge(SeriesStateStore.from_frame(df))
+
+    def merge(self, newer: "SeriesStateStore") -> "SeriesStateStore":
+        keys = self.keys.append(newer.keys).unique()
+        old_rows = self.keys.get_indexer(keys)
+        new_rows = newer.keys.get_indexer(keys)
+
+        def take(array: np.ndarray, rows: np.ndarray, fill) -> np.ndarray:
+            out = np.full((len(rows),) + array.shape[1:], fill, dtype=array.dtype)
+            out[rows >= 0] = array[rows[rows >= 0]]
+            return out
+
+        combined = np.hstack(
+            [take(self.values, old_rows, np.nan), take(newer.values, new_rows, np.nan)]
+        )
+        # Stable sort moves the NaN padding to the front and keeps day order.
+        order = np.argsort(~np.isnan(combined), axis=1, kind="stable")
+        values = np.take_along_axis(combined, order, axis=1)[:, -HISTORY:]
+        last_day = np.maximum(
+            take(self.last_day, old_rows, np.iinfo(np.int64).min),
+            take(newer.last_day, new_rows, np.iinfo(np.int64).min),
+        )
+        last_promo = np.fmax(
+            take(self.last_promo_day, old_rows, np.nan),
+            take(newer.last_promo_day, new_rows, np.nan),
+        )
+        return SeriesStateStore(keys, values, last_day, last_promo)
+
+    def lookup(self, df: pd.DataFrame, any_day: bool = False) -> pd.DataFrame:
+        """Lag features for the next day of each row's series.
+
+        The state only describes that day, so rows of a known series dated
+        otherwise (by ``Date``, or by ``month``/``day`` without one) raise
+        ``SeriesDateError``. ``any_day=True`` skips the check, for callers
+        that knowingly reuse the latest lags (e.g. multi-day forecasts).
+        ``date_errors`` reports the same check per row.
+        """
+        rows = self.keys.get_indexer(_series_keys(df))
+        known = rows >= 0
+        if not any_day:
+            errors = self._date_errors(df, rows, known)
+            wrong = ~pd.isna(errors)
+            if wrong.any():
+                raise SeriesDateError(
+                    f"{int(wrong.sum())} row(s) ask for lag features of another date; "
+                    f"{errors[wrong][0]}"
+                )
+        history = np.full((len(df), HISTORY), np.nan)
+        history[known] = self.values[rows[known]]
+
+        out = {f"units_sold_lag_{lag}": history[:, HISTORY - lag] for lag in LAGS}
+        for window in WINDOWS:
+            recent = history[:, -window:]
+            count = (~np.isnan(recent)).sum(axis=1)
+            total = np.nansum(recent, axis=1)
+            total_sq = np.nansum(recent * recent, axis=1)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                mean = np.where(count > 0, total / count, np.nan)
+                var = (total_sq - total * total / count) / (count - 1)
+            out[f"units_sold_roll_mean_{window}"] = mean
+            out[f"units_sold_roll_std_{window}"] = np.where(
+                count > 1, np.sqrt(np.clip(var, 0, None)), np.nan
+            )
+        days = np.full(len(df), np.nan)
+        days[known] = self.last_day[rows[known]] + 1 - self.last_promo_day[rows[known]]
+        out["days_since_promotion"] = days
+        frame = pd.DataFrame(out, index=df.index)[LAG_FEATURE_COLUMNS]
+        return frame.fillna(MISSING).astype(np.float32)
+
+    def date_errors(self, df: pd.DataFrame) -> np.ndarray:
+        """Per-row error for rows dated other than their series' next day, else None."""
+        rows = self.keys.get_indexer(_series_keys(df))
+        return self._date_errors(df, rows, rows >= 0)
+
+    def _date_errors(self, df: pd.DataFrame, rows: np.ndarray, known: np.ndarray) -> np.ndarray:
+        errors = np.full(len(df), None, dtype=object)
+        next_day = self.last_day[rows[known]] + 1
+        if "Date" in df.columns:
+            wrong = _day_numbers(df["Date"])[known] != next_day
+        elif {"month", "day"} <= set(df.columns):
+            expected = pd.DatetimeIndex(next_day.astype("datetime64[D]"))
+            wrong = (df["month"].to_numpy()[known] != expected.month.to_numpy()) | (
+                df["day"].to_numpy()[known] != expected.day.to_numpy()
+            )
+        else:
+            return errors
+        for position, row, day in zip(
+            np.flatnonzero(known)[wrong], rows[known][wrong], next_day[wrong]
+        ):
+            store, product = self.keys[row]
+            errors[position] = (
+                f"Lag features for {store}/{product} are only known for "
+                f"{np.datetime64(int(day), 'D')}, the day after its last recorded day."
+            )
+        return errors
+
+    def save(self, path: str | Path = DEFAULT_STATE_PATH) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.stem}.tmp.npz")
+        np.savez(
+            tmp_path,
+            stores=np.asarray(self.keys.get_level_values(0), dtype=str),
+            products=np.asarray(self.keys.get_level_values(1), dtype=str),
+            values=self.values,
+            last_day=self.last_day,
+            last_promo_day=self.last_promo_day,
+        )
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path: str | Path = DEFAULT_STATE_PATH) -> "SeriesStateStore":
+        with np.load(path, allow_pickle=False) as data:
+            keys = pd.MultiIndex.from_arrays(
+                [data["stores"], data["products"]], names=SERIES_KEYS
+            )
+            return cls(keys, data["values"], data["last_day"], data["last_promo_day"])
+
+
+_state_lock = threading.Lock()
+_state_cache: dict[Path, tuple[int, SeriesStateStore]] = {}
+
+
+def get_state_store(path: str | Path = DEFAULT_STATE_PATH) -> SeriesStateStore:
+    """The saved state, reloaded whenever the file changes."""
+    path = Path(path).resolve()
+    if not path.exists():
+        raise SeriesStateNotFoundError(
+            f"Series state not found at {path}. Train with LAG_FEATURES=1 first."
+        )
+    mtime_ns = path.stat().st_mtime_ns
+    with _state_lock:
+        cached = _state_cache.get(path)
+        if cached is None or cached[0] != mtime_ns:
+            cached = (mtime_ns, SeriesStateStore.load(path))
+            _state_cache[path] = cached
+            logger.info("Loaded series state for %d series from %s", len(cached[1].keys), path)
+        return cached[1]
+
+
+def model_lag_columns(model) -> list[str]:
+    """History columns a fitted pipeline (or mapped bundle) expects."""
+    preprocessor = getattr(model, "preprocessor", None)
+    if preprocessor is None:
+        preprocessor = model.named_steps["preprocess"]
+    names = set(getattr(preprocessor, "feature_names_in_", ()))
+    return [column for column in LAG_FEATURE_COLUMNS if column in names]
+
+
+def add_serving_features(df: pd.DataFrame, columns: list[str]) -> pd.DataFrame:
+    """Fill lag ``columns`` missing from ``df`` from the series state store."""
+    if not columns or all(column in df.columns for column in columns):
+        return df
+    features = get_state_store().lookup(df)
+    return df.drop(columns=columns, errors="ignore").join(features[columns])
+
+
+def serving_date_errors(df: pd.DataFrame, columns: list[str]) -> np.ndarray:
+    """Per-row ``SeriesDateError`` messages for rows ``add_serving_features`` would reject."""
+    if not columns or all(column in df.columns for column in columns):
+        return np.full(len(df), None, dtype=object)
+    return get_state_store().date_errors(df)
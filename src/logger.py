@@ -1,17 +1,34 @@
+import atexit
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from contextvars import ContextVar
 from pathlib import Path
 
 
-def get_logger(name: str) -> logging.Logger:
-    log_dir = Path("logs")
-    log_dir.mkdir(parents=True, exist_ok=True)
-    log_path = log_dir / "app.log"
+# Set per request by the API; attached to every record in queued mode.
+request_id: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+_STANDARD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
 
+def get_logger(name: str) -> logging.Logger:
     logger = logging.getLogger(name)
     if logger.handlers:
         return logger
 
     logger.setLevel(logging.INFO)
+    if log_backend() == "queued":
+        logger.addHandler(_queued_handler())
+        return logger
+
+    log_dir = Path("logs")
+    log_dir.mkdir(parents=True, exist_ok=True)
+    log_path = log_dir / "app.log"
     formatter = logging.Formatter(
         "%(asctime)s %(levelname)s %(name)s %(message)s"
     )
@@ -24,3 +41,146 @@ def get_logger(name: str) -> logging.Logger:
     logger.addHandler(file_handler)
     logger.addHandler(stream_handler)
     return logger
+
+
+def log_backend() -> str:
+    return os.getenv("LOG_BACKEND", "sync")
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including any ``extra=`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "pid": record.process,
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and value is not None:
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """Pass at most ``per_second`` INFO/DEBUG records per message template.
+
+    Warnings and errors always pass. The next record that gets through
+    carries ``suppressed``, the number dropped since the previous one.
+    """
+
+    def __init__(self, per_second: float):
+        super().__init__()
+        self.per_second = per_second
+        self._buckets: dict[tuple[str, str], list[float]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.per_second <= 0 or record.levelno >= logging.WARNING:
+            return True
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [self.per_second, now, 0]
+            tokens = min(self.per_second, bucket[0] + (now - bucket[1]) * self.per_second)
+            bucket[1] = now
+            if tokens < 1:
+                bucket[0] = tokens
+                bucket[2] += 1
+                return False
+            bucket[0] = tokens - 1
+            if bucket[2]:
+                record.suppressed = bucket[2]
+                bucket[2] = 0
+        return True
+
+
+class _ContextFilter(logging.Filter):
+    # Runs in the calling thread, where the request's context is visible.
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "request_id", None) is None:
+            record.request_id = request_id.get()
+        return True
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Never blocks the caller: records are dropped when the queue is full."""
+
+    dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            type(self).dropped += 1
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # Wait for room so stopping on a full queue still drains it.
+        self.queue.put(self._sentinel)
+
+
+_handler: logging.Handler | None = None
+_listener: logging.handlers.QueueListener | None = None
+_handler_pid: int | None = None
+_lock = threading.Lock()
+
+
+def _queued_handler() -> logging.Handler:
+    """The process-wide queue handler; starts the listener thread on first use.
+
+    Each process (uvicorn worker or pool worker) writes its own rotating file,
+    ``logs/app.<pid>.jsonl``, so rotation never races between processes.
+    """
+    global _handler, _listener, _handler_pid
+    with _lock:
+        if _handler is not None and _handler_pid == os.getpid():
+            return _handler
+
+        log_dir = Path(os.getenv("LOG_DIR", "logs"))
+        log_dir.mkdir(parents=True, exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_dir / f"app.{os.getpid()}.jsonl",
+            maxBytes=int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+            backupCount=int(os.getenv("LOG_BACKUP_COUNT", "5")),
+        )
+        file_handler.setFormatter(JsonFormatter())
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(
+            logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s")
+        )
+
+        log_queue: queue.Queue = queue.Queue(int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+        handler = _DroppingQueueHandler(log_queue)
+        handler.addFilter(_ContextFilter())
+        handler.addFilter(RateLimitFilter(float(os.getenv("LOG_RATE_LIMIT", "100"))))
+        listener = _Listener(
+            log_queue, file_handler, stream_handler, respect_handler_level=True
+        )
+        listener.start()
+        atexit.register(_stop_listener, listener)
+
+        _handler, _listener, _handler_pid = handler, listener, os.getpid()
+        return handler
+
+
+def _stop_listener(listener: logging.handlers.QueueListener) -> None:
+    if listener._thread is not None:
+        listener.stop()
+
+
+def flush_logs() -> None:
+    """Block until every queued record has been written (queued mode only)."""
+    with _lock:
+        listener = _listener
+        if listener is None or _handler_pid != os.getpid():
+            return
+        listener.stop()  # drains the queue
+        listener.start()
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable
+
+import numpy as np
+
+from exception import InventoryAnalysisError
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class QueueFullError(InventoryAnalysisError):
+    """Raised when the micro-batch queue is at capacity."""
+
+
+class BatcherClosedError(InventoryAnalysisError):
+    """Raised for requests still queued when the micro-batcher stops."""
+
+
+@dataclass
+class _Pending:
+    record: dict
+    future: asyncio.Future
+    enqueued_at: float
+
+
+class MicroBatcher:
+    """Groups concurrent single-row requests into one vectorized predict.
+
+    The first queued request opens a window of ``max_wait_ms``; everything
+    that arrives before it closes (up to ``max_rows``) is scored with one
+    ``predict_fn`` call in a worker thread, and each caller gets its own row
+    back. Only one batch runs at a time, so batches do not compete for the
+    forest's threads.
+
+    If the worker stops, whether through ``shutdown()`` or an unexpected
+    error, every queued and in-flight request fails with
+    ``BatcherClosedError`` instead of waiting forever. The next ``submit``
+    starts a fresh worker.
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[list[dict]], list[Any]],
+        max_wait_ms: float = 2.0,
+        max_rows: int = 64,
+        max_queue: int = 1024,
+    ):
+        self.predict_fn = predict_fn
+        self.max_wait = max_wait_ms / 1000
+        self.max_rows = max_rows
+        self.max_queue = max_queue
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.batches = 0
+        self.rows = 0
+        self.rejected = 0
+        self.failed_batches = 0
+        self._batch_sizes: deque[int] = deque(maxlen=1000)
+        self._waits_ms: deque[float] = deque(maxlen=1000)
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._task is not None and not self._task.done():
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = loop.create_task(self._run())
+
+    async def submit(self, record: dict) -> Any:
+        self._ensure_started()
+        future = self._loop.create_future()
+        try:
+            self._queue.put_nowait(_Pending(record, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise QueueFullError("Prediction queue is full; retry later.") from None
+        return await future
+
+    async def shutdown(self) -> None:
+        """Stop the worker and fail every request it has not answered."""
+        task = self._task
+        if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+            return
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+    async def _run(self) -> None:
+        queue = self._queue
+        loop = asyncio.get_running_loop()
+        batch: list[_Pending] = []
+        try:
+            while True:
+                batch = [await queue.get()]
+                deadline = loop.time() + self.max_wait
+                while len(batch) < self.max_rows:
+                    if not queue.empty():
+                        batch.append(queue.get_nowait())
+                        continue
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+                await self._flush(batch, loop)
+                batch = []
+        except Exception:
+            logger.exception("Micro-batcher worker stopped")
+        finally:
+            while not queue.empty():
+                batch.append(queue.get_nowait())
+            error = BatcherClosedError("Micro-batcher stopped; retry the request.")
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(error)
+
+    async def _flush(self, batch: list[_Pending], loop) -> None:
+        started = time.perf_counter()
+        for item in batch:
+            self._waits_ms.append((started - item.enqueued_at) * 1000)
+        self._batch_sizes.append(len(batch))
+        self.batches += 1
+        self.rows += len(batch)
+
+        try:
+            results = await loop.run_in_executor(
+                None, self.predict_fn, [item.record for item in batch]
+            )
+        except Exception as exc:
+            self.failed_batches += 1
+            if len(batch) == 1:
+                if not batch[0].future.done():
+                    batch[0].future.set_exception(exc)
+                return
+            # One bad record must not fail unrelated callers: retry each
+            # record on its own so every caller gets its own outcome.
+            outcomes = await loop.run_in_executor(
+                None, self._predict_each, [item.record for item in batch]
+            )
+            for item, (result, error) in zip(batch, outcomes):
+                if item.future.done():
+                    continue
+                if error is None:
+                    item.future.set_result(result)
+                else:
+                    item.future.set_exception(error)
+            return
+
+        for item, result in zip(batch, results):
+            if not item.future.done():
+                item.future.set_result(result)
+
+    def _predict_each(self, records: list[dict]) -> list[tuple]:
+        """``(result, None)`` or ``(None, error)`` for each record predicted alone."""
+        outcomes = []
+        for record in records:
+            try:
+                outcomes.append((self.predict_fn([record])[0], None))
+            except Exception as exc:
+                outcomes.append((None, exc))
+        return outcomes
+
+    def stats(self) -> dict:
+        sizes = np.asarray(self._batch_sizes, dtype=float)
+        waits = np.asarray(self._waits_ms, dtype=float)
+        return {
+            "max_wait_ms": self.max_wait * 1000,
+            "max_rows": self.max_rows,
+            "max_queue": self.max_queue,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "batches": self.batches,
+            "rows": self.rows,
+            "rejected": self.rejected,
+            "failed_batches": self.failed_batches,
+            "batch_size_mean": float(sizes.mean()) if sizes.size else 0.0,
+            "batch_size_max": int(sizes.max()) if sizes.size else 0,
+            "queue_wait_ms_p50": float(np.percentile(waits, 50)) if waits.size else 0.0,
+            "queue_wait_ms_p95": float(np.percentile(waits, 95)) if waits.size else 0.0,
+        }
+
+
+def batcher_from_env(predict_fn: Callable[[list[dict]], list[Any]]) -> MicroBatcher | None:
+    if os.getenv("MICROBATCH", "1") != "1":
+        return None
+    return MicroBatcher(
+        predict_fn,
+        max_wait_ms=float(os.getenv("MICROBATCH_MAX_WAIT_MS", "2")),
+        max_rows=int(os.getenv("MICROBATCH_MAX_ROWS", "64")),
+        max_queue=int(os.getenv("MICROBATCH_MAX_QUEUE", "1024")),
+    )
@@ -1,6 +1,10 @@
 from __future__ import annotations
 
 import json
+import os
+import pickle
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import numpy as np
@@ -9,9 +13,19 @@ from sklearn.metrics import mean_absolute_error, mean_squared_error
 
 from logger import get_logger
 
+try:
+    import pyarrow  # type: ignore  # noqa: F401
+except ModuleNotFoundError:
+    pyarrow = None
+
 
 logger = get_logger(__name__)
 
+REPORT_FORMATS = ("csv", "parquet")
+STATE_NAME = "evaluation_state.pkl"
+# Per-group sufficient statistics; every metric is derived from these sums.
+STAT_COLUMNS = ["sum_abs_err", "sum_sq_err", "sum_ape", "ape_count", "count"]
+
 
 def _safe_mape(y_true: pd.Series, y_pred: pd.Series) -> float:
     mask = y_true != 0
@@ -20,59 +34,239 @@ def _safe_mape(y_true: pd.Series, y_pred: pd.Series) -> float:
     return float(np.mean(np.abs((y_true[mask] - y_pred[mask]) / y_true[mask])) * 100)
 
 
-def _group_metrics(df: pd.DataFrame, group_cols: list[str]) -> pd.DataFrame:
-    grouped = df.groupby(group_cols, dropna=False)
-    out = grouped.apply(
-        lambda g: pd.Series(
-            {
-                "mae": mean_absolute_error(g["y_true"], g["y_pred"]),
-                "rmse": float(
-                    np.sqrt(mean_squared_error(g["y_true"], g["y_pred"]))
-                ),
-                "mape": _safe_mape(g["y_true"], g["y_pred"]),
-                "count": len(g),
-            }
-        )
+BREAKDOWNS = {
+    "store": ["Store ID"],
+    "product": ["Product ID"],
+    "store_product": ["Store ID", "Product ID"],
+    "category": ["Category"],
+    "region": ["Region"],
+}
+
+
+def _add_error_columns(df: pd.DataFrame) -> pd.DataFrame:
+    y_true = df["y_true"].to_numpy(dtype=np.float64)
+    y_pred = df["y_pred"].to_numpy(dtype=np.float64)
+    error = y_true - y_pred
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ape = np.where(y_true != 0, np.abs(error / y_true), np.nan)
+    return df.assign(abs_err=np.abs(error), sq_err=error**2, ape=ape)
+
+
+def _group_stats(df: pd.DataFrame, group_cols: list[str]) -> pd.DataFrame:
+    if "abs_err" not in df.columns:
+        df = _add_error_columns(df)
+    out = df.groupby(group_cols, dropna=False, observed=True, sort=True).agg(
+        sum_abs_err=("abs_err", "sum"),
+        sum_sq_err=("sq_err", "sum"),
+        sum_ape=("ape", "sum"),
+        ape_count=("ape", "count"),
+        count=("abs_err", "size"),
     )
     return out.reset_index()
 
 
+def _metrics_from_stats(stats: pd.DataFrame, group_cols: list[str]) -> pd.DataFrame:
+    count = stats["count"].to_numpy(dtype=np.float64)
+    ape_count = stats["ape_count"].to_numpy(dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mape = np.where(ape_count > 0, stats["sum_ape"].to_numpy() / ape_count, np.nan)
+    out = stats[group_cols].copy()
+    out["mae"] = stats["sum_abs_err"].to_numpy() / count
+    out["rmse"] = np.sqrt(stats["sum_sq_err"].to_numpy() / count)
+    out["mape"] = mape * 100
+    # Kept as float so the CSVs match the reports written by earlier versions.
+    out["count"] = count
+    return out
+
+
+def _group_metrics(df: pd.DataFrame, group_cols: list[str]) -> pd.DataFrame:
+    return _metrics_from_stats(_group_stats(df, group_cols), group_cols)
+
+
+def overall_metrics(y_true: pd.Series, y_pred: np.ndarray) -> dict:
+    return {
+        "mae": float(mean_absolute_error(y_true, y_pred)),
+        "rmse": float(np.sqrt(mean_squared_error(y_true, y_pred))),
+        "mape": _safe_mape(y_true, pd.Series(y_pred, index=y_true.index)),
+        "count": int(len(y_true)),
+    }
+
+
+def _overall_stats(eval_df: pd.DataFrame) -> dict:
+    return {
+        "sum_abs_err": float(eval_df["abs_err"].sum()),
+        "sum_sq_err": float(eval_df["sq_err"].sum()),
+        "sum_ape": float(eval_df["ape"].sum()),
+        "ape_count": int(eval_df["ape"].count()),
+        "count": int(len(eval_df)),
+    }
+
+
+def _metrics_from_overall(stats: dict) -> dict:
+    count = stats["count"]
+    return {
+        "mae": stats["sum_abs_err"] / count if count else float("nan"),
+        "rmse": float(np.sqrt(stats["sum_sq_err"] / count)) if count else float("nan"),
+        "mape": (
+            stats["sum_ape"] / stats["ape_count"] * 100 if stats["ape_count"] else float("nan")
+        ),
+        "count": count,
+    }
+
+
+def _eval_frame(X: pd.DataFrame, y_true, y_pred, group_cols: list[str]) -> pd.DataFrame:
+    # Only the grouping columns are taken from X; the rest is never copied.
+    frame = X[group_cols].assign(
+        y_true=np.asarray(y_true, dtype=np.float64), y_pred=np.asarray(y_pred, dtype=np.float64)
+    )
+    return _add_error_columns(frame)
+
+
+def _write_table(table: pd.DataFrame, path_stem: Path, formats: tuple[str, ...]) -> None:
+    if "csv" in formats:
+        table.to_csv(path_stem.with_suffix(".csv"), index=False)
+    if "parquet" in formats and pyarrow is not None:
+        table.to_parquet(path_stem.with_suffix(".parquet"), index=False)
+
+
+def _run_breakdowns(task, breakdowns: dict[str, list[str]], workers: int | None) -> dict:
+    """Run ``task(name, group_cols)`` for every breakdown, in threads when workers > 1.
+
+    Threads rather than processes: the tasks share one evaluation frame and
+    spend much of their time in pandas/NumPy kernels and file writes.
+    """
+    workers = workers or int(os.getenv("EVAL_WORKERS", "0")) or min(
+        len(breakdowns), os.cpu_count() or 1
+    )
+    if workers <= 1 or len(breakdowns) <= 1:
+        return {name: task(name, cols) for name, cols in breakdowns.items()}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="evaluation") as pool:
+        futures = {name: pool.submit(task, name, cols) for name, cols in breakdowns.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+
+def _save_state(path: Path, state: dict) -> None:
+    tmp = path.with_suffix(".tmp")
+    with tmp.open("wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
 def evaluate_model(
     model,
     X_test: pd.DataFrame,
     y_test: pd.Series,
     output_dir: Path | str = "artifacts/reports",
+    extra_breakdowns: dict[str, list[str]] | None = None,
+    y_pred: np.ndarray | None = None,
+    formats: tuple[str, ...] = REPORT_FORMATS,
+    workers: int | None = None,
 ) -> dict:
+    """Write the summary and per-group reports for one scored test set.
+
+    Pass ``y_pred`` when the predictions are already known to skip
+    ``model.predict``. Breakdowns are computed concurrently and written as
+    CSV and, when pyarrow is installed, Parquet. The per-group sums are kept
+    in ``evaluation_state.pkl`` so ``update_evaluation`` can fold in new
+    batches later.
+    """
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
 
-    y_pred = model.predict(X_test)
-    overall = {
-        "mae": float(mean_absolute_error(y_test, y_pred)),
-        "rmse": float(np.sqrt(mean_squared_error(y_test, y_pred))),
-        "mape": _safe_mape(y_test, pd.Series(y_pred, index=y_test.index)),
-        "count": int(len(y_test)),
-    }
+    if y_pred is None:
+        y_pred = model.predict(X_test)
+    overall = overall_metrics(y_test, y_pred)
 
-    eval_df = X_test.copy()
-    eval_df["y_true"] = y_test.values
-    eval_df["y_pred"] = y_pred
+    breakdowns = {**BREAKDOWNS, **(extra_breakdowns or {})}
+    group_cols = list(dict.fromkeys(col for cols in breakdowns.values() for col in cols))
+    eval_df = _eval_frame(X_test, y_test, y_pred, group_cols)
 
-    by_store = _group_metrics(eval_df, ["Store ID"])
-    by_product = _group_metrics(eval_df, ["Product ID"])
-    by_store_product = _group_metrics(eval_df, ["Store ID", "Product ID"])
-    by_category = _group_metrics(eval_df, ["Category"])
-    by_region = _group_metrics(eval_df, ["Region"])
+    def report(name: str, cols: list[str]) -> pd.DataFrame:
+        stats = _group_stats(eval_df, cols)
+        _write_table(_metrics_from_stats(stats, cols), output_path / f"metrics_by_{name}", formats)
+        return stats
 
     (output_path / "evaluation_summary.json").write_text(
         json.dumps(overall, indent=2),
         encoding="utf-8",
     )
-    by_store.to_csv(output_path / "metrics_by_store.csv", index=False)
-    by_product.to_csv(output_path / "metrics_by_product.csv", index=False)
-    by_store_product.to_csv(output_path / "metrics_by_store_product.csv", index=False)
-    by_category.to_csv(output_path / "metrics_by_category.csv", index=False)
-    by_region.to_csv(output_path / "metrics_by_region.csv", index=False)
-
+    stats = _run_breakdowns(report, breakdowns, workers)
+    _save_state(
+        output_path / STATE_NAME,
+        {
+            "overall": _overall_stats(eval_df),
+            "breakdowns": breakdowns,
+            "stats": stats,
+            "batches": 1,
+        },
+    )
     logger.info("Saved evaluation report to %s", output_path)
     return overall
+
+
+def update_evaluation(
+    X_batch: pd.DataFrame,
+    y_batch,
+    y_pred: np.ndarray,
+    output_dir: Path | str = "artifacts/reports",
+    extra_breakdowns: dict[str, list[str]] | None = None,
+    formats: tuple[str, ...] = REPORT_FORMATS,
+    workers: int | None = None,
+) -> dict:
+    """Fold a newly scored batch into the stored per-group sums and rewrite the reports.
+
+    Earlier batches are never re-scored: each group's sums of absolute and
+    squared errors, APE and counts are added to, and the metrics are derived
+    from the totals. Starts from scratch when no state exists yet.
+    """
+    started = time.perf_counter()
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    state_path = output_path / STATE_NAME
+    state = {"overall": None, "breakdowns": {}, "stats": {}, "batches": 0}
+    if state_path.exists():
+        with state_path.open("rb") as f:
+            state = pickle.load(f)
+
+    breakdowns = {**BREAKDOWNS, **state["breakdowns"], **(extra_breakdowns or {})}
+    group_cols = list(dict.fromkeys(col for cols in breakdowns.values() for col in cols))
+    eval_df = _eval_frame(X_batch, y_batch, y_pred, group_cols)
+
+    def fold(name: str, cols: list[str]) -> pd.DataFrame:
+        batch = _group_stats(eval_df, cols)
+        previous = state["stats"].get(name)
+        if previous is not None:
+            batch = (
+                pd.concat([previous, batch], ignore_index=True)
+                .groupby(cols, dropna=False, observed=True, sort=True)[STAT_COLUMNS]
+                .sum()
+                .reset_index()
+            )
+        _write_table(_metrics_from_stats(batch, cols), output_path / f"metrics_by_{name}", formats)
+        return batch
+
+    stats = _run_breakdowns(fold, breakdowns, workers)
+    overall_stats = _overall_stats(eval_df)
+    if state["overall"] is not None:
+        overall_stats = {key: state["overall"][key] + value for key, value in overall_stats.items()}
+    overall = _metrics_from_overall(overall_stats)
+    (output_path / "evaluation_summary.json").write_text(
+        json.dumps(overall, indent=2),
+        encoding="utf-8",
+    )
+    _save_state(
+        state_path,
+        {
+            "overall": overall_stats,
+            "breakdowns": breakdowns,
+            "stats": stats,
+            "batches": state["batches"] + 1,
+        },
+    )
+    logger.info(
+        "Folded %d scored rows into the evaluation report (batch %d, %.3fs)",
+        len(eval_df),
+        state["batches"] + 1,
+        time.perf_counter() - started,
+    )
+    return overall
@@ -4,8 +4,11 @@ import os
 
 from data_ingestion import ingest
 from data_transformation import transform
+from feature_schema import LAG_FEATURE_COLUMNS
+from lag_features import SeriesStateStore, compute_lag_features
 from model_evaluation import evaluate_model
-from model_trainer import train_model
+from model_trainer import search_models, train_model, update_model_incrementally
+from segment_models import train_segment_models
 from logger import get_logger
 
 
@@ -16,14 +19,54 @@ def run() -> None:
     data_path = Path("data") / "retail_store_inventory.csv"
     df = ingest(data_path)
     df = transform(df)
+    extra_features = None
+    if os.getenv("LAG_FEATURES") == "1":
+        df = compute_lag_features(df)
+        state_path = SeriesStateStore.from_frame(df).save()
+        logger.info("Saved series state to %s", state_path)
+        extra_features = LAG_FEATURE_COLUMNS
+    if os.getenv("TRAIN_MODE") == "incremental":
+        report = update_model_incrementally(
+            df, new_estimators=int(os.getenv("INCREMENTAL_ESTIMATORS", "20"))
+        )
+        if report is not None:
+            logger.info("Incremental update report: %s", report)
+            return
+        logger.info("Falling back to a full retrain")
     if os.getenv("FAST_TRAIN") == "1":
         df = df.sample(n=20000, random_state=42)
-        model, mae, X_test, y_test = train_model(
-            df, n_estimators=80, random_state=42, return_data=True
+        model, mae, X_test, y_test, y_pred = train_model(
+            df,
+            n_estimators=80,
+            random_state=42,
+            return_data=True,
+            extra_features=extra_features,
+            return_predictions=True,
+        )
+    elif os.getenv("TRAIN_MODE") == "search":
+        model, mae, X_test, y_test, y_pred = search_models(
+            df, return_data=True, extra_features=extra_features, return_predictions=True
         )
     else:
-        model, mae, X_test, y_test = train_model(df, return_data=True)
-    evaluate_model(model, X_test, y_test)
+        model, mae, X_test, y_test, y_pred = train_model(
+            df, return_data=True, extra_features=extra_features, return_predictions=True
+        )
+    # The test set was already scored during training.
+    evaluate_model(model, X_test, y_test, y_pred=y_pred)
+    segment_by = os.getenv("SEGMENT_BY")
+    if segment_by:
+        # The global model stays the fallback for small or unseen segments.
+        manifest = train_segment_models(
+            df,
+            by=[column.strip() for column in segment_by.split(",")],
+            n_estimators=int(os.getenv("SEGMENT_ESTIMATORS", "100")),
+        )
+        logger.info(
+            "Segment models: %d trained, row-weighted MAE %s vs global %s",
+            len(manifest["segments"]),
+            manifest["weighted_mae"],
+            mae,
+        )
     logger.info("Pipeline completed with MAE %s", mae)
 
 
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+
+from forest_bundle import bundle_path_for, compressed_bundle_path_for, load_forest_bundle
+from logger import get_logger
+from resource_usage import current_rss_mb
+
+
+logger = get_logger(__name__)
+
+DEFAULT_MODEL_PATH = Path("artifacts") / "models" / "best_model.pkl"
+
+
+def digest_sidecar_path(model_path: Path) -> Path:
+    return model_path.with_suffix(".sha256")
+
+
+def write_digest_sidecar(model_path: Path, sha256: str) -> None:
+    """Record the model's hash so loaders can skip re-hashing large pickles."""
+    stat = model_path.stat()
+    digest_sidecar_path(model_path).write_text(
+        json.dumps({"sha256": sha256, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}),
+        encoding="utf-8",
+    )
+
+
+def read_digest_sidecar(model_path: Path, stat) -> str | None:
+    # Only trusted when it describes exactly the file we have open.
+    try:
+        meta = json.loads(digest_sidecar_path(model_path).read_text(encoding="utf-8"))
+        if meta["mtime_ns"] == stat.st_mtime_ns and meta["size"] == stat.st_size:
+            return meta["sha256"]
+    except (OSError, KeyError, ValueError):
+        pass
+    return None
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    model: object
+    version: str
+    sha256: str
+    path: Path
+    mtime_ns: int
+    size: int
+    loaded_at: float
+    load_seconds: float
+    format: str = "pickle"
+    load_rss_mb: float | None = None
+    derived: dict = field(default_factory=dict, compare=False, repr=False)
+    _derived_lock: threading.Lock = field(
+        default_factory=threading.Lock, compare=False, repr=False
+    )
+
+    def get_derived(self, key: str, factory):
+        """Return an object built from this model, building it at most once.
+
+        Derived objects (explainers, compiled predictors, ...) live and die
+        with the model version they were built from.
+        """
+        if key in self.derived:
+            return self.derived[key]
+        with self._derived_lock:
+            if key not in self.derived:
+                self.derived[key] = factory(self.model)
+            return self.derived[key]
+
+    def info(self) -> dict:
+        return {
+            "version": self.version,
+            "sha256": self.sha256,
+            "path": str(self.path),
+            "size_bytes": self.size,
+            "loaded_at": self.loaded_at,
+            "load_seconds": self.load_seconds,
+            "format": self.format,
+            "load_rss_mb": self.load_rss_mb,
+        }
+
+
+@dataclass
+class ModelRegistry:
+    """Loads the best model once and reloads it when the artifact changes.
+
+    Readers get the current ``LoadedModel`` without taking a lock. A reload is
+    triggered when the file's mtime or size changes; the content hash decides
+    whether the model is actually swapped, so touching the file is cheap.
+    The previous model keeps serving until the new one is fully unpickled.
+
+    With ``model_format="mmap"`` the forest is served from the memory-mapped
+    bundle saved next to the pickle for the same version; the pickle is the
+    fallback when no bundle exists. ``model_format="compressed"`` does the same
+    with the compressed bundle written by ``COMPRESS_MODEL=1`` training.
+    """
+
+    path: Path = DEFAULT_MODEL_PATH
+    model_format: str = field(default_factory=lambda: os.getenv("MODEL_FORMAT", "pickle"))
+    _current: LoadedModel | None = field(default=None, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def get(self) -> LoadedModel:
+        stat = Path(self.path).stat()
+        current = self._current
+        if current is not None and self._unchanged(current, stat):
+            return current
+
+        with self._lock:
+            stat = Path(self.path).stat()
+            current = self._current
+            if current is not None and self._unchanged(current, stat):
+                return current
+            return self._load(current, stat)
+
+    def get_model(self):
+        return self.get().model
+
+    def version(self) -> str | None:
+        current = self._current
+        return current.version if current is not None else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._current = None
+
+    @staticmethod
+    def _unchanged(current: LoadedModel, stat) -> bool:
+        return current.mtime_ns == stat.st_mtime_ns and current.size == stat.st_size
+
+    def _load(self, current: LoadedModel | None, stat) -> LoadedModel:
+        path = Path(self.path)
+        start = time.perf_counter()
+        rss_before = current_rss_mb()
+        # Hash and unpickle through one handle so an os.replace() in between
+        # cannot pair one file's hash with another file's model.
+        with path.open("rb") as f:
+            digest = read_digest_sidecar(path, os.fstat(f.fileno()))
+            if digest is None:
+                digest_obj = hashlib.sha256()
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest_obj.update(block)
+                digest = digest_obj.hexdigest()
+
+            if current is not None and current.sha256 == digest:
+                refreshed = replace(
+                    current, path=path, mtime_ns=stat.st_mtime_ns, size=stat.st_size
+                )
+                self._current = refreshed
+                return refreshed
+
+            f.seek(0)
+            model, model_format = self._deserialize(path, f, digest)
+        elapsed = time.perf_counter() - start
+        rss_after = current_rss_mb()
+        loaded = LoadedModel(
+            model=model,
+            version=digest[:12],
+            sha256=digest,
+            path=path,
+            mtime_ns=stat.st_mtime_ns,
+            size=stat.st_size,
+            loaded_at=time.time(),
+            load_seconds=elapsed,
+            format=model_format,
+            load_rss_mb=(
+                rss_after - rss_before
+                if rss_before is not None and rss_after is not None
+                else None
+            ),
+        )
+        self._current = loaded
+        logger.info(
+            "Loaded %s model %s from %s in %.3fs (RSS +%s MB)",
+            model_format,
+            loaded.version,
+            path,
+            elapsed,
+            "n/a" if loaded.load_rss_mb is None else f"{loaded.load_rss_mb:.1f}",
+        )
+        return loaded
+
+    def _deserialize(self, path: Path, f, digest: str):
+        if self.model_format in ("mmap", "compressed"):
+            bundle_path = (
+                bundle_path_for if self.model_format == "mmap" else compressed_bundle_path_for
+            )
+            bundle = bundle_path(path, digest[:12])
+            if bundle.exists():
+                model = load_forest_bundle(bundle, sklearn_path=path, sklearn_sha256=digest)
+                return model, self.model_format
+            logger.warning("No bundle at %s; falling back to pickle", bundle)
+        return pickle.load(f), "pickle"
+
+
+_registry = ModelRegistry()
+
+
+def get_registry() -> ModelRegistry:
+    return _registry
@@ -1,16 +1,45 @@
+import hashlib
 import json
+import math
+import multiprocessing
+import os
 import pickle
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import ParameterGrid, ParameterSampler, train_test_split
 from sklearn.metrics import mean_absolute_error
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
-from sklearn.preprocessing import OneHotEncoder
-from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder
+from sklearn.ensemble import (
+    ExtraTreesRegressor,
+    HistGradientBoostingRegressor,
+    RandomForestRegressor,
+)
+from threadpoolctl import threadpool_limits
 
+from feature_schema import (
+    CATEGORICAL_COLUMNS,
+    FEATURE_COLUMNS,
+    NUMERIC_COLUMNS,
+    TARGET,
+)
+from forest_bundle import (
+    bundle_path_for,
+    compressed_bundle_path_for,
+    save_forest_bundle,
+    supports_bundle,
+)
+from drift_monitor import save_reference_profile
+from forest_compression import CompressionConfig, compress_and_report, write_report
 from logger import get_logger
+from model_registry import write_digest_sidecar
+from resource_usage import format_mb, peak_rss_mb
 
 
 logger = get_logger(__name__)
@@ -21,101 +50,624 @@ except ModuleNotFoundError:
     mlflow = None
 
 
-def save_best_model(model, metric_name: str, metric_value: float) -> bool:
+def load_best_metrics() -> dict:
+    metrics_path = Path("artifacts") / "metrics" / "best_metrics.json"
+    if not metrics_path.exists():
+        return {}
+    try:
+        return json.loads(metrics_path.read_text(encoding="utf-8"))
+    except json.JSONDecodeError:
+        return {}
+
+
+def beats_best(metric_name: str, metric_value: float, metrics_path: Path | None = None) -> bool:
+    """Whether ``save_best_model`` would keep a model scoring ``metric_value``."""
+    metrics_path = Path(metrics_path or Path("artifacts") / "metrics" / "best_metrics.json")
+    if not metrics_path.exists():
+        return True
+    try:
+        best_value = float(json.loads(metrics_path.read_text()).get(metric_name))
+    except (ValueError, TypeError, json.JSONDecodeError):
+        return True
+    return metric_value < best_value
+
+
+def save_best_model(
+    model,
+    metric_name: str,
+    metric_value: float,
+    extra: dict | None = None,
+    force: bool = False,
+    model_path: Path | None = None,
+    metrics_path: Path | None = None,
+    compressed=None,
+    compression: dict | None = None,
+) -> bool:
+    """Save ``model`` if it beats the metric stored next to it.
+
+    Defaults to the global ``artifacts/models/best_model.pkl`` and
+    ``artifacts/metrics/best_metrics.json``; segment models pass their own paths.
+    A ``compressed`` forest (see ``forest_compression``) is stored as a bundle
+    next to the pickle, with its ``compression`` report in the bundle metadata.
+    """
     artifacts_dir = Path("artifacts")
-    models_dir = artifacts_dir / "models"
-    metrics_dir = artifacts_dir / "metrics"
+    model_path = Path(model_path or artifacts_dir / "models" / "best_model.pkl")
+    metrics_path = Path(metrics_path or artifacts_dir / "metrics" / "best_metrics.json")
+    models_dir = model_path.parent
     models_dir.mkdir(parents=True, exist_ok=True)
-    metrics_dir.mkdir(parents=True, exist_ok=True)
-
-    metrics_path = metrics_dir / "best_metrics.json"
-    best_value = None
-    if metrics_path.exists():
-        try:
-            best_value = float(json.loads(metrics_path.read_text()).get(metric_name))
-        except (ValueError, TypeError, json.JSONDecodeError):
-            best_value = None
+    metrics_path.parent.mkdir(parents=True, exist_ok=True)
 
-    is_better = best_value is None or metric_value < best_value
+    is_better = force or beats_best(metric_name, metric_value, metrics_path)
     if is_better:
-        with (models_dir / "best_model.pkl").open("wb") as f:
-            pickle.dump(model, f)
+        payload = pickle.dumps(model)
+        sha256 = hashlib.sha256(payload).hexdigest()
+        bundle = None
+        if supports_bundle(model):
+            # Written before the pickle so a reloading registry always finds it.
+            bundle = save_forest_bundle(model, bundle_path_for(model_path, sha256[:12]))
+        compressed_bundle = None
+        if compressed is not None:
+            compressed_bundle = save_forest_bundle(
+                compressed,
+                compressed_bundle_path_for(model_path, sha256[:12]),
+                meta={"compression": compression or {}},
+            )
+        tmp_path = model_path.with_suffix(".pkl.tmp")
+        tmp_path.write_bytes(payload)
+        os.replace(tmp_path, model_path)
+        write_digest_sidecar(model_path, sha256)
+        for stale in models_dir.glob(f"{model_path.stem}.*.bundle"):
+            if stale not in (bundle, compressed_bundle):
+                shutil.rmtree(stale, ignore_errors=True)
         metrics_path.write_text(
-            json.dumps({metric_name: float(metric_value)}, indent=2),
+            json.dumps({metric_name: float(metric_value), **(extra or {})}, indent=2),
             encoding="utf-8",
         )
     return is_better
 
 
+def _training_extras(df: pd.DataFrame, train_seconds: float) -> dict:
+    extras = {"train_seconds": round(train_seconds, 3)}
+    peak = peak_rss_mb()
+    if peak is not None:
+        extras["peak_rss_mb"] = round(peak, 1)
+    if "Date" in df.columns:
+        extras["watermark"] = pd.Timestamp(df["Date"].max()).isoformat()
+    return extras
+
+
+ENCODINGS = ("onehot", "ordinal")
+
+
+def build_pipeline(
+    model,
+    dense: bool = False,
+    encoding: str = "onehot",
+    extra_numeric: list[str] | tuple[str, ...] = (),
+) -> Pipeline:
+    """Preprocess + model pipeline.
+
+    ``encoding="ordinal"`` replaces the one-hot block with one float32 code
+    column per categorical (unknown categories become -1), so the matrix stays
+    one column per feature. HistGradientBoosting then treats those columns as
+    native categoricals. ``extra_numeric`` columns (e.g. lag features) are
+    passed through after the schema's numeric columns.
+    """
+    numeric = NUMERIC_COLUMNS + list(extra_numeric)
+    if encoding not in ENCODINGS:
+        raise ValueError(f"encoding must be one of {ENCODINGS}, got {encoding!r}")
+    if encoding == "ordinal":
+        encoder = OrdinalEncoder(
+            handle_unknown="use_encoded_value", unknown_value=-1, dtype=np.float32
+        )
+        if "categorical_features" in model.get_params():
+            model.set_params(
+                categorical_features=[True] * len(CATEGORICAL_COLUMNS)
+                + [False] * len(numeric)
+            )
+    else:
+        encoder = OneHotEncoder(handle_unknown="ignore", sparse_output=not dense)
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ("cat", encoder, CATEGORICAL_COLUMNS),
+            ("num", "passthrough", numeric),
+        ]
+    )
+    return Pipeline(steps=[("preprocess", preprocessor), ("model", model)])
+
+
+def lean_training_matrix(
+    df: pd.DataFrame,
+    preprocessor,
+    columns: list[str] = FEATURE_COLUMNS,
+    fit_rows: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Encode ``df`` once into a float32 matrix without copying the frame.
+
+    Numeric columns are cast to float32 column by column and categoricals are
+    passed through as-is (``category`` dtype from ingestion), so the only
+    full-size allocation is the final (rows x features) float32 matrix. Splits then
+    index into it instead of copying DataFrames. The preprocessor is fitted on
+    the ``fit_rows`` positions only (all rows when ``None``), so test rows do
+    not leak into the encoding.
+    """
+    frame = pd.DataFrame(
+        {
+            column: df[column]
+            if column in CATEGORICAL_COLUMNS
+            else df[column].to_numpy(dtype=np.float32, copy=False)
+            for column in columns
+        },
+        index=df.index,
+        copy=False,
+    )
+    preprocessor.fit(frame if fit_rows is None else frame.iloc[fit_rows])
+    X = np.ascontiguousarray(preprocessor.transform(frame), dtype=np.float32)
+    y = df[TARGET].to_numpy(dtype=np.float32, copy=False)
+    return X, y
+
+
+def _train_lean(pipeline: Pipeline, df: pd.DataFrame, columns: list[str], random_state: int):
+    train_idx, test_idx = train_test_split(
+        np.arange(len(df)), test_size=0.2, random_state=random_state
+    )
+    start = time.perf_counter()
+    X, y = lean_training_matrix(
+        df, pipeline.named_steps["preprocess"], columns, fit_rows=train_idx
+    )
+    pipeline.named_steps["model"].fit(X[train_idx], y[train_idx])
+    train_seconds = time.perf_counter() - start
+    y_pred = pipeline.named_steps["model"].predict(X[test_idx])
+    mae = mean_absolute_error(y[test_idx], y_pred)
+    # Only the evaluation slice is materialized as a DataFrame.
+    test_rows = df.iloc[test_idx]
+    return train_seconds, mae, test_rows[columns], test_rows[TARGET], y_pred
+
+
+def fit_and_evaluate(
+    pipeline: Pipeline,
+    df: pd.DataFrame,
+    columns: list[str],
+    encoding: str,
+    random_state: int,
+):
+    """Fit on a random 80% of ``df``.
+
+    Returns (train_seconds, mae, X_test, y_test, y_pred).
+    """
+    if encoding == "ordinal":
+        return _train_lean(pipeline, df, columns, random_state)
+
+    X = df[columns]
+    y = df[TARGET]
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=random_state
+    )
+    start = time.perf_counter()
+    pipeline.fit(X_train, y_train)
+    train_seconds = time.perf_counter() - start
+    y_pred = pipeline.predict(X_test)
+    mae = mean_absolute_error(y_test, y_pred)
+    return train_seconds, mae, X_test, y_test, y_pred
+
+
 def train_model(
     df: pd.DataFrame,
     n_estimators: int = 200,
     random_state: int = 42,
     return_data: bool = False,
+    encoding: str | None = None,
+    extra_features: list[str] | None = None,
+    return_predictions: bool = False,
 ):
-    target = "Units Sold"
-    features = [
-        "Store ID",
-        "Product ID",
-        "Category",
-        "Region",
-        "Inventory Level",
-        "Units Ordered",
-        "Demand Forecast",
-        "Price",
-        "Discount",
-        "Weather Condition",
-        "Holiday/Promotion",
-        "Competitor Pricing",
-        "Seasonality",
-        "day_of_week",
-        "month",
-        "day",
-        "is_weekend",
-    ]
-
-    X = df[features]
-    y = df[target]
-
-    cat_cols = [
-        "Store ID",
-        "Product ID",
-        "Category",
-        "Region",
-        "Weather Condition",
-        "Seasonality",
-    ]
-    num_cols = [c for c in features if c not in cat_cols]
-
-    preprocessor = ColumnTransformer(
-        transformers=[
-            ("cat", OneHotEncoder(handle_unknown="ignore"), cat_cols),
-            ("num", "passthrough", num_cols),
-        ]
-    )
+    """Fit the default forest and save it if it beats the current best.
 
+    ``encoding`` defaults to ``TRAIN_ENCODING`` (``onehot``). With
+    ``"ordinal"`` the features are encoded once into a float32 code matrix
+    and split by index, which keeps peak memory close to the raw data size.
+    ``extra_features`` are numeric columns of ``df`` used on top of the
+    schema's features. ``return_predictions`` adds the test-set predictions
+    to the ``return_data`` tuple. With ``COMPRESS_MODEL=1`` a compressed forest is built
+    from half of the test rows (configured by the ``COMPRESS_*`` variables),
+    reported on the other half and saved next to the model. Compression
+    only runs when the model will be saved. SHAP explanations of a model served
+    in the ``compressed`` format come from the uncompressed pickle.
+    """
+    encoding = encoding or os.getenv("TRAIN_ENCODING", "onehot")
+    extra_features = list(extra_features or [])
+    columns = FEATURE_COLUMNS + extra_features
     model = RandomForestRegressor(
         n_estimators=n_estimators,
         random_state=random_state,
         n_jobs=-1,
     )
-    pipeline = Pipeline(steps=[("preprocess", preprocessor), ("model", model)])
+    pipeline = build_pipeline(model, encoding=encoding, extra_numeric=extra_features)
+    train_seconds, mae, X_test, y_test, y_pred = fit_and_evaluate(
+        pipeline, df, columns, encoding, random_state
+    )
 
+    if mlflow is not None:
+        with mlflow.start_run():
+            mlflow.log_metric("mae", mae)
+            mlflow.sklearn.log_model(pipeline, "model")
+
+    extra = _training_extras(df, train_seconds)
+    compressed = report = None
+    if (
+        os.getenv("COMPRESS_MODEL", "0") == "1"
+        and supports_bundle(pipeline)
+        and beats_best("mae", float(mae))
+    ):
+        compressed, report = compress_and_report(
+            pipeline, X_test, y_test, CompressionConfig.from_env(os.environ), random_state
+        )
+        write_report(report)
+        extra["compressed"] = report["variants"]["compressed"]
+
+    if save_best_model(
+        pipeline, "mae", float(mae), extra=extra, compressed=compressed, compression=report
+    ):
+        # Serving compares live traffic with the data the saved model saw.
+        save_reference_profile(df)
+    logger.info(
+        "Trained %s model with MAE %s in %.2fs (peak RSS %s MB)",
+        encoding,
+        mae,
+        train_seconds,
+        format_mb(peak_rss_mb()),
+    )
+    if return_data and return_predictions:
+        return pipeline, mae, X_test, y_test, y_pred
+    if return_data:
+        return pipeline, mae, X_test, y_test
+    return pipeline, mae
+
+
+# name -> (estimator class, needs a dense one-hot matrix)
+SEARCH_ESTIMATORS = {
+    "random_forest": (RandomForestRegressor, False),
+    "extra_trees": (ExtraTreesRegressor, False),
+    "hist_gradient_boosting": (HistGradientBoostingRegressor, True),
+}
+
+DEFAULT_SEARCH_SPACE = {
+    "random_forest": {
+        "n_estimators": [100, 200],
+        "max_depth": [None, 20],
+        "min_samples_leaf": [1, 5],
+    },
+    "extra_trees": {
+        "n_estimators": [100, 200],
+        "max_depth": [None, 20],
+        "min_samples_leaf": [1, 5],
+    },
+    "hist_gradient_boosting": {
+        "learning_rate": [0.05, 0.1],
+        "max_iter": [200, 400],
+        "max_leaf_nodes": [31, 63],
+    },
+}
+
+_search_data = None
+
+
+def _make_candidate(
+    name: str,
+    params: dict,
+    n_jobs: int,
+    random_state: int,
+    encoding: str = "onehot",
+    extra_features: tuple[str, ...] = (),
+) -> Pipeline:
+    estimator_cls, dense = SEARCH_ESTIMATORS[name]
+    kwargs = dict(params, random_state=random_state)
+    if "n_jobs" in estimator_cls().get_params():
+        kwargs["n_jobs"] = n_jobs
+    return build_pipeline(
+        estimator_cls(**kwargs), dense=dense, encoding=encoding, extra_numeric=extra_features
+    )
+
+
+def _candidates(search_space: dict, n_iter: int | None, random_state: int) -> list:
+    candidates = []
+    for name, space in search_space.items():
+        grid = ParameterGrid(space)
+        if n_iter is None or n_iter >= len(grid):
+            params_list = list(grid)
+        else:
+            params_list = list(
+                ParameterSampler(space, n_iter=n_iter, random_state=random_state)
+            )
+        candidates.extend((name, params) for params in params_list)
+    return candidates
+
+
+def _init_search_worker(X_fit, y_fit, X_val, y_val) -> None:
+    global _search_data
+    _search_data = (X_fit, y_fit, X_val, y_val)
+
+
+def _evaluate_candidate(task: tuple) -> dict:
+    name, params, n_rows, n_jobs, random_state, encoding, extra_features = task
+    X_fit, y_fit, X_val, y_val = _search_data
+    with threadpool_limits(limits=n_jobs):
+        pipeline = _make_candidate(
+            name, params, n_jobs, random_state, encoding, extra_features
+        )
+        start = time.perf_counter()
+        pipeline.fit(X_fit.iloc[:n_rows], y_fit.iloc[:n_rows])
+        fit_seconds = time.perf_counter() - start
+        mae = mean_absolute_error(y_val, pipeline.predict(X_val))
+    return {
+        "estimator": name,
+        "params": params,
+        "n_rows": n_rows,
+        "mae": float(mae),
+        "fit_seconds": fit_seconds,
+    }
+
+
+def _log_search_to_mlflow(history: list[dict], best: dict, mae: float, pipeline) -> None:
+    with mlflow.start_run(run_name="model_search"):
+        for result in history:
+            with mlflow.start_run(run_name=result["estimator"], nested=True):
+                mlflow.log_params(
+                    {
+                        "estimator": result["estimator"],
+                        "n_rows": result["n_rows"],
+                        **{k: str(v) for k, v in result["params"].items()},
+                    }
+                )
+                mlflow.log_metric("mae", result["mae"])
+                mlflow.log_metric("fit_seconds", result["fit_seconds"])
+        mlflow.log_params(
+            {
+                "best_estimator": best["estimator"],
+                **{k: str(v) for k, v in best["params"].items()},
+            }
+        )
+        mlflow.log_metric("mae", mae)
+        mlflow.sklearn.log_model(pipeline, "model")
+
+
+def search_models(
+    df: pd.DataFrame,
+    search_space: dict | None = None,
+    n_iter: int | None = None,
+    min_fraction: float = 1 / 9,
+    factor: int = 3,
+    workers: int | None = None,
+    random_state: int = 42,
+    return_data: bool = False,
+    encoding: str | None = None,
+    return_predictions: bool = False,
+    extra_features: list[str] | None = None,
+):
+    """Successive-halving search over several estimators.
+
+    Every candidate is fitted on ``min_fraction`` of the training rows and
+    scored on a validation split; the best ``1/factor`` move on to a
+    ``factor`` times larger fraction until one round runs on all rows.
+    Candidates are fitted in a process pool, and each worker's BLAS/OpenMP
+    and ``n_jobs`` threads are limited to its share of the cores. The winner
+    is refitted on the full training split and goes through
+    ``save_best_model``. ``encoding`` is passed to ``build_pipeline`` for
+    every candidate (default ``TRAIN_ENCODING``), and ``extra_features``
+    (e.g. lag features) are used on top of the schema columns as in
+    ``train_model``.
+    """
+    encoding = encoding or os.getenv("TRAIN_ENCODING", "onehot")
+    extra_features = tuple(extra_features or ())
+    X = df[FEATURE_COLUMNS + list(extra_features)]
+    y = df[TARGET]
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, test_size=0.2, random_state=random_state
     )
+    X_fit, X_val, y_fit, y_val = train_test_split(
+        X_train, y_train, test_size=0.2, random_state=random_state
+    )
 
+    candidates = _candidates(search_space or DEFAULT_SEARCH_SPACE, n_iter, random_state)
+    cores = os.cpu_count() or 1
+    workers = max(1, min(workers or cores, len(candidates)))
+    history: list[dict] = []
+
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_search_worker,
+            initargs=(X_fit, y_fit, X_val, y_val),
+        )
+    else:
+        _init_search_worker(X_fit, y_fit, X_val, y_val)
+
+    try:
+        fraction = min_fraction
+        while True:
+            n_rows = max(1, int(len(X_fit) * min(fraction, 1.0)))
+            inner_jobs = max(1, cores // min(workers, len(candidates)))
+            tasks = [
+                (name, params, n_rows, inner_jobs, random_state, encoding, extra_features)
+                for name, params in candidates
+            ]
+            if pool is not None:
+                results = list(pool.map(_evaluate_candidate, tasks))
+            else:
+                results = [_evaluate_candidate(task) for task in tasks]
+            for result in results:
+                logger.info(
+                    "Candidate %s %s on %d rows: MAE %.4f in %.2fs",
+                    result["estimator"],
+                    result["params"],
+                    result["n_rows"],
+                    result["mae"],
+                    result["fit_seconds"],
+                )
+            history.extend(results)
+
+            if fraction >= 1 or len(candidates) == 1:
+                break
+            keep = max(1, math.ceil(len(candidates) / factor))
+            ranked = sorted(range(len(results)), key=lambda i: results[i]["mae"])
+            candidates = [candidates[i] for i in ranked[:keep]]
+            fraction *= factor
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    best = min(results, key=lambda result: result["mae"])
+    pipeline = _make_candidate(
+        best["estimator"], best["params"], -1, random_state, encoding, extra_features
+    )
+    start = time.perf_counter()
     pipeline.fit(X_train, y_train)
-    preds = pipeline.predict(X_test)
-    mae = mean_absolute_error(y_test, preds)
+    train_seconds = time.perf_counter() - start
+    logger.info(
+        "Refitted best candidate %s %s in %.2fs",
+        best["estimator"],
+        best["params"],
+        train_seconds,
+    )
+    y_pred = pipeline.predict(X_test)
+    mae = mean_absolute_error(y_test, y_pred)
 
     if mlflow is not None:
-        with mlflow.start_run():
-            mlflow.log_metric("mae", mae)
-            mlflow.sklearn.log_model(pipeline, "model")
+        _log_search_to_mlflow(history, best, float(mae), pipeline)
 
-    save_best_model(pipeline, "mae", float(mae))
-    logger.info("Trained model with MAE %s", mae)
+    if save_best_model(pipeline, "mae", float(mae), extra=_training_extras(df, train_seconds)):
+        save_reference_profile(df)
+    logger.info("Model search finished with MAE %s", mae)
+    if return_data and return_predictions:
+        return pipeline, mae, X_test, y_test, y_pred
     if return_data:
         return pipeline, mae, X_test, y_test
     return pipeline, mae
+
+
+def _update_best_metrics(updates: dict) -> None:
+    metrics_path = Path("artifacts") / "metrics" / "best_metrics.json"
+    metrics = {**load_best_metrics(), **updates}
+    metrics_path.write_text(json.dumps(metrics, indent=2), encoding="utf-8")
+
+
+def update_model_incrementally(
+    df: pd.DataFrame,
+    new_estimators: int = 20,
+    window_days: int = 28,
+    holdout_fraction: float = 0.2,
+) -> dict | None:
+    """Grow the current best model with rows newer than its Date watermark.
+
+    The saved preprocessor is reused as-is and ``new_estimators`` extra trees
+    (or boosting iterations) are fitted with ``warm_start`` on the last
+    ``window_days`` of data. The newest ``holdout_fraction`` of the new days is
+    held out: neither model has seen it, and the update is kept only if it
+    does not worsen MAE there. The holdout MAE is stored as
+    ``incremental_mae``; the global ``mae`` from the full training holdout is
+    left untouched. Every attempt is recorded in ``best_metrics.json``, so a
+    rejected update is not retried until newer rows arrive. Returns a report,
+    or ``None`` when there is nothing new to learn from.
+    """
+    metrics = load_best_metrics()
+    watermark = metrics.get("watermark")
+    model_path = Path("artifacts") / "models" / "best_model.pkl"
+    if watermark is None or not model_path.exists():
+        logger.info("No watermarked model to update; run a full training first")
+        return None
+
+    watermark = pd.Timestamp(watermark)
+    dates = pd.to_datetime(df["Date"])
+    new_rows = int((dates > watermark).sum())
+    if new_rows == 0:
+        logger.info("No rows newer than watermark %s", watermark.date())
+        return None
+    newest = pd.Timestamp(dates.max())
+    last_attempt = metrics.get("incremental_attempt") or {}
+    if last_attempt.get("through") is not None and newest <= pd.Timestamp(last_attempt["through"]):
+        logger.info("Update through %s was already attempted", newest.date())
+        return {**last_attempt, "skipped": True}
+
+    new_days = np.sort(dates[dates > watermark].unique())
+    if len(new_days) < 2:
+        logger.info("Need at least two new days to hold one out; waiting for more data")
+        return None
+    holdout_start = pd.Timestamp(new_days[-max(1, int(len(new_days) * holdout_fraction))])
+
+    start = time.perf_counter()
+    with model_path.open("rb") as f:
+        pipeline = pickle.load(f)
+    preprocessor = pipeline.named_steps["preprocess"]
+    estimator = pipeline.named_steps["model"]
+    params = estimator.get_params()
+    if "warm_start" not in params:
+        raise ValueError(f"{type(estimator).__name__} does not support warm_start")
+    size_param = "n_estimators" if "n_estimators" in params else "max_iter"
+
+    columns = list(preprocessor.feature_names_in_)
+    window = df[(dates > watermark - pd.Timedelta(days=window_days)) & (dates < holdout_start)]
+    holdout = df[dates >= holdout_start]
+    mae_before = float(mean_absolute_error(holdout[TARGET], pipeline.predict(holdout[columns])))
+
+    estimator.set_params(
+        warm_start=True, **{size_param: params[size_param] + new_estimators}
+    )
+    estimator.fit(preprocessor.transform(window[columns]), window[TARGET])
+    estimator.set_params(warm_start=False)
+    mae_after = float(mean_absolute_error(holdout[TARGET], pipeline.predict(holdout[columns])))
+    update_seconds = time.perf_counter() - start
+
+    accepted = mae_after <= mae_before
+    new_watermark = (
+        pd.Timestamp(dates[dates < holdout_start].max()) if accepted else watermark
+    ).isoformat()
+    attempt = {
+        "through": newest.isoformat(),
+        "accepted": accepted,
+        "holdout_start": holdout_start.isoformat(),
+        "mae_before": mae_before,
+        "mae_after": mae_after,
+    }
+    if accepted:
+        save_best_model(
+            pipeline,
+            "mae",
+            metrics["mae"],
+            extra={
+                **{key: value for key, value in metrics.items() if key != "mae"},
+                "watermark": new_watermark,
+                "incremental_mae": mae_after,
+                "incremental_seconds": round(update_seconds, 3),
+                "incremental_attempt": attempt,
+            },
+            force=True,
+        )
+    else:
+        _update_best_metrics({"incremental_attempt": attempt})
+
+    full_seconds = metrics.get("train_seconds")
+    report = {
+        "accepted": accepted,
+        "new_rows": new_rows,
+        "window_rows": int(len(window)),
+        "holdout_rows": int(len(holdout)),
+        "previous_watermark": watermark.isoformat(),
+        "watermark": new_watermark,
+        "mae_before": mae_before,
+        "mae_after": mae_after,
+        size_param: int(estimator.get_params()[size_param]),
+        "incremental_seconds": update_seconds,
+        "full_train_seconds": full_seconds,
+        "speedup": full_seconds / update_seconds if full_seconds else None,
+    }
+    logger.info(
+        "Incremental update %s: %d new rows, holdout MAE %.4f -> %.4f, %.2fs (full retrain %ss)",
+        "accepted" if accepted else "rejected",
+        new_rows,
+        mae_before,
+        mae_after,
+        update_seconds,
+        full_seconds,
+    )
+    return report
@@ -1,48 +1,234 @@
-import pickle
-from pathlib import Path
+import os
+import threading
+
+import numpy as np
 import pandas as pd
 
+from explainer import ModelExplainer
+from lag_features import (
+    add_serving_features,
+    get_state_store,
+    model_lag_columns,
+    serving_date_errors,
+)
+from model_registry import get_registry
+from prediction_cache import cache_key, get_cache
+from segment_models import SegmentRouter
+from serving_metrics import profile_slow, stage
+
+
+PREDICT_MODES = ("sklearn", "compiled")
+_predict_mode = os.getenv("PREDICT_MODE", "sklearn")
+
+
+def set_predict_mode(mode: str) -> None:
+    global _predict_mode
+    if mode not in PREDICT_MODES:
+        raise ValueError(f"Unknown predict mode {mode!r}; expected one of {PREDICT_MODES}.")
+    _predict_mode = mode
+
+
+def get_predict_mode() -> str:
+    return _predict_mode
+
+
+_segment_manifest = os.getenv("SEGMENT_MANIFEST") or None
+_segment_router: SegmentRouter | None = None
+_router_lock = threading.Lock()
+
+
+def set_segment_manifest(path: str | os.PathLike | None) -> None:
+    """Route predictions through per-segment models (``None`` turns it off)."""
+    global _segment_manifest, _segment_router
+    with _router_lock:
+        _segment_manifest = str(path) if path else None
+        _segment_router = None
+
+
+def get_segment_router() -> SegmentRouter | None:
+    global _segment_router
+    if _segment_manifest is None:
+        return None
+    router = _segment_router
+    if router is None:
+        with _router_lock:
+            if _segment_router is None:
+                _segment_router = SegmentRouter(_segment_manifest)
+            router = _segment_router
+    return router
+
 
 def load_model():
-    model_path = Path("artifacts") / "models" / "best_model.pkl"
-    with model_path.open("rb") as f:
-        return pickle.load(f)
+    return get_registry().get_model()
 
 
-def predict(input_df: pd.DataFrame):
-    model = load_model()
-    return model.predict(input_df)
+def _predictor(loaded):
+    if _predict_mode == "compiled":
+        # Imported on demand: numba and sklearn add ~1s to API startup.
+        from compiled_predictor import supports_compiled
+
+        if supports_compiled(loaded.model):
+            return loaded.get_derived("compiled", _build_compiled)
+    return loaded.model
+
+
+def _build_compiled(model):
+    from compiled_predictor import CompiledPredictor
+
+    return CompiledPredictor.from_pipeline(
+        model, use_numba=os.getenv("PREDICT_NUMBA", "1") == "1"
+    )
+
+
+def model_info() -> dict:
+    return get_registry().get().info()
+
+
+def get_explainer() -> ModelExplainer:
+    return get_registry().get().get_derived("explainer", ModelExplainer)
+
 
+def _loaded():
+    with stage("model_load"):
+        return get_registry().get()
 
-def explain(input_df: pd.DataFrame, top_n: int = 10):
-    model = load_model()
-    preprocessor = model.named_steps["preprocess"]
-    estimator = model.named_steps["model"]
 
-    X = preprocessor.transform(input_df)
-    feature_names = preprocessor.get_feature_names_out()
+def _run_predictor(predictor, df: pd.DataFrame):
+    """``predictor.predict(df)``, timed as separate preprocess and predict stages."""
+    if hasattr(predictor, "predict_transformed"):
+        # CompiledPredictor and MappedForestPipeline.
+        with stage("preprocess"):
+            X = predictor.transform(df)
+        with stage("predict"):
+            return predictor.predict_transformed(X)
+    if hasattr(predictor, "steps"):  # sklearn Pipeline
+        with stage("preprocess"):
+            X = predictor[:-1].transform(df)
+        with stage("predict"):
+            return predictor[-1].predict(X)
+    with stage("predict"):
+        return predictor.predict(df)
 
-    import shap
 
-    explainer = shap.TreeExplainer(estimator)
-    shap_values = explainer.shap_values(X)
-    if isinstance(shap_values, list):
-        shap_values = shap_values[0]
+def _predict_frame(loaded, df: pd.DataFrame):
+    """Predict ``df`` with the global model, or per segment when routing is on.
 
-    if hasattr(X, "toarray"):
-        row_values = X[0].toarray().ravel()
+    Rows of a segment without its own model use the global model.
+    """
+    router = get_segment_router()
+    if router is None:
+        return _run_predictor(_predictor(loaded), df)
+    plan = router.route(df, fallback=_predictor(loaded))
+    if len(plan) == 1:
+        return np.asarray(_run_predictor(plan[0][0], df), dtype=float)
+    out = np.empty(len(df), dtype=float)
+    for model, positions in plan:
+        out[positions] = _run_predictor(model, df.iloc[positions])
+    return out
+
+
+def _with_history(input_df: pd.DataFrame, loaded) -> pd.DataFrame:
+    """Add lag features from the series state when the model uses them."""
+    return add_serving_features(input_df, loaded.get_derived("lag_columns", model_lag_columns))
+
+
+def series_date_errors(input_df: pd.DataFrame) -> np.ndarray:
+    """Per-row errors for rows whose lag features the series state cannot provide."""
+    loaded = _loaded()
+    return serving_date_errors(input_df, loaded.get_derived("lag_columns", model_lag_columns))
+
+
+def _cache_version(loaded) -> str:
+    version = loaded.version
+    # Lag features change whenever the series state is refreshed.
+    if loaded.get_derived("lag_columns", model_lag_columns):
+        version = f"{version}:{get_state_store().version}"
+    router = get_segment_router()
+    if router is not None:
+        version = f"{version}:segments-{router.current_version()}"
+    return version
+
+
+@profile_slow("predict")
+def predict(input_df: pd.DataFrame):
+    loaded = _loaded()
+    with stage("dataframe"):
+        df = _with_history(input_df, loaded)
+    return _predict_frame(loaded, df)
+
+
+def _explain_frame(
+    loaded, df: pd.DataFrame, top_n: int, fold_categories: bool
+) -> list[list[dict]]:
+    """Explain ``df`` with the model that predicts it, per segment when routing is on.
+
+    Each segment model keeps its own explainer, cached on its ``LoadedModel``.
+    """
+    router = get_segment_router()
+    if router is None:
+        plan = [(loaded, np.arange(len(df)))]
     else:
-        row_values = X[0]
-
-    contributions = []
-    for name, value, impact in zip(feature_names, row_values, shap_values[0]):
-        contributions.append(
-            {
-                "feature": str(name),
-                "value": float(value),
-                "impact": float(impact),
-            }
-        )
-
-    contributions.sort(key=lambda x: abs(x["impact"]), reverse=True)
-    return contributions[:top_n]
+        plan = router.route(df, fallback=loaded, loaded=True)
+    out: list[list[dict]] = [[] for _ in range(len(df))]
+    for model, positions in plan:
+        explainer = model.get_derived("explainer", ModelExplainer)
+        part = df if len(plan) == 1 else df.iloc[positions]
+        with stage("shap"):
+            contributions = explainer.explain(part, top_n=top_n, fold_categories=fold_categories)
+        for position, contribution in zip(positions, contributions):
+            out[position] = contribution
+    return out
+
+
+def explain_batch(
+    input_df: pd.DataFrame, top_n: int = 10, fold_categories: bool = False
+) -> list[list[dict]]:
+    loaded = _loaded()
+    with stage("dataframe"):
+        df = _with_history(input_df, loaded)
+    return _explain_frame(loaded, df, top_n, fold_categories)
+
+
+def explain(input_df: pd.DataFrame, top_n: int = 10, fold_categories: bool = False):
+    return explain_batch(input_df.iloc[:1], top_n=top_n, fold_categories=fold_categories)[0]
+
+
+@profile_slow("predict_records")
+def predict_records(records: list[dict]) -> list[float]:
+    """Predict feature dicts, serving repeats from the prediction cache."""
+    loaded = _loaded()
+    version = _cache_version(loaded)
+    with stage("cache_key"):
+        keys = [cache_key("predict", record, version) for record in records]
+
+    def compute(positions: list[int]) -> list[float]:
+        with stage("dataframe"):
+            df = _with_history(pd.DataFrame([records[i] for i in positions]), loaded)
+        return _predict_frame(loaded, df).astype(float).tolist()
+
+    return get_cache().get_or_compute_many(keys, version, compute)
+
+
+@profile_slow("explain_records")
+def explain_records(
+    records: list[dict], top_n: int = 10, fold_categories: bool = False
+) -> list[dict]:
+    loaded = _loaded()
+    version = _cache_version(loaded)
+    with stage("cache_key"):
+        keys = [
+            cache_key("explain", record, version, top_n=top_n, fold_categories=fold_categories)
+            for record in records
+        ]
+
+    def compute(positions: list[int]) -> list[dict]:
+        with stage("dataframe"):
+            df = _with_history(pd.DataFrame([records[i] for i in positions]), loaded)
+        preds = _predict_frame(loaded, df)
+        contributions = _explain_frame(loaded, df, top_n, fold_categories)
+        return [
+            {"prediction": float(pred), "contributions": contribution}
+            for pred, contribution in zip(preds, contributions)
+        ]
+
+    return get_cache().get_or_compute_many(keys, version, compute)
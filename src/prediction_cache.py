@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable
+
+from logger import get_logger
+from serving_metrics import stage
+
+
+logger = get_logger(__name__)
+
+
+def cache_key(kind: str, features: dict, model_version: str, **params) -> str:
+    payload = json.dumps(
+        {"kind": kind, "features": features, "params": params, "model": model_version},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SqliteCacheBackend:
+    """Shared on-disk cache tier so several processes/containers share hits.
+
+    Every ``prune_every`` writes, rows older than ``ttl`` seconds are deleted
+    and only the newest ``max_rows`` are kept, so the file stays bounded
+    under steady traffic.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        ttl: float = 0.0,
+        max_rows: int = 100_000,
+        prune_every: int = 1000,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.prune_every = max(1, prune_every)
+        self.pruned = 0
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS predictions ("
+                "key TEXT PRIMARY KEY, version TEXT, value TEXT, created REAL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS predictions_created ON predictions (created)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str, ttl: float) -> Any | None:
+        row = self._connect().execute(
+            "SELECT value, created FROM predictions WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or (ttl > 0 and time.time() - row[1] > ttl):
+            return None
+        return json.loads(row[0])
+
+    def set(self, key: str, version: str, value: Any) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?)",
+                (key, version, json.dumps(value), time.time()),
+            )
+        with self._writes_lock:
+            self._writes += 1
+            due = self._writes % self.prune_every == 0
+        if due:
+            self.prune()
+
+    def prune(self) -> int:
+        """Delete expired rows and the oldest rows beyond ``max_rows``."""
+        with self._connect() as conn:
+            deleted = 0
+            if self.ttl > 0:
+                deleted += conn.execute(
+                    "DELETE FROM predictions WHERE created < ?", (time.time() - self.ttl,)
+                ).rowcount
+            if self.max_rows > 0:
+                deleted += conn.execute(
+                    "DELETE FROM predictions WHERE key IN ("
+                    "SELECT key FROM predictions ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                    (self.max_rows,),
+                ).rowcount
+        self.pruned += deleted
+        return deleted
+
+    def drop_other_versions(self, version: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM predictions WHERE version != ?", (version,))
+
+    def clear(self) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM predictions")
+
+
+class PredictionCache:
+    """In-process LRU + TTL cache for prediction/explanation results.
+
+    Keys include the model version, and the cache drops all entries the first
+    time it sees a new version, so a newly saved best model never serves stale
+    results.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 10_000,
+        ttl: float = 300.0,
+        backend: SqliteCacheBackend | None = None,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.backend = backend
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._version: str | None = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def _check_version(self, version: str) -> None:
+        if version == self._version:
+            return
+        if self._version is not None:
+            self._entries.clear()
+            self.invalidations += 1
+            if self.backend is not None:
+                self.backend.drop_other_versions(version)
+        self._version = version
+
+    def get(self, key: str, version: str) -> Any | None:
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is not None:
+                created, value = entry
+                if self.ttl <= 0 or time.monotonic() - created <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+
+        value = self.backend.get(key, self.ttl) if self.backend is not None else None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._store(key, value)
+        return value
+
+    def set(self, key: str, version: str, value: Any) -> None:
+        with self._lock:
+            self._check_version(version)
+            self._store(key, value)
+        if self.backend is not None:
+            self.backend.set(key, version, value)
+
+    def _store(self, key: str, value: Any) -> None:
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_or_compute_many(
+        self,
+        keys: list[str],
+        version: str,
+        compute: Callable[[list[int]], list[Any]],
+    ) -> list[Any]:
+        """Look up ``keys`` and compute all misses with one ``compute`` call.
+
+        ``compute`` receives the positions of the missing keys and must return
+        their values in the same order.
+        """
+        if not self.enabled:
+            return compute(list(range(len(keys))))
+
+        with stage("cache_lookup"):
+            results = [self.get(key, version) for key in keys]
+            missing = [i for i, value in enumerate(results) if value is None]
+        if missing:
+            values = compute(missing)
+            with stage("cache_store"):
+                for position, value in zip(missing, values):
+                    results[position] = value
+                    self.set(keys[position], version, value)
+        return results
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "backend": "sqlite" if self.backend is not None else "memory",
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "model_version": self._version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+def _cache_from_env() -> PredictionCache:
+    backend = None
+    if os.getenv("PREDICTION_CACHE_BACKEND", "memory") == "sqlite":
+        path = os.getenv(
+            "PREDICTION_CACHE_PATH", str(Path("artifacts") / "cache" / "predictions.sqlite")
+        )
+        backend = SqliteCacheBackend(
+            path,
+            ttl=float(os.getenv("PREDICTION_CACHE_TTL", "300")),
+            max_rows=int(os.getenv("PREDICTION_CACHE_SQLITE_MAX_ROWS", "100000")),
+        )
+        logger.info("Using shared prediction cache at %s", path)
+    return PredictionCache(
+        max_size=int(os.getenv("PREDICTION_CACHE_SIZE", "10000")),
+        ttl=float(os.getenv("PREDICTION_CACHE_TTL", "300")),
+        backend=backend,
+    )
+
+
+_cache = _cache_from_env()
+
+
+def get_cache() -> PredictionCache:
+    return _cache
@@ -0,0 +1,276 @@
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import pandas as pd
+
+from data_transformation import transform
+from feature_schema import (
+    CATEGORICAL_COLUMNS,
+    FEATURE_COLUMNS,
+    FLOAT_COLUMNS,
+    INTEGER_COLUMNS,
+    LAG_FEATURE_COLUMNS,
+    TARGET,
+)
+from lag_features import (
+    SeriesStateStore,
+    add_serving_features,
+    compute_lag_features,
+    model_lag_columns,
+)
+from logger import get_logger
+from model_registry import DEFAULT_MODEL_PATH, ModelRegistry
+from resource_usage import format_mb, peak_rss_mb
+
+try:
+    import pyarrow as pa  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+except ModuleNotFoundError:
+    pa = None
+    pq = None
+
+
+logger = get_logger(__name__)
+
+_worker_registry: ModelRegistry | None = None
+
+
+def _require_pyarrow() -> None:
+    if pq is None:
+        raise ModuleNotFoundError("Parquet input/output requires pyarrow.")
+
+
+def iter_chunks(input_path: Path, chunksize: int) -> Iterator[pd.DataFrame]:
+    if input_path.suffix == ".parquet":
+        _require_pyarrow()
+        parquet = pq.ParquetFile(input_path)
+        for batch in parquet.iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(input_path, chunksize=chunksize)
+
+
+def with_file_history(chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+    """Add lag features computed from the file's own ``Units Sold`` history.
+
+    Chunks must be in ``Date`` order within each series; each chunk continues
+    the series history of the chunks before it. Chunks without ``Date`` and
+    ``Units Sold``, or that already carry lag columns, pass through and
+    get their lags from the series state at scoring time.
+    """
+    state: SeriesStateStore | None = None
+    for chunk in chunks:
+        columns = set(chunk.columns)
+        if not {"Date", TARGET} <= columns or set(LAG_FEATURE_COLUMNS) <= columns:
+            yield chunk
+        elif state is None:
+            state = SeriesStateStore.from_frame(chunk)
+            yield compute_lag_features(chunk)
+        else:
+            features, state = state.update(chunk)
+            yield features
+
+
+def _ndjson(chunk: pd.DataFrame) -> str:
+    # Older pandas versions omit the trailing newline.
+    text = chunk.to_json(orient="records", lines=True, date_format="iso")
+    return text.rstrip("\n") + "\n"
+
+
+def _parquet_type(field):
+    """Output type of a column, fixed up front so every chunk matches it."""
+    if field.name in CATEGORICAL_COLUMNS:
+        return pa.string()
+    if field.name in INTEGER_COLUMNS:
+        return pa.int64()
+    if field.name in FLOAT_COLUMNS or field.name in LAG_FEATURE_COLUMNS:
+        return pa.float64()
+    if field.name == "prediction":
+        return pa.float64()
+    # Other columns follow the first chunk, widened so later NaNs or
+    # fractions still fit.
+    if pa.types.is_integer(field.type) or pa.types.is_floating(field.type):
+        return pa.float64()
+    if pa.types.is_null(field.type):
+        return pa.string()
+    return field.type
+
+
+class ChunkWriter:
+    """Appends scored chunks to a CSV, NDJSON (.ndjson/.jsonl) or Parquet file."""
+
+    def __init__(self, output_path: Path):
+        self.output_path = output_path
+        self._parquet = output_path.suffix == ".parquet"
+        self._ndjson = output_path.suffix in (".ndjson", ".jsonl")
+        self._writer = None
+        self._schema = None
+        self._wrote_header = False
+        if self._parquet:
+            _require_pyarrow()
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        if output_path.exists():
+            output_path.unlink()
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        if self._parquet:
+            if self._schema is None:
+                inferred = pa.Table.from_pandas(chunk, preserve_index=False).schema
+                self._schema = pa.schema(
+                    [pa.field(field.name, _parquet_type(field)) for field in inferred]
+                )
+                self._writer = pq.ParquetWriter(self.output_path, self._schema)
+            table = pa.Table.from_pandas(chunk, schema=self._schema, preserve_index=False)
+            self._writer.write_table(table)
+        elif self._ndjson:
+            with self.output_path.open("a", encoding="utf-8") as f:
+                f.write(_ndjson(chunk))
+        else:
+            chunk.to_csv(
+                self.output_path,
+                mode="a",
+                header=not self._wrote_header,
+                index=False,
+            )
+            self._wrote_header = True
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+
+def _init_worker(model_path: str) -> None:
+    global _worker_registry
+    _worker_registry = ModelRegistry(Path(model_path))
+
+
+def score_chunk(chunk: pd.DataFrame, registry: ModelRegistry | None = None) -> pd.DataFrame:
+    registry = registry or _worker_registry
+    if "Date" in chunk.columns:
+        chunk = transform(chunk)
+    model = registry.get_model()
+    lag_columns = model_lag_columns(model)
+    features = add_serving_features(chunk, lag_columns)
+    chunk["prediction"] = model.predict(features[FEATURE_COLUMNS + lag_columns])
+    return chunk
+
+
+def score_chunks(
+    chunks: Iterable[pd.DataFrame],
+    model_path: str | Path = DEFAULT_MODEL_PATH,
+    workers: int = 1,
+    registry: ModelRegistry | None = None,
+) -> Iterator[pd.DataFrame]:
+    """Score ``chunks`` lazily and yield them in input order.
+
+    With one worker, chunks are scored in this process, through ``registry``
+    when given (e.g. the API's already loaded model).
+    """
+    if not Path(model_path).exists():
+        raise FileNotFoundError(f"Model not found at {model_path}. Train the model first.")
+
+    if workers <= 1:
+        registry = registry or ModelRegistry(Path(model_path))
+        for chunk in chunks:
+            yield score_chunk(chunk, registry)
+        return
+
+    # Keep at most two chunks per worker in flight so memory stays bounded
+    # regardless of input size.
+    pending = deque()
+    # Spawned rather than forked: forking after numba/OpenMP thread pools
+    # have started can deadlock the workers.
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(str(model_path),),
+    ) as pool:
+        for chunk in chunks:
+            pending.append(pool.submit(score_chunk, chunk))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def score_file(
+    input_path: str | Path,
+    output_path: str | Path,
+    model_path: str | Path = DEFAULT_MODEL_PATH,
+    chunksize: int = 50_000,
+    workers: int = 1,
+) -> int:
+    input_path = Path(input_path)
+    output_path = Path(output_path)
+    if not Path(model_path).exists():
+        raise FileNotFoundError(f"Model not found at {model_path}. Train the model first.")
+
+    registry = ModelRegistry(Path(model_path))
+    chunks = iter_chunks(input_path, chunksize)
+    # Only lag models need the file's history, which also requires the
+    # file to be in date order; other models score rows in any order.
+    if model_lag_columns(registry.get_model()):
+        chunks = with_file_history(chunks)
+
+    writer = ChunkWriter(output_path)
+    start = time.perf_counter()
+    total_rows = 0
+    try:
+        chunk_start = time.perf_counter()
+        scored_chunks = score_chunks(chunks, model_path, workers, registry=registry)
+        for index, scored in enumerate(scored_chunks):
+            writer.write(scored)
+            total_rows += len(scored)
+            elapsed = time.perf_counter() - chunk_start
+            logger.info(
+                "Scored chunk %d: %d rows (%d total), %.0f rows/s, peak RSS %s MB",
+                index,
+                len(scored),
+                total_rows,
+                len(scored) / elapsed if elapsed > 0 else float("inf"),
+                format_mb(peak_rss_mb()),
+            )
+            chunk_start = time.perf_counter()
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    logger.info(
+        "Scored %d rows from %s into %s in %.2fs (%.0f rows/s)",
+        total_rows,
+        input_path,
+        output_path,
+        elapsed,
+        total_rows / elapsed if elapsed > 0 else float("inf"),
+    )
+    return total_rows
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Score a CSV/Parquet file in chunks.")
+    parser.add_argument("input", help="Input .csv or .parquet file")
+    parser.add_argument("output", help="Output .csv or .parquet file")
+    parser.add_argument("--model", default=str(DEFAULT_MODEL_PATH))
+    parser.add_argument("--chunksize", type=int, default=50_000)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    score_file(
+        args.input,
+        args.output,
+        model_path=args.model,
+        chunksize=args.chunksize,
+        workers=args.workers,
+    )
+
+
+if __name__ == "__main__":
+    main()
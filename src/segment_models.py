@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from feature_schema import FEATURE_COLUMNS
+from logger import get_logger
+from model_registry import ModelRegistry
+from serving_metrics import STAGE_SECONDS, stage
+
+
+logger = get_logger(__name__)
+
+SEGMENTS_DIR = Path("artifacts") / "models" / "segments"
+MANIFEST_NAME = "manifest.json"
+DEFAULT_MAX_LOADED = int(os.getenv("SEGMENT_MAX_LOADED", "8"))
+
+
+def _slug(value) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "-", str(value)).strip("-") or "_"
+
+
+def segment_slug(values: tuple) -> str:
+    return "__".join(_slug(value) for value in values)
+
+
+def segment_dir(by: list[str], root: Path = SEGMENTS_DIR) -> Path:
+    """Where models segmented by ``by`` live, e.g. ``segments/Category__Region``."""
+    return Path(root) / segment_slug(tuple(by))
+
+
+def _fit_segment(task: tuple) -> dict:
+    df, by, values, n_estimators, random_state, encoding, n_jobs, out_dir = task
+    # Imported here so the router side of this module stays light.
+    from sklearn.ensemble import RandomForestRegressor
+    from threadpoolctl import threadpool_limits
+
+    import model_trainer
+
+    slug = segment_slug(values)
+    pipeline = model_trainer.build_pipeline(
+        RandomForestRegressor(n_estimators=n_estimators, random_state=random_state, n_jobs=n_jobs),
+        encoding=encoding,
+    )
+    with threadpool_limits(n_jobs):
+        train_seconds, mae, *_test = model_trainer.fit_and_evaluate(
+            pipeline, df, FEATURE_COLUMNS, encoding, random_state
+        )
+    extra = {
+        **model_trainer._training_extras(df, train_seconds),
+        "segment": dict(zip(by, map(str, values))),
+        "rows": len(df),
+    }
+    model_path = Path(out_dir) / f"{slug}.pkl"
+    saved = model_trainer.save_best_model(
+        pipeline,
+        "mae",
+        float(mae),
+        extra=extra,
+        model_path=model_path,
+        metrics_path=model_path.with_suffix(".json"),
+    )
+    return {
+        "slug": slug,
+        "values": [str(value) for value in values],
+        "rows": len(df),
+        "mae": float(mae),
+        "train_seconds": round(train_seconds, 3),
+        "saved": saved,
+    }
+
+
+def train_segment_models(
+    df: pd.DataFrame,
+    by: list[str] | tuple[str, ...] = ("Category",),
+    n_estimators: int = 100,
+    random_state: int = 42,
+    workers: int | None = None,
+    min_rows: int = 500,
+    encoding: str = "onehot",
+    root: Path = SEGMENTS_DIR,
+) -> dict:
+    """Fit one forest per ``by`` segment in parallel and write the manifest.
+
+    Each segment model goes through ``model_trainer.save_best_model`` with its
+    own metrics file, so a segment keeps its previous model unless the new one
+    has a lower MAE. Segments with fewer than ``min_rows`` rows get no model
+    and are served by the global model.
+    """
+    by = list(by)
+    out_dir = segment_dir(by, root)
+    workers = max(1, workers or os.cpu_count() or 1)
+    n_jobs = max(1, (os.cpu_count() or 1) // workers)
+
+    tasks, skipped = [], []
+    for values, group in df.groupby(by, sort=True, observed=True):
+        values = values if isinstance(values, tuple) else (values,)
+        if len(group) < min_rows:
+            skipped.append({"values": [str(value) for value in values], "rows": len(group)})
+            continue
+        tasks.append((group, by, values, n_estimators, random_state, encoding, n_jobs, str(out_dir)))
+
+    start = time.perf_counter()
+    if workers == 1 or len(tasks) <= 1:
+        reports = [_fit_segment(task) for task in tasks]
+    else:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            reports = list(pool.map(_fit_segment, tasks))
+    elapsed = time.perf_counter() - start
+
+    segments = {}
+    for report in reports:
+        model_path = out_dir / f"{report['slug']}.pkl"
+        # The stored model may be an earlier, better one than this run's.
+        stored = json.loads(model_path.with_suffix(".json").read_text(encoding="utf-8"))
+        segments[report["slug"]] = {
+            "values": report["values"],
+            "model": model_path.name,
+            "mae": stored["mae"],
+            "rows": stored.get("rows", report["rows"]),
+            "size_mb": round(model_path.stat().st_size / (1024 * 1024), 3),
+        }
+    # Weighted by what is served: the stored models, not only this run's fits.
+    weighted_mae = (
+        sum(entry["mae"] * entry["rows"] for entry in segments.values())
+        / sum(entry["rows"] for entry in segments.values())
+        if segments
+        else None
+    )
+    manifest = {
+        "by": by,
+        "encoding": encoding,
+        "trained_at": pd.Timestamp.now(tz="UTC").isoformat(),
+        "train_seconds": round(elapsed, 3),
+        "workers": workers,
+        "weighted_mae": weighted_mae,
+        "segments": segments,
+        "skipped": skipped,
+    }
+    out_dir.mkdir(parents=True, exist_ok=True)
+    tmp = out_dir / f"{MANIFEST_NAME}.tmp"
+    tmp.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    os.replace(tmp, out_dir / MANIFEST_NAME)
+    logger.info(
+        "Trained %d %s segment models in %.2fs with %d workers (row-weighted MAE %s, %d segments skipped)",
+        len(reports),
+        "x".join(by),
+        elapsed,
+        workers,
+        "n/a" if weighted_mae is None else f"{weighted_mae:.4f}",
+        len(skipped),
+    )
+    return manifest
+
+
+class SegmentRouter:
+    """Send each row of a batch to its segment's model.
+
+    Segment models are loaded on first use through a ``ModelRegistry`` each
+    (so retrained segments are picked up like the global model) and at most
+    ``max_loaded`` stay in memory, least recently used first out. Rows of
+    segments without a model go to the ``fallback`` model.
+    """
+
+    def __init__(self, manifest_path: str | Path, max_loaded: int = DEFAULT_MAX_LOADED):
+        self.manifest_path = Path(manifest_path)
+        self.max_loaded = max(1, max_loaded)
+        self._manifest_mtime: int | None = None
+        self._by: list[str] = []
+        self._slugs: dict[tuple[str, ...], str] = {}
+        self.version = ""
+        self._loaded: OrderedDict[str, ModelRegistry] = OrderedDict()
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+        self.routed_rows = 0
+        self.route_seconds = 0.0
+        self._refresh()
+
+    def _refresh(self) -> None:
+        stat = self.manifest_path.stat()
+        if stat.st_mtime_ns == self._manifest_mtime:
+            return
+        raw = self.manifest_path.read_bytes()
+        manifest = json.loads(raw)
+        self._by = list(manifest["by"])
+        self._slugs = {
+            tuple(entry["values"]): slug for slug, entry in manifest["segments"].items()
+        }
+        self.version = hashlib.sha256(raw).hexdigest()[:12]
+        self._manifest_mtime = stat.st_mtime_ns
+
+    def current_version(self) -> str:
+        self._refresh()
+        return self.version
+
+    def _model(self, slug: str, loaded: bool = False):
+        with self._lock:
+            registry = self._loaded.get(slug)
+            if registry is not None:
+                self._loaded.move_to_end(slug)
+            else:
+                registry = ModelRegistry(path=self.manifest_path.parent / f"{slug}.pkl")
+                self._loaded[slug] = registry
+                self.loads += 1
+                while len(self._loaded) > self.max_loaded:
+                    self._loaded.popitem(last=False)
+                    self.evictions += 1
+        with stage("segment_load"):
+            current = registry.get()
+        return current if loaded else current.model
+
+    def _groups(self, df: pd.DataFrame) -> dict[tuple[str, ...], np.ndarray]:
+        """Row positions per segment key, without a pandas groupby."""
+        if len(df) == 1:
+            return {tuple(str(df[column].iat[0]) for column in self._by): np.zeros(1, dtype=np.intp)}
+        combined = np.zeros(len(df), dtype=np.int64)
+        sizes, uniques = [], []
+        for column in self._by:
+            series = df[column]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                # Ingested frames: reuse the codes instead of materializing labels.
+                codes, labels = series.cat.codes.to_numpy(), series.cat.categories
+            else:
+                codes, labels = pd.factorize(series, sort=False)
+            combined = combined * len(labels) + codes
+            sizes.append(len(labels))
+            uniques.append(labels)
+        order = np.argsort(combined, kind="stable")
+        boundaries = np.flatnonzero(np.diff(combined[order])) + 1
+        groups = {}
+        for positions in np.split(order, boundaries):
+            index = np.unravel_index(combined[positions[0]], sizes)
+            groups[tuple(str(uniques[i][j]) for i, j in enumerate(index))] = positions
+        return groups
+
+    def route(
+        self, df: pd.DataFrame, fallback, loaded: bool = False
+    ) -> list[tuple[object, np.ndarray]]:
+        """Group row positions of ``df`` by the model that should score them.
+
+        With ``loaded=True`` segments come back as their ``LoadedModel`` (pass
+        the global ``LoadedModel`` as ``fallback``), so callers can cache
+        per-model objects such as explainers with ``get_derived``.
+        """
+        start = time.perf_counter()
+        self._refresh()
+        by_slug: dict[str | None, list[np.ndarray]] = {}
+        for key, positions in self._groups(df).items():
+            by_slug.setdefault(self._slugs.get(key), []).append(positions)
+        elapsed = time.perf_counter() - start
+        self.route_seconds += elapsed
+        self.routed_rows += len(df)
+        STAGE_SECONDS.observe(elapsed, "route")
+        plan = []
+        for slug, parts in by_slug.items():
+            model = fallback if slug is None else self._model(slug, loaded)
+            plan.append((model, np.concatenate(parts) if len(parts) > 1 else parts[0]))
+        return plan
+
+    def stats(self) -> dict:
+        with self._lock:
+            loaded = list(self._loaded.items())
+        segments = {}
+        for slug, registry in loaded:
+            current = registry._current
+            if current is None:
+                continue
+            segments[slug] = {
+                "version": current.version,
+                "size_mb": round(current.size / (1024 * 1024), 3),
+                "load_seconds": round(current.load_seconds, 4),
+                "load_rss_mb": current.load_rss_mb,
+            }
+        return {
+            "manifest": str(self.manifest_path),
+            "version": self.version,
+            "by": self._by,
+            "segments_available": len(self._slugs),
+            "loaded": len(loaded),
+            "max_loaded": self.max_loaded,
+            "loads": self.loads,
+            "evictions": self.evictions,
+            "routed_rows": self.routed_rows,
+            "route_us_per_row": (
+                self.route_seconds / self.routed_rows * 1e6 if self.routed_rows else 0.0
+            ),
+            "loaded_segments": segments,
+        }
+
+
+def main(argv: list[str] | None = None) -> None:
+    from data_ingestion import ingest
+    from data_transformation import transform
+
+    parser = argparse.ArgumentParser(description="Train one model per Category/Region segment.")
+    parser.add_argument("--data", default=str(Path("data") / "retail_store_inventory.csv"))
+    parser.add_argument("--by", nargs="+", default=["Category"])
+    parser.add_argument("--n-estimators", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--min-rows", type=int, default=500)
+    parser.add_argument("--encoding", default="onehot")
+    args = parser.parse_args(argv)
+
+    manifest = train_segment_models(
+        transform(ingest(args.data)),
+        by=args.by,
+        n_estimators=args.n_estimators,
+        workers=args.workers,
+        min_rows=args.min_rows,
+        encoding=args.encoding,
+    )
+    for slug, entry in manifest["segments"].items():
+        print(f"{slug:<32} rows {entry['rows']:>7} MAE {entry['mae']:.4f} size {entry['size_mb']:.2f} MB")
+    print(f"Manifest: {segment_dir(args.by) / MANIFEST_NAME}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import cProfile
+import functools
+import io
+import os
+import pstats
+import random
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from logger import get_logger
+
+try:
+    import pyinstrument  # type: ignore
+except ModuleNotFoundError:
+    pyinstrument = None
+
+
+logger = get_logger(__name__)
+
+# Seconds; spans sub-millisecond cache hits up to slow SHAP batches.
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def _labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for key, value in labels.items()
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram, one series per label set."""
+
+    def __init__(self, name: str, help_text: str, label_names: tuple[str, ...], buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = label_names
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self) -> dict[tuple[str, ...], tuple[list[int], float, int]]:
+        with self._lock:
+            return {key: (list(s[0]), s[1], s[2]) for key, s in self._series.items()}
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total, count) in sorted(self.snapshot().items()):
+            labels = dict(zip(self.label_names, label_values))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(
+                    f"{self.name}_bucket{_labels({**labels, 'le': _number(bound)})} {cumulative}"
+                )
+            lines.append(f"{self.name}_bucket{_labels({**labels, 'le': '+Inf'})} {count}")
+            lines.append(f"{self.name}_sum{_labels(labels)} {total!r}")
+            lines.append(f"{self.name}_count{_labels(labels)} {count}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label_names: tuple[str, ...]):
+        self.name = name
+        self.help = help_text
+        self.label_names = label_names
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            labels = dict(zip(self.label_names, label_values))
+            lines.append(f"{self.name}{_labels(labels)} {_number(value)}")
+        return lines
+
+
+def render_gauges(name: str, help_text: str, samples: list[tuple[dict, float]]) -> list[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+    lines.extend(f"{name}{_labels(labels)} {_number(value)}" for labels, value in samples)
+    return lines
+
+
+STAGE_SECONDS = Histogram(
+    "inventory_stage_seconds",
+    "Time spent in each serving stage.",
+    ("stage",),
+)
+REQUEST_SECONDS = Histogram(
+    "inventory_request_seconds",
+    "End-to-end request latency by route.",
+    ("method", "route"),
+)
+REQUESTS_TOTAL = Counter(
+    "inventory_requests_total",
+    "Requests by route and status code.",
+    ("method", "route", "status"),
+)
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block into ``inventory_stage_seconds{stage=name}``."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, name)
+
+
+def render(extra: list[str] | None = None) -> str:
+    lines = STAGE_SECONDS.render() + REQUEST_SECONDS.render() + REQUESTS_TOTAL.render()
+    return "\n".join(lines + (extra or [])) + "\n"
+
+
+# Opt-in profiler: a sampled fraction of calls runs under a profiler, and
+# the profile is written out only when the call was slower than the limit.
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "0"))
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0.01"))
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", Path("artifacts") / "profiles"))
+
+
+def _dump_profile(name: str, profiler, elapsed_ms: float) -> Path:
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    stem = f"{time.strftime('%Y%m%d-%H%M%S')}-{name}-{int(elapsed_ms)}ms-{os.getpid()}"
+    if pyinstrument is not None and isinstance(profiler, pyinstrument.Profiler):
+        path = PROFILE_DIR / f"{stem}.html"
+        path.write_text(profiler.output_html(), encoding="utf-8")
+    else:
+        path = PROFILE_DIR / f"{stem}.prof"
+        profiler.dump_stats(path)
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(15)
+        logger.info("Slow %s (%.0f ms) profile:\n%s", name, elapsed_ms, summary.getvalue())
+    return path
+
+
+def profile_slow(name: str):
+    """Decorator: profile sampled calls and keep profiles of slow ones.
+
+    Enabled by setting ``PROFILE_SLOW_MS`` above 0. Uses pyinstrument when
+    installed (HTML output), cProfile otherwise (``.prof`` plus a log summary).
+    """
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if PROFILE_SLOW_MS <= 0 or random.random() >= PROFILE_SAMPLE_RATE:
+                return fn(*args, **kwargs)
+            profiler = pyinstrument.Profiler() if pyinstrument is not None else cProfile.Profile()
+            start = time.perf_counter()
+            profiler.start() if pyinstrument is not None else profiler.enable()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profiler.stop() if pyinstrument is not None else profiler.disable()
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                if elapsed_ms >= PROFILE_SLOW_MS:
+                    path = _dump_profile(name, profiler, elapsed_ms)
+                    logger.warning("Slow %s took %.0f ms; profile saved to %s", name, elapsed_ms, path)
+
+        return wrapper
+
+    return decorator
@@ -1,7 +1,6 @@
-import pandas as pd
 import streamlit as st
 
-from predict_pipeline import explain, predict
+from predict_pipeline import explain_records, model_info
 
 
 st.set_page_config(page_title="Inventory Demand Forecast", layout="centered")
@@ -70,11 +69,12 @@ if submitted:
             "is_weekend": int(is_weekend),
         }
 
-        df = pd.DataFrame([payload])
-        prediction = float(predict(df)[0])
+        result = explain_records([payload], top_n=10)[0]
+        prediction = result["prediction"]
         st.success(f"Predicted Units Sold: {prediction:.2f}")
+        st.caption(f"Model version: {model_info()['version']}")
         st.subheader("Top Feature Contributions")
-        contributions = explain(df, top_n=10)
+        contributions = result["contributions"]
         st.dataframe(contributions, use_container_width=True)
     except FileNotFoundError:
         st.error("Model not found. Train the model first.")
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from lag_features import MISSING, get_state_store, model_lag_columns
+from logger import get_logger
+from model_registry import get_registry
+from predict_pipeline import explain_batch, get_explainer, predict
+
+
+logger = get_logger(__name__)
+
+PREWARM_MODES = ("off", "blocking", "background")
+
+
+@dataclass
+class StartupState:
+    """Readiness of this worker and how long it took to get there."""
+
+    started_at: float = field(default_factory=time.perf_counter)
+    import_seconds: float | None = None
+    phase: str = "cold"  # cold -> warming -> ready | failed
+    error: str | None = None
+    timings: dict[str, float] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def ready(self) -> bool:
+        return self.phase == "ready"
+
+    def record(self, name: str, seconds: float) -> None:
+        # Timings are written by the prewarm thread while /ready reads them.
+        with self._lock:
+            self.timings[name] = seconds
+
+    def mark_first_prediction(self) -> None:
+        # Wall time from process import to the first served prediction.
+        if "first_prediction_seconds" not in self.timings:
+            with self._lock:
+                self.timings.setdefault(
+                    "first_prediction_seconds", time.perf_counter() - self.started_at
+                )
+
+    def info(self) -> dict:
+        with self._lock:
+            timings = dict(self.timings)
+        return {
+            "ready": self.ready,
+            "phase": self.phase,
+            "error": self.error,
+            "import_seconds": self.import_seconds,
+            **{name: round(value, 6) for name, value in timings.items()},
+        }
+
+
+def dummy_frame(model) -> pd.DataFrame:
+    """One valid feature row: the first known category, 0 for numbers.
+
+    History (lag) columns are sent as missing history: the row has no real
+    date, so the series state could not describe it. ``prewarm`` loads the
+    state separately.
+    """
+    preprocessor = getattr(model, "preprocessor", None)
+    if preprocessor is None:
+        preprocessor = model.named_steps["preprocess"]
+    lag_columns = set(model_lag_columns(model))
+    row: dict = {}
+    for _name, transformer, columns in preprocessor.transformers_:
+        if isinstance(transformer, str) and transformer == "drop":
+            continue
+        categories = getattr(transformer, "categories_", None)
+        for position, column in enumerate(columns):
+            if column in lag_columns:
+                row[column] = MISSING
+                continue
+            row[column] = categories[position][0] if categories is not None else 0
+    return pd.DataFrame([row])
+
+
+def prewarm(state: StartupState, explain: bool = True) -> None:
+    """Load the model, build the explainer and run one prediction of each kind.
+
+    This moves the lazy work (unpickling and importing sklearn, SHAP's
+    ``TreeExplainer``, numba compilation in compiled mode) out of the first request.
+    """
+    state.phase, state.error = "warming", None
+    try:
+        start = time.perf_counter()
+        loaded = get_registry().get()
+        state.record("model_load_seconds", time.perf_counter() - start)
+
+        if model_lag_columns(loaded.model):
+            get_state_store()
+        frame = dummy_frame(loaded.model)
+        start = time.perf_counter()
+        predict(frame)
+        state.record("warm_predict_seconds", time.perf_counter() - start)
+
+        if explain:
+            start = time.perf_counter()
+            get_explainer()
+            state.record("explainer_build_seconds", time.perf_counter() - start)
+            start = time.perf_counter()
+            explain_batch(frame, top_n=1)
+            state.record("warm_explain_seconds", time.perf_counter() - start)
+    except Exception as exc:
+        state.phase, state.error = "failed", f"{type(exc).__name__}: {exc}"
+        logger.exception("Prewarm failed; worker stays not ready")
+        return
+
+    ready_seconds = time.perf_counter() - state.started_at
+    state.record("ready_seconds", ready_seconds)
+    state.phase = "ready"
+    logger.info(
+        "Worker ready in %.2fs (imports %.2fs, model load %.2fs)",
+        ready_seconds,
+        state.import_seconds or 0.0,
+        state.timings["model_load_seconds"],
+    )
+
+
+def prewarm_in_background(state: StartupState, explain: bool = True) -> bool:
+    """Start ``prewarm`` on a daemon thread unless one is already running."""
+    with state._lock:
+        if state.phase == "warming":
+            return False
+        state.phase = "warming"
+    threading.Thread(
+        target=prewarm, args=(state, explain), name="prewarm", daemon=True
+    ).start()
+    return True
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import random
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import app
+import model_trainer
+
+
+def _make_synthetic_df(rows: int = 50) -> pd.DataFrame:
+    rng = random.Random(42)
+    np.random.seed(42)
+
+    stores = ["S001", "S002"]
+    products = ["P001", "P002"]
+    categories = ["Electronics", "Clothing", "Home"]
+    regions = ["North", "South"]
+    weather = ["Sunny", "Rainy"]
+    seasons = ["Spring", "Summer"]
+
+    data = []
+    for _ in range(rows):
+        data.append(
+            {
+                "Store ID": rng.choice(stores),
+                "Product ID": rng.choice(products),
+                "Category": rng.choice(categories),
+                "Region": rng.choice(regions),
+                "Inventory Level": rng.randint(50, 200),
+                "Units Sold": rng.randint(20, 180),
+                "Units Ordered": rng.randint(10, 200),
+                "Demand Forecast": rng.uniform(50, 200),
+                "Price": rng.uniform(10, 100),
+                "Discount": rng.randint(0, 20),
+                "Weather Condition": rng.choice(weather),
+                "Holiday/Promotion": rng.randint(0, 1),
+                "Competitor Pricing": rng.uniform(10, 120),
+                "Seasonality": rng.choice(seasons),
+                "day_of_week": rng.randint(0, 6),
+                "month": rng.randint(1, 12),
+                "day": rng.randint(1, 28),
+                "is_weekend": rng.randint(0, 1),
+            }
+        )
+
+    return pd.DataFrame(data)
+
+
+@pytest.fixture(scope="session")
+def client():
+    return TestClient(app.app)
+
+
+@pytest.fixture(scope="session")
+def ensure_model():
+    model_path = Path("artifacts") / "models" / "best_model.pkl"
+    if model_path.exists():
+        return
+
+    model_trainer.mlflow = None
+    df = _make_synthetic_df()
+    model_trainer.train_model(df, n_estimators=5, random_state=0)
+
+
+def _sample_payload() -> dict:
+    return {
+        "Store_ID": "S001",
+        "Product_ID": "P001",
+        "Category": "Electronics",
+        "Region": "North",
+        "Inventory_Level": 120,
+        "Units_Ordered": 80,
+        "Demand_Forecast": 140.5,
+        "Price": 49.99,
+        "Discount": 10,
+        "Weather_Condition": "Sunny",
+        "Holiday_Promotion": 0,
+        "Competitor_Pricing": 52.0,
+        "Seasonality": "Summer",
+        "day_of_week": 2,
+        "month": 7,
+        "day": 15,
+        "is_weekend": 0,
+    }
+
+
+@pytest.fixture(scope="session")
+def synthetic_df():
+    """Build the synthetic inventory frame: ``synthetic_df(rows)``."""
+    return _make_synthetic_df
+
+
+@pytest.fixture(scope="session")
+def sample_payload():
+    """Build a fresh valid ``/predict`` payload: ``sample_payload()``."""
+    return _sample_payload
+
+
+@pytest.fixture()
+def trained_model(tmp_path, monkeypatch):
+    """Train without MLflow inside tmp_path: ``trained_model(df, **train_kwargs)``."""
+    monkeypatch.setattr(model_trainer, "mlflow", None)
+    monkeypatch.chdir(tmp_path)
+
+    def train(df: pd.DataFrame, n_estimators: int = 15, **kwargs):
+        model, _ = model_trainer.train_model(
+            df, n_estimators=n_estimators, random_state=0, **kwargs
+        )
+        return model
+
+    return train
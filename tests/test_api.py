@@ -1,101 +1,23 @@
 from __future__ import annotations
 
-import random
 from pathlib import Path
 
-import numpy as np
-import pandas as pd
 import pytest
-from fastapi.testclient import TestClient
 
 import app
-import model_trainer
-
-
-client = TestClient(app.app)
-
-
-def _make_synthetic_df(rows: int = 50) -> pd.DataFrame:
-    rng = random.Random(42)
-    np.random.seed(42)
-
-    stores = ["S001", "S002"]
-    products = ["P001", "P002"]
-    categories = ["Electronics", "Clothing", "Home"]
-    regions = ["North", "South"]
-    weather = ["Sunny", "Rainy"]
-    seasons = ["Spring", "Summer"]
-
-    data = []
-    for _ in range(rows):
-        data.append(
-            {
-                "Store ID": rng.choice(stores),
-                "Product ID": rng.choice(products),
-                "Category": rng.choice(categories),
-                "Region": rng.choice(regions),
-                "Inventory Level": rng.randint(50, 200),
-                "Units Sold": rng.randint(20, 180),
-                "Units Ordered": rng.randint(10, 200),
-                "Demand Forecast": rng.uniform(50, 200),
-                "Price": rng.uniform(10, 100),
-                "Discount": rng.randint(0, 20),
-                "Weather Condition": rng.choice(weather),
-                "Holiday/Promotion": rng.randint(0, 1),
-                "Competitor Pricing": rng.uniform(10, 120),
-                "Seasonality": rng.choice(seasons),
-                "day_of_week": rng.randint(0, 6),
-                "month": rng.randint(1, 12),
-                "day": rng.randint(1, 28),
-                "is_weekend": rng.randint(0, 1),
-            }
-        )
-
-    return pd.DataFrame(data)
-
-
-@pytest.fixture(scope="session")
-def ensure_model():
-    model_path = Path("artifacts") / "models" / "best_model.pkl"
-    if model_path.exists():
-        return
-
-    model_trainer.mlflow = None
-    df = _make_synthetic_df()
-    model_trainer.train_model(df, n_estimators=5, random_state=0)
-
-
-def _sample_payload() -> dict:
-    return {
-        "Store_ID": "S001",
-        "Product_ID": "P001",
-        "Category": "Electronics",
-        "Region": "North",
-        "Inventory_Level": 120,
-        "Units_Ordered": 80,
-        "Demand_Forecast": 140.5,
-        "Price": 49.99,
-        "Discount": 10,
-        "Weather_Condition": "Sunny",
-        "Holiday_Promotion": 0,
-        "Competitor_Pricing": 52.0,
-        "Seasonality": "Summer",
-        "day_of_week": 2,
-        "month": 7,
-        "day": 15,
-        "is_weekend": 0,
-    }
-
-
-def test_predict_success(ensure_model):
-    response = client.post("/predict", json=_sample_payload())
+from lag_features import SeriesDateError, SeriesStateNotFoundError
+from micro_batcher import MicroBatcher
+
+
+def test_predict_success(client, ensure_model, sample_payload):
+    response = client.post("/predict", json=sample_payload())
     assert response.status_code == 200
     body = response.json()
     assert "prediction" in body
     assert isinstance(body["prediction"], (int, float))
 
 
-def test_predict_missing_model():
+def test_predict_missing_model(client, sample_payload):
     model_path = Path("artifacts") / "models" / "best_model.pkl"
     tmp_path = None
     if model_path.exists():
@@ -103,7 +25,7 @@ def test_predict_missing_model():
         model_path.rename(tmp_path)
 
     try:
-        response = client.post("/predict", json=_sample_payload())
+        response = client.post("/predict", json=sample_payload())
         assert response.status_code == 404
     finally:
         if tmp_path and tmp_path.exists():
@@ -114,11 +36,11 @@ def _has_explain_route() -> bool:
     return any(route.path == "/explain" for route in app.app.routes)
 
 
-def test_explain_success(ensure_model):
+def test_explain_success(client, ensure_model, sample_payload):
     if not _has_explain_route():
         pytest.skip("/explain not available in current API")
 
-    response = client.post("/explain", json=_sample_payload())
+    response = client.post("/explain", json=sample_payload())
     assert response.status_code == 200
     body = response.json()
     assert "prediction" in body
@@ -126,7 +48,7 @@ def test_explain_success(ensure_model):
     assert isinstance(body["contributions"], list)
 
 
-def test_explain_missing_model():
+def test_explain_missing_model(client, sample_payload):
     if not _has_explain_route():
         pytest.skip("/explain not available in current API")
 
@@ -137,8 +59,105 @@ def test_explain_missing_model():
         model_path.rename(tmp_path)
 
     try:
-        response = client.post("/explain", json=_sample_payload())
+        response = client.post("/explain", json=sample_payload())
         assert response.status_code == 404
     finally:
         if tmp_path and tmp_path.exists():
             tmp_path.rename(model_path)
+
+
+def test_predict_batch_rows_keeps_order_and_isolates_errors(client, ensure_model, sample_payload):
+    good = sample_payload()
+    bad = dict(sample_payload(), Price="not-a-price")
+    missing = {k: v for k, v in sample_payload().items() if k != "Region"}
+
+    response = client.post("/predict/batch", json={"rows": [good, bad, good, missing]})
+    assert response.status_code == 200
+    body = response.json()
+    preds = body["predictions"]
+    assert len(preds) == 4
+    assert preds[0] is not None and preds[2] is not None
+    assert preds[1] is None and preds[3] is None
+    assert [e["index"] for e in body["errors"]] == [1, 3]
+
+    single = client.post("/predict", json=good).json()["prediction"]
+    assert preds[0] == pytest.approx(single)
+
+
+def test_predict_batch_columns(client, ensure_model, sample_payload):
+    rows = [sample_payload(), dict(sample_payload(), Price=10.0)]
+    columns = {key: [row[key] for row in rows] for key in rows[0]}
+
+    response = client.post("/predict/batch", json={"columns": columns})
+    assert response.status_code == 200
+    assert len(response.json()["predictions"]) == 2
+    assert response.json()["errors"] == []
+
+
+def test_predict_batch_too_large(client, monkeypatch, sample_payload):
+    monkeypatch.setattr(app, "MAX_BATCH_SIZE", 1)
+    response = client.post(
+        "/predict/batch", json={"rows": [sample_payload(), sample_payload()]}
+    )
+    assert response.status_code == 413
+
+
+def test_explain_multiple_rows(client, ensure_model, sample_payload):
+    rows = [sample_payload(), dict(sample_payload(), Store_ID="S002")]
+    response = client.post("/explain?top_n=3", json=rows)
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert len(results) == 2
+    for result in results:
+        impacts = [abs(c["impact"]) for c in result["contributions"]]
+        assert len(impacts) == 3
+        assert impacts == sorted(impacts, reverse=True)
+
+
+def test_explain_fold_categories(client, ensure_model, sample_payload):
+    response = client.post("/explain?top_n=50&fold_categories=true", json=sample_payload())
+    assert response.status_code == 200
+    features = [c["feature"] for c in response.json()["contributions"]]
+    assert "Store ID" in features
+    assert not any(name.startswith("cat__") for name in features)
+
+
+def test_cache_stats_counts_repeat_predictions(client, ensure_model, sample_payload):
+    before = client.get("/cache/stats").json()
+    client.post("/predict", json=dict(sample_payload(), Price=12.34))
+    client.post("/predict", json=dict(sample_payload(), Price=12.34))
+    after = client.get("/cache/stats").json()
+
+    assert after["hits"] >= before["hits"] + 1
+    assert after["misses"] >= before["misses"] + 1
+
+
+def test_batcher_stats(client, ensure_model, monkeypatch, sample_payload):
+    monkeypatch.setattr(app, "batcher", MicroBatcher(app.predict_records, max_wait_ms=1))
+    assert client.post("/predict", json=dict(sample_payload(), Price=43.21)).status_code == 200
+
+    body = client.get("/batcher/stats").json()
+    assert body["enabled"] is True
+    assert body["batches"] == 1 and body["rows"] == 1
+    assert {"queue_depth", "batch_size_mean"} <= set(body)
+
+    monkeypatch.setattr(app, "batcher", None)
+    assert client.get("/batcher/stats").json() == {"enabled": False}
+
+
+@pytest.mark.parametrize(
+    "error, status",
+    [
+        (SeriesStateNotFoundError("Series state not found. Train with LAG_FEATURES=1 first."), 404),
+        (SeriesDateError("Lag features are only known for the day after ..."), 422),
+    ],
+)
+def test_series_state_errors_are_not_reported_as_missing_model(client, monkeypatch, error, status, sample_payload):
+    def fail(records):
+        raise error
+
+    monkeypatch.setattr(app, "batcher", None)
+    monkeypatch.setattr(app, "predict_records", fail)
+    response = client.post("/predict", json=sample_payload())
+    assert response.status_code == status
+    assert response.json()["detail"] == str(error)
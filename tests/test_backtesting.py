@@ -0,0 +1,88 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import backtesting
+
+
+def _dated_df(synthetic_df, rows: int = 400) -> pd.DataFrame:
+    df = synthetic_df(rows)
+    df["Date"] = pd.Timestamp("2024-01-01") + pd.to_timedelta(
+        np.arange(len(df)) // 5, unit="D"
+    )
+    return df
+
+
+def test_rolling_origin_folds_never_train_on_the_future(synthetic_df):
+    df = _dated_df(synthetic_df)
+    folds = backtesting.rolling_origin_folds(df["Date"], n_folds=3, horizon_days=7)
+
+    assert [fold.test_end for fold in folds] == [
+        pd.Timestamp("2024-03-06"),
+        pd.Timestamp("2024-03-13"),
+        pd.Timestamp("2024-03-20"),
+    ]
+    for fold in folds:
+        assert df["Date"].iloc[fold.train_idx].max() < fold.test_start
+        assert len(fold.test_idx) == 35
+    # Expanding window: every fold trains on more rows than the last.
+    assert np.all(np.diff([len(fold.train_idx) for fold in folds]) > 0)
+
+    rolling = backtesting.rolling_origin_folds(
+        df["Date"], n_folds=3, horizon_days=7, window_days=14
+    )
+    assert {len(fold.train_idx) for fold in rolling} == {70}
+
+
+def test_rolling_origin_folds_rejects_too_many_folds(synthetic_df):
+    with pytest.raises(ValueError):
+        backtesting.rolling_origin_folds(_dated_df(synthetic_df, 20)["Date"], n_folds=5, horizon_days=7)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_backtest_writes_combined_report(tmp_path, workers, synthetic_df):
+    summary = backtesting.backtest(
+        _dated_df(synthetic_df),
+        n_folds=3,
+        horizon_days=7,
+        params={"n_estimators": 5},
+        workers=workers,
+        output_dir=tmp_path,
+    )
+
+    assert summary["workers"] == workers
+    assert [fold["fold"] for fold in summary["folds"]] == [0, 1, 2]
+    assert summary["overall"]["count"] == 105
+    saved = json.loads((tmp_path / "backtest_summary.json").read_text())
+    assert saved["overall"]["mae"] == pytest.approx(summary["overall"]["mae"])
+
+    per_fold = pd.read_csv(tmp_path / "metrics_by_store_per_fold.csv")
+    assert set(per_fold["fold"]) == {0, 1, 2}
+    assert per_fold["count"].sum() == 105
+    assert (tmp_path / "metrics_by_store_product.csv").exists()
+
+
+def test_folds_fit_with_the_backtest_encoding(tmp_path, monkeypatch, synthetic_df):
+    encodings = []
+    make_candidate = backtesting._make_candidate
+
+    def spy(name, params, n_jobs, random_state, encoding="onehot", *args):
+        encodings.append(encoding)
+        return make_candidate(name, params, n_jobs, random_state, encoding, *args)
+
+    monkeypatch.setattr(backtesting, "_make_candidate", spy)
+    backtesting.backtest(
+        _dated_df(synthetic_df),
+        n_folds=2,
+        horizon_days=7,
+        estimator="hist_gradient_boosting",
+        params={"max_iter": 5},
+        encoding="ordinal",
+        workers=1,
+        output_dir=tmp_path,
+    )
+
+    # One call builds the preprocessor, then one per fold.
+    assert encodings == ["ordinal"] * 3
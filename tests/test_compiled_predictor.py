@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+import model_trainer
+import predict_pipeline
+from compiled_predictor import CompiledPredictor, _predict_kernel
+
+
+@pytest.fixture(params=["onehot", "ordinal"])
+def trained(request, synthetic_df, trained_model):
+    df = synthetic_df(200)
+    return trained_model(df, encoding=request.param), df[model_trainer.FEATURE_COLUMNS]
+
+
+@pytest.mark.parametrize("use_numba", [False, True])
+def test_compiled_matches_sklearn(trained, use_numba):
+    if use_numba and _predict_kernel is None:
+        pytest.skip("numba not installed")
+    model, X = trained
+    compiled = CompiledPredictor.from_pipeline(model, use_numba=use_numba)
+
+    np.testing.assert_allclose(compiled.predict(X), model.predict(X), rtol=1e-12, atol=0)
+    np.testing.assert_allclose(compiled.predict(X.head(1)), model.predict(X.head(1)), rtol=1e-12)
+
+
+def test_compiled_transform_matches_preprocessor(trained):
+    model, X = trained
+    X = X.copy()
+    X.loc[X.index[0], "Store ID"] = "S999"
+    compiled = CompiledPredictor.from_pipeline(model)
+
+    expected = model.named_steps["preprocess"].transform(X)
+    if hasattr(expected, "toarray"):
+        expected = expected.toarray()
+    np.testing.assert_array_equal(compiled.transform(X), expected.astype(np.float32))
+
+
+def test_predict_pipeline_switches_modes(trained, monkeypatch):
+    model, X = trained
+    monkeypatch.setattr(predict_pipeline, "_predict_mode", "sklearn")
+    sklearn_preds = predict_pipeline.predict(X)
+
+    predict_pipeline.set_predict_mode("compiled")
+    np.testing.assert_allclose(predict_pipeline.predict(X), sklearn_preds, rtol=1e-12)
+    with pytest.raises(ValueError):
+        predict_pipeline.set_predict_mode("gpu")
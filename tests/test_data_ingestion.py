@@ -0,0 +1,77 @@
+import pandas as pd
+import pytest
+
+import data_ingestion
+from data_ingestion import ingest
+
+
+def _write_csv(path, rows: int = 20) -> None:
+    pd.DataFrame(
+        {
+            "Date": pd.date_range("2023-01-01", periods=rows, freq="D").strftime("%Y-%m-%d"),
+            "Store ID": ["S001", "S002"] * (rows // 2),
+            "Category": ["Toys", "Home"] * (rows // 2),
+            "Units Sold": range(rows),
+            "Price": [9.5] * rows,
+        }
+    ).to_csv(path, index=False)
+
+
+@pytest.fixture(autouse=True)
+def _require_pyarrow():
+    pytest.importorskip("pyarrow")
+
+
+def test_ingest_types_columns(tmp_path):
+    csv_path = tmp_path / "inventory.csv"
+    _write_csv(csv_path)
+
+    df = ingest(csv_path, cache_dir=tmp_path / "cache")
+
+    assert df["Store ID"].dtype == "category"
+    assert df["Category"].dtype == "category"
+    assert pd.api.types.is_datetime64_any_dtype(df["Date"])
+    assert df["Units Sold"].dtype.itemsize == 1
+    assert df["Price"].dtype == "float32"
+
+
+def test_ingest_reuses_snapshot(tmp_path, monkeypatch):
+    csv_path = tmp_path / "inventory.csv"
+    cache_dir = tmp_path / "cache"
+    _write_csv(csv_path)
+    cold = ingest(csv_path, cache_dir=cache_dir)
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("CSV should not be re-parsed on a warm cache")
+
+    monkeypatch.setattr(data_ingestion, "read_typed_csv", _fail)
+    warm = ingest(csv_path, cache_dir=cache_dir)
+    pd.testing.assert_frame_equal(cold, warm)
+
+    projected = ingest(csv_path, columns=["Store ID", "Units Sold"], cache_dir=cache_dir)
+    assert list(projected.columns) == ["Store ID", "Units Sold"]
+
+
+def test_ingest_refreshes_when_source_changes(tmp_path):
+    csv_path = tmp_path / "inventory.csv"
+    cache_dir = tmp_path / "cache"
+    _write_csv(csv_path, rows=20)
+    assert len(ingest(csv_path, cache_dir=cache_dir)) == 20
+
+    _write_csv(csv_path, rows=30)
+    assert len(ingest(csv_path, cache_dir=cache_dir)) == 30
+    assert len(list(cache_dir.glob("*.parquet"))) == 1
+
+
+def test_same_named_sources_keep_separate_snapshots(tmp_path):
+    cache_dir = tmp_path / "cache"
+    first, second = tmp_path / "a" / "inventory.csv", tmp_path / "b" / "inventory.csv"
+    for path, rows in ((first, 20), (second, 30)):
+        path.parent.mkdir()
+        _write_csv(path, rows=rows)
+
+    assert len(ingest(first, cache_dir=cache_dir)) == 20
+    assert len(ingest(second, cache_dir=cache_dir)) == 30
+    assert len(list(cache_dir.glob("*.parquet"))) == 2
+    assert len(list(cache_dir.glob("*.meta.json"))) == 2
+    assert len(ingest(first, cache_dir=cache_dir)) == 20
@@ -1,11 +1,11 @@
 from pathlib import Path
 
-import pandas as pd
+from data_ingestion import ingest
 
 
 def test_data_schema_and_missing_values():
     data_path = Path("data") / "retail_store_inventory.csv"
-    df = pd.read_csv(data_path)
+    df = ingest(data_path)
 
     expected_columns = {
         "Date",
@@ -0,0 +1,119 @@
+import json
+import threading
+import time
+
+import pytest
+
+import drift_monitor
+from drift_monitor import DriftMonitor, build_reference_profile, save_reference_profile
+from feature_schema import FEATURE_COLUMNS
+
+
+@pytest.fixture()
+def reference(synthetic_df):
+    return build_reference_profile(synthetic_df(400))
+
+
+def test_stable_traffic_scores_low_and_shifted_traffic_drifts(reference, tmp_path, synthetic_df):
+    rows = synthetic_df(400)[FEATURE_COLUMNS]
+    by_record = DriftMonitor(reference, window_rows=10_000)
+    for record in rows.to_dict(orient="records"):
+        by_record.observe_record(record)
+    by_frame = DriftMonitor(reference, window_rows=10_000)
+    by_frame.observe_frame(rows)
+
+    for kind in ("numeric", "categorical"):
+        for column, stats in by_record._current[kind].items():
+            assert stats["counts"] == by_frame._current[kind][column]["counts"]
+    scores = by_record.scores()
+    assert scores["drifted"] == []
+    assert scores["features"]["Price"]["psi"] < 0.01
+
+    shifted = rows.assign(Price=rows["Price"] * 3, **{"Store ID": "S999"})
+    monitor = DriftMonitor(reference, window_rows=100, snapshot_dir=tmp_path, snapshot_on_rotate=True)
+    monitor.observe_frame(shifted.head(150))
+    scores = monitor.scores()
+    assert {"Price", "Store ID"} <= set(scores["drifted"])
+    assert scores["features"]["Store ID"]["unseen_rate"] == 1.0
+    assert scores["features"]["Store ID"]["top_unseen"] == {"S999": 150}
+    assert scores["features"]["Price"]["out_of_range_rate"] > 0.5
+    assert len(list(tmp_path.glob("profile-*.json"))) == 1  # the rotated window
+
+
+def test_drift_endpoint_follows_traffic(client, ensure_model, tmp_path, monkeypatch, synthetic_df, sample_payload):
+    path = save_reference_profile(synthetic_df(400), tmp_path / "reference.json")
+    monkeypatch.setattr(drift_monitor, "DEFAULT_REFERENCE_PATH", path)
+    monkeypatch.setattr(drift_monitor, "SNAPSHOT_DIR", tmp_path / "snapshots")
+    drift_monitor.reset_monitor()
+    drift_monitor.refresh_monitor()  # done by the app's lifespan at startup
+    try:
+        assert client.post("/predict", json=sample_payload()).status_code == 200
+        rows = [dict(sample_payload(), Region="Atlantis") for _ in range(3)]
+        assert client.post("/predict/batch", json={"rows": rows}).status_code == 200
+
+        body = client.get("/drift").json()
+        assert body["enabled"] and body["rows"] == 4
+        assert body["features"]["Region"]["unseen_rate"] == 0.75
+        assert 'inventory_feature_psi{feature="Price"}' in client.get("/metrics").text
+
+        snapshot = client.post("/drift/snapshot").json()["path"]
+        assert json.loads(open(snapshot).read())["rows"] == 4
+    finally:
+        drift_monitor.reset_monitor()
+
+
+def test_drift_endpoint_without_reference(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(drift_monitor, "DEFAULT_REFERENCE_PATH", tmp_path / "missing.json")
+    drift_monitor.reset_monitor()
+    assert client.get("/drift").status_code == 404
+    monkeypatch.setenv("MONITOR_DRIFT", "0")
+    assert client.get("/drift").json() == {"enabled": False}
+
+
+def test_bad_reference_or_record_never_fails_serving(client, ensure_model, tmp_path, monkeypatch, synthetic_df, sample_payload):
+    path = tmp_path / "reference.json"
+    path.write_text(json.dumps({"format_version": -1}), encoding="utf-8")
+    monkeypatch.setattr(drift_monitor, "DEFAULT_REFERENCE_PATH", path)
+    drift_monitor.reset_monitor()
+    try:
+        assert drift_monitor.refresh_monitor() is None
+        assert client.post("/predict", json=sample_payload()).status_code == 200
+        assert client.get("/drift").status_code == 404
+
+        save_reference_profile(synthetic_df(400), path)
+        monitor = drift_monitor.refresh_monitor()
+        assert monitor is not None
+
+        def broken(record):
+            raise ValueError("bad value")
+
+        monkeypatch.setattr(monitor, "observe_record", broken)
+        monkeypatch.setattr(monitor, "observe_frame", lambda *args, **kwargs: broken(None))
+        assert client.post("/predict", json=sample_payload()).status_code == 200
+        rows = {"rows": [sample_payload()]}
+        assert client.post("/predict/batch", json=rows).status_code == 200
+    finally:
+        drift_monitor.reset_monitor()
+
+
+def test_get_monitor_reloads_off_the_calling_thread(tmp_path, monkeypatch, synthetic_df):
+    path = save_reference_profile(synthetic_df(100), tmp_path / "reference.json")
+    monkeypatch.setattr(drift_monitor, "DEFAULT_REFERENCE_PATH", path)
+    drift_monitor.reset_monitor()
+    calls = []
+    real_refresh = drift_monitor.refresh_monitor
+    monkeypatch.setattr(
+        drift_monitor,
+        "refresh_monitor",
+        lambda: calls.append(threading.current_thread().name) or real_refresh(),
+    )
+    try:
+        drift_monitor.get_monitor()  # schedules the load and returns at once
+        for _ in range(200):
+            if drift_monitor.get_monitor() is not None:
+                break
+            time.sleep(0.01)
+        assert drift_monitor.get_monitor() is not None
+        assert calls == ["drift-reference"]
+    finally:
+        drift_monitor.reset_monitor()
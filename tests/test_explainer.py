@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+import model_trainer
+from explainer import ModelExplainer, _top_indices
+
+
+def test_top_indices_orders_by_absolute_impact():
+    impacts = np.array([[0.1, -3.0, 2.0, 0.5], [4.0, 0.0, -1.0, 0.2]])
+    assert _top_indices(impacts, 2).tolist() == [[1, 2], [0, 2]]
+    assert _top_indices(impacts, 10).shape == (2, 4)
+    assert _top_indices(impacts, 0).shape == (2, 0)
+
+
+def test_folded_contributions_sum_to_one_hot_contributions(monkeypatch, synthetic_df):
+    pytest.importorskip("shap")
+    monkeypatch.setattr(model_trainer, "mlflow", None)
+    monkeypatch.setattr(model_trainer, "save_best_model", lambda *args, **kwargs: False)
+    df = synthetic_df(80)
+    model, _ = model_trainer.train_model(df, n_estimators=5, random_state=0)
+
+    explainer = ModelExplainer(model)
+    rows = df[model_trainer.FEATURE_COLUMNS].head(4)
+    _, values = explainer.shap_values(rows)
+    folded = explainer.fold(values)
+
+    assert folded.shape == (4, len(model_trainer.FEATURE_COLUMNS))
+    np.testing.assert_allclose(folded.sum(axis=1), values.sum(axis=1))
+    base = float(np.ravel(explainer.explainer.expected_value)[0])
+    np.testing.assert_allclose(base + folded.sum(axis=1), model.predict(rows), rtol=1e-6)
+
+    explanations = explainer.explain(rows, top_n=3, fold_categories=True)
+    assert len(explanations) == 4
+    assert all(len(row) == 3 for row in explanations)
@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import app
+from feature_store import FeatureStore
+
+
+def _dated_df(synthetic_df) -> pd.DataFrame:
+    df = synthetic_df(40)
+    df["Date"] = pd.Timestamp("2024-03-01") + pd.to_timedelta(np.arange(40) // 4, unit="D")
+    return df
+
+
+@pytest.fixture()
+def store(tmp_path, monkeypatch):
+    feature_store = FeatureStore(tmp_path / "features.sqlite")
+    monkeypatch.setattr(app, "get_feature_store", lambda: feature_store)
+    return feature_store
+
+
+def test_materialize_refresh_and_lookup(store, synthetic_df):
+    df = _dated_df(synthetic_df)
+    first, later = df[df["Date"] < "2024-03-08"], df
+
+    assert store.materialize(first) == len(first.groupby(["Store ID", "Product ID"]))
+    assert store.watermark == pd.Timestamp("2024-03-07")
+    assert store.refresh(first) == 0
+
+    updated = store.refresh(later)
+    assert updated == len(later[later["Date"] >= "2024-03-08"].groupby(["Store ID", "Product ID"]))
+    assert store.watermark == pd.Timestamp("2024-03-10")
+
+    latest = df.sort_values("Date").groupby(["Store ID", "Product ID"]).tail(1)
+    row = latest.iloc[0]
+    stored = store.get(row["Store ID"], row["Product ID"])
+    assert stored["Price"] == pytest.approx(row["Price"])
+    assert stored["as_of"] == row["Date"].strftime("%Y-%m-%d")
+    assert store.get("S999", "P001") is None
+
+    keys = [("S999", "P001")] + list(zip(latest["Store ID"], latest["Product ID"]))
+    fetched = store.fetch(keys)
+    assert fetched["as_of"].isna().tolist() == [True] + [False] * len(latest)
+    np.testing.assert_allclose(fetched["Price"].iloc[1:], latest["Price"])
+
+    stats = store.stats()
+    assert stats["lookups"] == 3
+    assert stats["misses"] == 2
+    assert stats["read_ms_p95"] >= stats["read_ms_p50"] > 0
+
+
+def test_build_features_fills_calendar_and_overrides(store, synthetic_df):
+    store.materialize(_dated_df(synthetic_df))
+    frame, missing = store.build_features(
+        [("S001", "P001"), ("S002", "P002")],
+        dates=[None, "2024-03-16"],
+        overrides=[{"Price": 5.0}, {}],
+    )
+
+    assert not missing.any()
+    assert frame.loc[0, "Price"] == 5.0
+    # Default date is the day after the series' last stored day.
+    next_day = pd.Timestamp(store.get("S001", "P001")["as_of"]) + pd.Timedelta(days=1)
+    assert (frame.loc[0, "day"], frame.loc[0, "day_of_week"]) == (next_day.day, next_day.dayofweek)
+    assert (frame.loc[1, "day"], frame.loc[1, "is_weekend"]) == (16, 1)
+    with pytest.raises(ValueError):
+        store.build_features([("S001", "P001")], overrides=[{"Colour": "red"}])
+
+
+def test_predict_by_key_matches_full_payload(client, store, ensure_model, sample_payload, synthetic_df):
+    store.materialize(_dated_df(synthetic_df))
+    stored = store.get("S001", "P001")
+    payload = sample_payload()
+    for field, column in [
+        ("Category", "Category"),
+        ("Region", "Region"),
+        ("Inventory_Level", "Inventory Level"),
+        ("Units_Ordered", "Units Ordered"),
+        ("Demand_Forecast", "Demand Forecast"),
+        ("Discount", "Discount"),
+        ("Weather_Condition", "Weather Condition"),
+        ("Holiday_Promotion", "Holiday/Promotion"),
+        ("Competitor_Pricing", "Competitor Pricing"),
+        ("Seasonality", "Seasonality"),
+    ]:
+        payload[field] = stored[column]
+    payload.update(Price=19.5, day_of_week=4, month=3, day=15, is_weekend=0)
+
+    response = client.post(
+        "/predict/by-key",
+        json={
+            "Store_ID": "S001",
+            "Product_ID": "P001",
+            "date": "2024-03-15",
+            "overrides": {"Price": 19.5},
+        },
+    )
+    assert response.status_code == 200
+    expected = client.post("/predict", json=payload).json()["prediction"]
+    assert response.json()["prediction"] == pytest.approx(expected)
+
+    many = client.post(
+        "/predict/by-key",
+        json=[{"Store_ID": "S001", "Product_ID": "P001"}, {"Store_ID": "S002", "Product_ID": "P002"}],
+    )
+    assert len(many.json()["predictions"]) == 2
+
+    unknown = client.post("/predict/by-key", json={"Store_ID": "S999", "Product_ID": "P001"})
+    assert unknown.status_code == 404
+    bad = client.post(
+        "/predict/by-key",
+        json={"Store_ID": "S001", "Product_ID": "P001", "overrides": {"Price": "cheap"}},
+    )
+    assert bad.status_code == 422
+    assert client.get("/feature-store/stats").json()["lookups"] >= 1
+
+
+def test_predict_by_key_feeds_the_drift_monitor(client, store, ensure_model, monkeypatch, synthetic_df):
+    store.materialize(_dated_df(synthetic_df))
+    observed = []
+    monkeypatch.setattr(
+        app,
+        "_monitor_frame",
+        lambda features, invalid_rows: observed.append((len(features), invalid_rows)),
+    )
+    rows = [{"Store_ID": "S001", "Product_ID": "P001"}, {"Store_ID": "S002", "Product_ID": "P002"}]
+    assert client.post("/predict/by-key", json=rows).status_code == 200
+    bad = dict(rows[0], overrides={"Price": "cheap"})
+    assert client.post("/predict/by-key", json=bad).status_code == 422
+
+    assert observed == [(2, 0), (0, 1)]
@@ -0,0 +1,77 @@
+import io
+import json
+import pickle
+
+import pandas as pd
+import pytest
+
+import app
+import forecast
+from data_transformation import transform
+from feature_store import FeatureStore
+from model_registry import DEFAULT_MODEL_PATH
+
+
+@pytest.fixture()
+def store(tmp_path, monkeypatch, synthetic_df):
+    df = synthetic_df(40)
+    df["Date"] = pd.Timestamp("2024-03-01")
+    feature_store = FeatureStore(tmp_path / "features.sqlite")
+    feature_store.materialize(df)
+    monkeypatch.setattr(app, "get_feature_store", lambda: feature_store)
+    return feature_store
+
+
+def test_grid_chunks_cover_every_series_and_day(store):
+    series = store.fetch_all().drop(columns="as_of")
+    chunks = list(
+        forecast.grid_chunks(
+            series, pd.Timestamp("2024-03-02"), days=5, chunk_rows=2 * len(series)
+        )
+    )
+
+    assert [len(chunk) for chunk in chunks] == [2 * len(series)] * 2 + [len(series)]
+    grid = pd.concat(chunks, ignore_index=True)
+    assert grid.groupby(["Store ID", "Product ID"]).size().eq(5).all()
+    assert grid["Date"].min() == pd.Timestamp("2024-03-02")
+    assert grid["Date"].max() == pd.Timestamp("2024-03-06")
+
+
+def test_forecast_matches_direct_scoring(store, ensure_model):
+    scored = pd.concat(forecast.forecast_chunks(days=3, store=store, chunk_rows=5))
+    assert list(scored.columns) == forecast.OUTPUT_COLUMNS
+    assert scored["Date"].min() == pd.Timestamp("2024-03-02")
+    assert len(scored) == 3 * len(store)
+
+    with DEFAULT_MODEL_PATH.open("rb") as f:
+        model = pickle.load(f)
+    series = store.fetch_all().drop(columns="as_of")
+    grid = transform(pd.concat(forecast.grid_chunks(series, pd.Timestamp("2024-03-02"), 3)))
+    expected = model.predict(grid[model.named_steps["preprocess"].feature_names_in_])
+    assert scored["prediction"].to_numpy() == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("fmt", ["ndjson", "csv", "parquet"])
+def test_forecast_endpoint_streams_formats(client, store, ensure_model, fmt):
+    response = client.get(
+        "/forecast",
+        params={"start": "2024-04-01", "days": 2, "format": fmt, "store_id": ["S001"]},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith(forecast.MEDIA_TYPES[fmt])
+
+    if fmt == "ndjson":
+        rows = pd.DataFrame([json.loads(line) for line in response.text.splitlines()])
+    elif fmt == "csv":
+        rows = pd.read_csv(io.StringIO(response.text))
+    else:
+        rows = pd.read_parquet(io.BytesIO(response.content))
+    n_series = (store.fetch_all()["Store ID"] == "S001").sum()
+    assert len(rows) == 2 * n_series
+    assert set(rows["Store ID"]) == {"S001"}
+    assert pd.to_datetime(rows["Date"]).min() == pd.Timestamp("2024-04-01")
+
+
+def test_forecast_endpoint_rejects_bad_requests(client, store):
+    assert client.get("/forecast", params={"format": "xlsx"}).status_code == 422
+    assert client.get("/forecast", params={"days": 0}).status_code == 422
@@ -0,0 +1,51 @@
+import pickle
+
+import numpy as np
+import pytest
+
+import model_trainer
+from forest_bundle import bundle_path_for, load_forest_bundle, save_forest_bundle
+from model_registry import ModelRegistry
+
+
+@pytest.fixture()
+def trained(synthetic_df, trained_model):
+    df = synthetic_df(200)
+    return trained_model(df), df[model_trainer.FEATURE_COLUMNS]
+
+
+def test_bundle_predictions_match_pickle(tmp_path, trained):
+    model, X = trained
+    bundle = load_forest_bundle(save_forest_bundle(model, tmp_path / "m.bundle"))
+
+    assert isinstance(bundle.arrays["left"], np.memmap)
+    np.testing.assert_allclose(bundle.predict(X), model.predict(X), rtol=1e-12, atol=0)
+
+
+def test_registry_serves_bundle_in_mmap_mode(tmp_path, trained):
+    model, X = trained
+    model_path = tmp_path / "artifacts" / "models" / "best_model.pkl"
+
+    loaded = ModelRegistry(model_path, model_format="mmap").get()
+    assert loaded.format == "mmap"
+    assert bundle_path_for(model_path, loaded.version).exists()
+    np.testing.assert_allclose(loaded.model.predict(X), model.predict(X), rtol=1e-12, atol=0)
+
+    pickled = ModelRegistry(model_path, model_format="pickle").get()
+    assert pickled.format == "pickle"
+    assert pickled.version == loaded.version
+
+
+def test_lazy_pickle_must_match_bundle_version(tmp_path, trained):
+    model, X = trained
+    model_path = tmp_path / "artifacts" / "models" / "best_model.pkl"
+    loaded = ModelRegistry(model_path, model_format="mmap").get()
+    original = model_path.read_bytes()
+
+    # Another model replaces the pickle before SHAP asks for it.
+    model_path.write_bytes(pickle.dumps({"replaced": True}))
+    with pytest.raises(RuntimeError, match="reload the model"):
+        loaded.model.named_steps
+
+    model_path.write_bytes(original)
+    assert "model" in loaded.model.named_steps
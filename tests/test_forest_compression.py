@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+import model_trainer
+from forest_bundle import (
+    MappedForestPipeline,
+    compressed_bundle_path_for,
+    flatten_forest,
+    predict_flat,
+)
+from forest_compression import (
+    CompressionConfig,
+    compress_forest,
+    float32_thresholds,
+    prune_depth,
+    quantize,
+    select_trees,
+)
+from model_registry import ModelRegistry
+
+
+@pytest.fixture()
+def trained(synthetic_df, trained_model):
+    df = synthetic_df(300)
+    return trained_model(df, n_estimators=20), df[model_trainer.FEATURE_COLUMNS], df[model_trainer.TARGET]
+
+
+def test_quantized_thresholds_keep_predictions(trained):
+    model, X, _y = trained
+    arrays = flatten_forest(model.named_steps["model"])
+    dense = MappedForestPipeline(model.named_steps["preprocess"], arrays).transform(X)
+
+    quantized = quantize(arrays, "float64")
+    assert quantized["threshold"].dtype == np.float32
+    np.testing.assert_allclose(predict_flat(quantized, dense), model.predict(X), rtol=1e-12)
+    assert np.all(float32_thresholds(arrays["threshold"]) <= arrays["threshold"])
+
+
+def test_depth_pruning_and_tree_selection(trained):
+    model, X, y = trained
+    arrays = flatten_forest(model.named_steps["model"])
+
+    pruned = prune_depth(arrays, 2)
+    assert len(pruned["roots"]) == 20
+    assert len(pruned["left"]) <= 20 * 7
+    # Depth 0 collapses every tree to its root, which predicts the training mean.
+    stumps = prune_depth(arrays, 0)
+    np.testing.assert_array_equal(stumps["left"], -1)
+
+    per_tree = np.random.default_rng(0).normal(size=(50, 8))
+    chosen = select_trees(per_tree, per_tree.mean(axis=1), tolerance=0.0, min_trees=2)
+    assert chosen == sorted(chosen) and len(chosen) == 8
+
+    compressed = compress_forest(
+        model, X, y, CompressionConfig(max_depth=6, value_dtype="float16", mae_tolerance=0.05)
+    )
+    assert compressed.n_estimators < 20
+    assert compressed.arrays["value"].dtype == np.float16
+    assert compressed.predict(X).shape == (len(X),)
+
+
+def test_training_saves_compressed_bundle(tmp_path, monkeypatch, synthetic_df, trained_model):
+    monkeypatch.setenv("COMPRESS_MODEL", "1")
+    monkeypatch.setenv("COMPRESS_MIN_TREES", "3")
+    df = synthetic_df(300)
+    trained_model(df, n_estimators=10)
+
+    model_path = tmp_path / "artifacts" / "models" / "best_model.pkl"
+    loaded = ModelRegistry(model_path, model_format="compressed").get()
+    assert loaded.format == "compressed"
+    assert compressed_bundle_path_for(model_path, loaded.version).exists()
+    report = (tmp_path / "artifacts" / "reports" / "compression.json").read_text()
+    assert '"compressed"' in report and '"p95_ms_1_row"' in report
+    X = df[model_trainer.FEATURE_COLUMNS]
+    assert loaded.model.predict(X).shape == (len(X),)
+    # SHAP and other sklearn consumers still get the full pipeline.
+    assert "model" in loaded.model.named_steps
+
+    # A retrain that does not beat the saved model is neither compressed nor reported.
+    report_path = tmp_path / "artifacts" / "reports" / "compression.json"
+    report_path.unlink()
+    trained_model(df, n_estimators=10)
+    assert not report_path.exists()
+    assert compressed_bundle_path_for(model_path, loaded.version).exists()
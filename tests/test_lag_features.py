@@ -0,0 +1,182 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import lag_features
+import model_trainer
+import predict_pipeline
+from data_transformation import transform
+from feature_schema import FEATURE_COLUMNS, LAG_FEATURE_COLUMNS
+from lag_features import (
+    SeriesDateError,
+    SeriesStateNotFoundError,
+    SeriesStateStore,
+    compute_lag_features,
+)
+from score import score_file
+from warmup import StartupState, prewarm
+
+
+def _daily_df(synthetic_df, days: int = 60) -> pd.DataFrame:
+    pairs = [("S001", "P001"), ("S001", "P002"), ("S002", "P001")]
+    df = synthetic_df(days * len(pairs))
+    df["Store ID"] = [store for store, _ in pairs] * days
+    df["Product ID"] = [product for _, product in pairs] * days
+    df["Date"] = np.repeat(pd.date_range("2024-01-01", periods=days), len(pairs))
+    # Shuffled so the engine has to sort per series itself.
+    return df.sample(frac=1, random_state=0)
+
+
+def _reference(df: pd.DataFrame) -> pd.DataFrame:
+    ordered = df.sort_values(["Store ID", "Product ID", "Date"])
+    units = ordered.groupby(["Store ID", "Product ID"])["Units Sold"]
+    out = pd.DataFrame(index=ordered.index)
+    for lag in (1, 7, 14):
+        out[f"units_sold_lag_{lag}"] = units.shift(lag)
+    for window in (7, 28):
+        past = units.transform(lambda s: s.shift(1).rolling(window, min_periods=1).mean())
+        out[f"units_sold_roll_mean_{window}"] = past
+        out[f"units_sold_roll_std_{window}"] = units.transform(
+            lambda s: s.shift(1).rolling(window, min_periods=2).std()
+        )
+    promo_day = ordered["Date"].where(ordered["Holiday/Promotion"] == 1)
+    last_promo = promo_day.groupby([ordered["Store ID"], ordered["Product ID"]]).transform(
+        lambda s: s.ffill().shift(1)
+    )
+    out["days_since_promotion"] = (ordered["Date"] - last_promo).dt.days
+    return out.fillna(-1.0).loc[df.index]
+
+
+def test_compute_lag_features_matches_groupby_reference(synthetic_df):
+    df = _daily_df(synthetic_df)
+    features = compute_lag_features(df)
+
+    assert list(features.index) == list(df.index)
+    np.testing.assert_allclose(
+        features[LAG_FEATURE_COLUMNS].to_numpy(),
+        _reference(df)[LAG_FEATURE_COLUMNS].to_numpy(),
+        rtol=1e-5,
+        atol=1e-4,
+    )
+
+
+def test_incremental_update_and_lookup_match_full_recompute(tmp_path, synthetic_df):
+    df = _daily_df(synthetic_df)
+    cut = pd.Timestamp("2024-02-20")
+    history, appended = df[df["Date"] <= cut], df[df["Date"] > cut]
+
+    state = SeriesStateStore.from_frame(history)
+    features, updated = state.update(appended)
+    full = compute_lag_features(df)
+    np.testing.assert_array_equal(
+        features[LAG_FEATURE_COLUMNS].to_numpy(),
+        full.loc[appended.index, LAG_FEATURE_COLUMNS].to_numpy(),
+    )
+
+    next_day = appended[appended["Date"] == appended["Date"].max()].copy()
+    next_day["Date"] += pd.Timedelta(days=1)
+    expected = compute_lag_features(next_day, SeriesStateStore.from_frame(df))
+    np.testing.assert_array_equal(
+        updated.lookup(next_day).to_numpy(), expected[LAG_FEATURE_COLUMNS].to_numpy()
+    )
+
+    path = updated.save(tmp_path / "state.npz")
+    reloaded = lag_features.get_state_store(path)
+    assert reloaded.version == updated.version
+    unknown = next_day.head(1).assign(**{"Store ID": "S999"})
+    assert (reloaded.lookup(unknown).to_numpy() == -1).all()
+
+
+def test_predict_fills_history_from_state_store(tmp_path, monkeypatch, synthetic_df):
+    monkeypatch.setattr(model_trainer, "mlflow", None)
+    monkeypatch.chdir(tmp_path)
+    df = compute_lag_features(_daily_df(synthetic_df))
+    model, _ = model_trainer.train_model(
+        df, n_estimators=5, extra_features=LAG_FEATURE_COLUMNS
+    )
+    state = SeriesStateStore.from_frame(df)
+
+    with pytest.raises(SeriesStateNotFoundError, match="Series state not found"):
+        predict_pipeline.predict_records(df[FEATURE_COLUMNS].head(1).to_dict(orient="records"))
+    state.save()
+
+    # The state describes 2024-03-01, the day after the last recorded one.
+    next_day = df[FEATURE_COLUMNS].head(3).assign(month=3, day=1)
+    records = next_day.to_dict(orient="records")
+    expected = model.predict(next_day.join(state.lookup(next_day)))
+    assert predict_pipeline.predict_records(records) == pytest.approx(expected.tolist())
+
+    with pytest.raises(SeriesDateError, match="only known for 2024-03-01"):
+        predict_pipeline.predict_records([dict(records[0], day=2)])
+
+
+def test_batch_rejects_only_rows_of_another_date(
+    client, tmp_path, monkeypatch, synthetic_df, sample_payload
+):
+    monkeypatch.setattr(model_trainer, "mlflow", None)
+    monkeypatch.chdir(tmp_path)
+    df = compute_lag_features(_daily_df(synthetic_df))
+    model_trainer.train_model(df, n_estimators=5, extra_features=LAG_FEATURE_COLUMNS)
+    SeriesStateStore.from_frame(df).save()
+
+    next_day = dict(sample_payload(), month=3, day=1)
+    rows = [next_day, dict(next_day, day=2), dict(next_day, Product_ID="P002")]
+    response = client.post("/predict/batch", json={"rows": rows})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [p is None for p in body["predictions"]] == [False, True, False]
+    assert [e["index"] for e in body["errors"]] == [1]
+    assert "only known for 2024-03-01" in body["errors"][0]["error"]
+
+
+def test_score_file_adds_file_lags_only_for_lag_models(tmp_path, monkeypatch, synthetic_df):
+    monkeypatch.setattr(model_trainer, "mlflow", None)
+    monkeypatch.chdir(tmp_path)
+    df = _daily_df(synthetic_df).sort_values("Date")
+    model, _ = model_trainer.train_model(
+        compute_lag_features(df), n_estimators=5, extra_features=LAG_FEATURE_COLUMNS
+    )
+    input_path = tmp_path / "history.csv"
+    df.to_csv(input_path, index=False)
+
+    # No series state is needed, and chunk boundaries do not change the lags.
+    score_file(input_path, tmp_path / "scored.csv", chunksize=25)
+    scored = pd.read_csv(tmp_path / "scored.csv")
+    expected = compute_lag_features(df)[LAG_FEATURE_COLUMNS]
+    np.testing.assert_allclose(
+        scored[LAG_FEATURE_COLUMNS].to_numpy(), expected.to_numpy(), rtol=1e-6
+    )
+
+    # File history needs the file in date order.
+    df.sample(frac=1, random_state=1).to_csv(input_path, index=False)
+    with pytest.raises(ValueError, match="newer than each series"):
+        score_file(input_path, tmp_path / "scored.csv", chunksize=25)
+
+    # A model without lag features scores rows in any order and gains no lag columns.
+    plain, _ = model_trainer.train_model(df, n_estimators=5)
+    plain_path = tmp_path / "plain.pkl"
+    plain_path.write_bytes(pickle.dumps(plain))
+    rows = score_file(input_path, tmp_path / "plain.csv", model_path=plain_path, chunksize=25)
+    assert rows == len(df)
+    scored = pd.read_csv(tmp_path / "plain.csv")
+    assert not set(LAG_FEATURE_COLUMNS) & set(scored.columns)
+    np.testing.assert_allclose(
+        scored["prediction"].to_numpy(),
+        plain.predict(transform(pd.read_csv(input_path))[FEATURE_COLUMNS]),
+        rtol=1e-6,
+    )
+
+
+def test_prewarm_lag_model(tmp_path, monkeypatch, synthetic_df):
+    monkeypatch.setattr(model_trainer, "mlflow", None)
+    monkeypatch.chdir(tmp_path)
+    df = compute_lag_features(_daily_df(synthetic_df))
+    model_trainer.train_model(df, n_estimators=5, extra_features=LAG_FEATURE_COLUMNS)
+    SeriesStateStore.from_frame(df).save()
+
+    state = StartupState()
+    prewarm(state, explain=False)
+    assert state.phase == "ready", state.error
@@ -0,0 +1,42 @@
+import json
+import logging
+import os
+
+import logger as logger_module
+from logger import RateLimitFilter, flush_logs, get_logger, request_id
+
+
+def test_rate_limit_filter_samples_info_but_not_warnings():
+    limit = RateLimitFilter(per_second=2)
+
+    def record(level, msg="scored %d rows"):
+        return logging.LogRecord("demo", level, __file__, 1, msg, (1,), None)
+
+    passed = [limit.filter(record(logging.INFO)) for _ in range(10)]
+    assert passed.count(True) == 2
+    assert limit.filter(record(logging.INFO, "other event"))
+    assert all(limit.filter(record(logging.WARNING)) for _ in range(10))
+
+
+def test_queued_backend_writes_json_with_request_id(tmp_path, monkeypatch):
+    monkeypatch.setenv("LOG_BACKEND", "queued")
+    monkeypatch.setenv("LOG_DIR", str(tmp_path))
+    monkeypatch.setattr(logger_module, "_handler", None)
+    monkeypatch.setattr(logger_module, "_listener", None)
+
+    log = get_logger("tests.queued_backend")
+    try:
+        token = request_id.set("abc123")
+        log.info("scored %d rows", 5, extra={"duration_ms": 1.5})
+        request_id.reset(token)
+        flush_logs()
+
+        lines = (tmp_path / f"app.{os.getpid()}.jsonl").read_text().splitlines()
+        record = json.loads(lines[-1])
+        assert record["message"] == "scored 5 rows"
+        assert record["request_id"] == "abc123"
+        assert record["duration_ms"] == 1.5
+        assert record["level"] == "INFO"
+    finally:
+        log.handlers.clear()
+        logger_module._stop_listener(logger_module._listener)
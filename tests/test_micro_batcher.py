@@ -0,0 +1,137 @@
+import asyncio
+import threading
+
+import pytest
+
+from micro_batcher import BatcherClosedError, MicroBatcher, QueueFullError
+
+
+def test_concurrent_requests_share_one_batch():
+    calls = []
+
+    def predict_fn(records):
+        calls.append(len(records))
+        return [record["x"] * 2 for record in records]
+
+    async def scenario():
+        batcher = MicroBatcher(predict_fn, max_wait_ms=50, max_rows=16)
+        results = await asyncio.gather(*(batcher.submit({"x": i}) for i in range(10)))
+        return results, batcher.stats()
+
+    results, stats = asyncio.run(scenario())
+    assert results == [i * 2 for i in range(10)]
+    assert calls == [10]
+    assert stats["batches"] == 1
+    assert stats["batch_size_max"] == 10
+
+
+def test_batches_are_capped_at_max_rows():
+    calls = []
+
+    def predict_fn(records):
+        calls.append(len(records))
+        return [0.0] * len(records)
+
+    async def scenario():
+        batcher = MicroBatcher(predict_fn, max_wait_ms=50, max_rows=4)
+        await asyncio.gather(*(batcher.submit({}) for _ in range(10)))
+
+    asyncio.run(scenario())
+    assert calls == [4, 4, 2]
+
+
+def test_errors_reach_only_their_own_caller():
+    calls = []
+
+    def predict_fn(records):
+        calls.append(len(records))
+        if any(record.get("bad") for record in records):
+            raise ValueError("bad row")
+        return [record["x"] * 2.0 for record in records]
+
+    async def scenario(records):
+        batcher = MicroBatcher(predict_fn, max_wait_ms=20)
+        return await asyncio.gather(
+            *(batcher.submit(record) for record in records), return_exceptions=True
+        )
+
+    results = asyncio.run(scenario([{"x": 1}, {"x": 2, "bad": True}, {"x": 3}]))
+    assert results[0] == 2.0 and results[2] == 6.0
+    assert isinstance(results[1], ValueError)
+    # The failed batch is retried one record at a time.
+    assert calls == [3, 1, 1, 1]
+
+    def no_model(records):
+        raise FileNotFoundError("no model")
+
+    async def failing():
+        batcher = MicroBatcher(no_model, max_wait_ms=5)
+        return await asyncio.gather(
+            batcher.submit({}), batcher.submit({}), return_exceptions=True
+        )
+
+    assert all(isinstance(result, FileNotFoundError) for result in asyncio.run(failing()))
+
+
+def test_full_queue_rejects():
+    release = threading.Event()
+
+    def predict_fn(records):
+        release.wait(5)
+        return [0.0] * len(records)
+
+    async def scenario():
+        batcher = MicroBatcher(predict_fn, max_wait_ms=0, max_queue=1)
+        in_flight = asyncio.ensure_future(batcher.submit({}))
+        while batcher.batches == 0:
+            await asyncio.sleep(0.001)
+        queued = asyncio.ensure_future(batcher.submit({}))
+        await asyncio.sleep(0)
+        with pytest.raises(QueueFullError):
+            await batcher.submit({})
+        release.set()
+        await asyncio.gather(in_flight, queued)
+        return batcher.stats()
+
+    assert asyncio.run(scenario())["rejected"] == 1
+
+
+def test_shutdown_fails_pending_requests():
+    started = threading.Event()
+    release = threading.Event()
+
+    def predict_fn(records):
+        started.set()
+        release.wait(5)
+        return [0.0] * len(records)
+
+    async def scenario():
+        batcher = MicroBatcher(predict_fn, max_wait_ms=0, max_rows=1)
+        pending = [asyncio.ensure_future(batcher.submit({})) for _ in range(3)]
+        while not started.is_set():
+            await asyncio.sleep(0.001)
+        await batcher.shutdown()
+        release.set()
+        results = await asyncio.gather(*pending, return_exceptions=True)
+        # A fresh worker serves requests after shutdown.
+        return results, await batcher.submit({})
+
+    results, after = asyncio.run(scenario())
+    assert all(isinstance(result, BatcherClosedError) for result in results)
+    assert after == 0.0
+
+
+def test_worker_crash_fails_queued_requests(monkeypatch):
+    async def crash(self, batch, loop):
+        raise RuntimeError("worker died")
+
+    monkeypatch.setattr(MicroBatcher, "_flush", crash)
+
+    async def scenario():
+        batcher = MicroBatcher(lambda records: [0.0] * len(records), max_wait_ms=5)
+        return await asyncio.wait_for(
+            asyncio.gather(batcher.submit({}), batcher.submit({}), return_exceptions=True), 5
+        )
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, BatcherClosedError) for result in results)
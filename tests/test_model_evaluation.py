@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.metrics import mean_absolute_error, mean_squared_error
+
+from model_evaluation import (
+    BREAKDOWNS,
+    _group_metrics,
+    _safe_mape,
+    evaluate_model,
+    pyarrow,
+    update_evaluation,
+)
+
+
+class _FixedModel:
+    def __init__(self, preds):
+        self.preds = preds
+
+    def predict(self, X):
+        return self.preds
+
+
+def _legacy_group_metrics(df, group_cols):
+    grouped = df.groupby(group_cols, dropna=False, observed=True)
+    out = grouped.apply(
+        lambda g: pd.Series(
+            {
+                "mae": mean_absolute_error(g["y_true"], g["y_pred"]),
+                "rmse": float(np.sqrt(mean_squared_error(g["y_true"], g["y_pred"]))),
+                "mape": _safe_mape(g["y_true"], g["y_pred"]),
+                "count": len(g),
+            }
+        )
+    )
+    return out.reset_index()
+
+
+def _eval_frame(rows: int = 400) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    y_true = rng.integers(0, 50, rows).astype(float)
+    return pd.DataFrame(
+        {
+            "Store ID": rng.choice(["S001", "S002", "S003"], rows),
+            "Product ID": rng.choice(["P0001", "P0002"], rows),
+            "Category": rng.choice(["Toys", "Home"], rows),
+            "Region": rng.choice(["North", "South"], rows),
+            "month": rng.integers(1, 13, rows),
+            "y_true": y_true,
+            "y_pred": y_true + rng.normal(0, 5, rows),
+        }
+    )
+
+
+def test_group_metrics_match_legacy_implementation():
+    df = _eval_frame()
+    for group_cols in BREAKDOWNS.values():
+        pd.testing.assert_frame_equal(
+            _group_metrics(df, group_cols),
+            _legacy_group_metrics(df, group_cols),
+            check_exact=False,
+            rtol=1e-12,
+        )
+
+
+def test_evaluate_model_writes_extra_breakdowns(tmp_path):
+    df = _eval_frame()
+    X_test = df.drop(columns=["y_true", "y_pred"])
+    model = _FixedModel(df["y_pred"].to_numpy())
+
+    overall = evaluate_model(
+        model,
+        X_test,
+        df["y_true"],
+        output_dir=tmp_path,
+        extra_breakdowns={"month": ["month"]},
+    )
+
+    assert overall["count"] == len(df)
+    for name in [*BREAKDOWNS, "month"]:
+        assert (tmp_path / f"metrics_by_{name}.csv").exists()
+    by_month = pd.read_csv(tmp_path / "metrics_by_month.csv")
+    assert by_month["count"].sum() == len(df)
+
+
+class _NoPredictModel:
+    def predict(self, X):
+        raise AssertionError("predictions were passed in")
+
+
+def test_precomputed_predictions_and_incremental_updates(tmp_path):
+    df = _eval_frame(600)
+    df.loc[:20, "y_true"] = 0  # APE is undefined for these rows
+    X = df.drop(columns=["y_true", "y_pred"])
+    extra = {"month": ["month"]}
+
+    full_dir, incremental_dir = tmp_path / "full", tmp_path / "incremental"
+    full = evaluate_model(
+        _NoPredictModel(), X, df["y_true"], full_dir, extra, y_pred=df["y_pred"].to_numpy()
+    )
+    first, second = slice(0, 250), slice(250, None)
+    evaluate_model(
+        None, X[first], df["y_true"][first], incremental_dir, extra,
+        y_pred=df["y_pred"].to_numpy()[first], workers=1,
+    )
+    incremental = update_evaluation(
+        X[second], df["y_true"][second], df["y_pred"].to_numpy()[second], incremental_dir
+    )
+
+    assert incremental == pytest.approx(full, rel=1e-12)
+    for name in [*BREAKDOWNS, "month"]:
+        expected = pd.read_csv(full_dir / f"metrics_by_{name}.csv")
+        pd.testing.assert_frame_equal(
+            pd.read_csv(incremental_dir / f"metrics_by_{name}.csv"), expected, rtol=1e-12
+        )
+        if pyarrow is not None:
+            pd.testing.assert_frame_equal(
+                pd.read_parquet(incremental_dir / f"metrics_by_{name}.parquet"),
+                _group_metrics(df, extra.get(name) or BREAKDOWNS[name]),
+                check_exact=False,
+                rtol=1e-12,
+            )
@@ -0,0 +1,64 @@
+import os
+import pickle
+
+import pytest
+
+from model_registry import ModelRegistry, write_digest_sidecar
+
+
+def _write(path, obj, mtime_ns=None):
+    path.write_bytes(pickle.dumps(obj))
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_registry_loads_once(tmp_path):
+    path = tmp_path / "model.pkl"
+    _write(path, {"weights": [1, 2, 3]})
+    registry = ModelRegistry(path)
+
+    first = registry.get()
+    second = registry.get()
+    assert first is second
+    assert first.model == {"weights": [1, 2, 3]}
+    assert registry.version() == first.version
+
+
+def test_registry_swaps_on_change(tmp_path):
+    path = tmp_path / "model.pkl"
+    _write(path, {"weights": [1]}, mtime_ns=1_000_000_000)
+    registry = ModelRegistry(path)
+    old = registry.get()
+
+    _write(path, {"weights": [1, 2]}, mtime_ns=2_000_000_000)
+    new = registry.get()
+    assert new.model == {"weights": [1, 2]}
+    assert new.version != old.version
+
+
+def test_registry_keeps_model_when_only_mtime_changes(tmp_path):
+    path = tmp_path / "model.pkl"
+    _write(path, {"weights": [1]}, mtime_ns=1_000_000_000)
+    registry = ModelRegistry(path)
+    old = registry.get()
+
+    os.utime(path, ns=(3_000_000_000, 3_000_000_000))
+    new = registry.get()
+    assert new.model is old.model
+    assert new.version == old.version
+
+
+def test_registry_missing_file(tmp_path):
+    registry = ModelRegistry(tmp_path / "missing.pkl")
+    with pytest.raises(FileNotFoundError):
+        registry.get()
+
+
+def test_registry_ignores_stale_digest_sidecar(tmp_path):
+    path = tmp_path / "model.pkl"
+    _write(path, {"weights": [1]}, mtime_ns=1_000_000_000)
+    write_digest_sidecar(path, "f" * 64)
+    assert ModelRegistry(path).get().version == "f" * 12
+
+    _write(path, {"weights": [2]}, mtime_ns=2_000_000_000)
+    assert ModelRegistry(path).get().version != "f" * 12
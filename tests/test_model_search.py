@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import model_trainer
+
+
+SMALL_SPACE = {
+    "random_forest": {"n_estimators": [5, 10], "min_samples_leaf": [1, 3]},
+    "extra_trees": {"n_estimators": [5]},
+    "hist_gradient_boosting": {"max_iter": [20]},
+}
+
+
+@pytest.fixture()
+def isolated(tmp_path, monkeypatch):
+    monkeypatch.setattr(model_trainer, "mlflow", None)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_search_models_halves_candidates_and_saves_winner(isolated, monkeypatch, workers, synthetic_df):
+    seen = []
+    original = model_trainer._evaluate_candidate
+
+    def spy(task):
+        seen.append(task[2])
+        return original(task)
+
+    if workers == 1:
+        monkeypatch.setattr(model_trainer, "_evaluate_candidate", spy)
+
+    model, mae = model_trainer.search_models(
+        synthetic_df(300),
+        search_space=SMALL_SPACE,
+        min_fraction=0.25,
+        factor=2,
+        workers=workers,
+    )
+
+    assert mae >= 0
+    assert hasattr(model, "predict")
+    assert (isolated / "artifacts" / "models" / "best_model.pkl").exists()
+    if workers == 1:
+        # 6 candidates on 25% of rows, 3 on 50%, 2 on 100%.
+        row_counts = sorted(set(seen))
+        assert [seen.count(n) for n in row_counts] == [6, 3, 2]
+
+
+def test_candidates_random_sampling():
+    candidates = model_trainer._candidates(SMALL_SPACE, n_iter=1, random_state=0)
+    assert [name for name, _ in candidates] == [
+        "random_forest",
+        "extra_trees",
+        "hist_gradient_boosting",
+    ]
+
+
+def _dated_history(synthetic_df, rows: int = 400) -> pd.DataFrame:
+    df = synthetic_df(rows)
+    df["Date"] = pd.Timestamp("2024-01-01") + pd.to_timedelta(
+        np.arange(len(df)) // 10, unit="D"
+    )
+    return df
+
+
+@pytest.mark.parametrize("holdout_shifted", [True, False])
+def test_incremental_update_is_judged_on_unseen_days(isolated, holdout_shifted, synthetic_df):
+    df = _dated_history(synthetic_df)
+    history = df[df["Date"] < "2024-01-31"]
+    model_trainer.train_model(history, n_estimators=10, random_state=0)
+    metrics = model_trainer.load_best_metrics()
+    assert metrics["watermark"] == "2024-01-30T00:00:00"
+    assert metrics["train_seconds"] >= 0
+    assert model_trainer.update_model_incrementally(history) is None
+
+    # Demand jumps on every new day. When the last two (held-out) days jump
+    # too, the new trees must help; when they do not, the trees must hurt.
+    fresh = df.copy()
+    last_jump = "2024-02-09" if holdout_shifted else "2024-02-07"
+    fresh.loc[fresh["Date"].between("2024-01-31", last_jump), "Units Sold"] += 1000
+    report = model_trainer.update_model_incrementally(fresh, new_estimators=30)
+
+    assert report["new_rows"] == 100 and report["holdout_rows"] == 20
+    assert report["previous_watermark"] == "2024-01-30T00:00:00"
+    after = model_trainer.load_best_metrics()
+    assert after["mae"] == metrics["mae"]
+    assert after["incremental_attempt"]["through"] == "2024-02-09T00:00:00"
+    if holdout_shifted:
+        assert report["accepted"] is True
+        assert report["mae_after"] < report["mae_before"]
+        assert report["n_estimators"] == 40
+        assert after["watermark"] == "2024-02-07T00:00:00"
+        assert after["incremental_mae"] == report["mae_after"]
+    else:
+        assert report["accepted"] is False
+        assert report["mae_after"] > report["mae_before"]
+        assert after["watermark"] == "2024-01-30T00:00:00"
+        assert "incremental_mae" not in after
+
+    # The attempt is recorded, so the same rows are not retried.
+    assert model_trainer.update_model_incrementally(fresh)["skipped"] is True
+
+
+def test_ordinal_training_uses_compact_matrix_and_same_split(isolated, synthetic_df):
+    df = synthetic_df(300)
+    _, _, X_onehot, _ = model_trainer.train_model(df, n_estimators=5, return_data=True)
+    model, mae, X_test, y_test = model_trainer.train_model(
+        df, n_estimators=5, return_data=True, encoding="ordinal"
+    )
+
+    assert list(X_test.index) == list(X_onehot.index)
+    X, y = model_trainer.lean_training_matrix(df, model.named_steps["preprocess"])
+    assert X.dtype == np.float32 and y.dtype == np.float32
+    assert X.shape == (len(df), len(model_trainer.FEATURE_COLUMNS))
+
+    # Only the fit rows shape the encoding; a category seen only outside
+    # them is encoded as unknown.
+    held_out = df.assign(Region=np.where(np.arange(len(df)) < 200, df["Region"], "West"))
+    preprocess = model.named_steps["preprocess"]
+    X, _ = model_trainer.lean_training_matrix(held_out, preprocess, fit_rows=np.arange(200))
+    region = model_trainer.CATEGORICAL_COLUMNS.index("Region")
+    assert "West" not in preprocess.named_transformers_["cat"].categories_[region]
+    assert (X[200:, region] == -1).all()
+    assert mae == pytest.approx(np.abs(model.predict(X_test) - y_test).mean(), rel=1e-5)
+    with pytest.raises(ValueError):
+        model_trainer.build_pipeline(None, encoding="binary")
+
+
+def test_search_uses_extra_features(isolated, synthetic_df):
+    df = synthetic_df(200)
+    df["units_sold_lag_1"] = df["Units Sold"].shift(1).fillna(-1)
+    model, _ = model_trainer.search_models(
+        df,
+        search_space={"random_forest": {"n_estimators": [5]}},
+        workers=1,
+        extra_features=["units_sold_lag_1"],
+    )
+    assert "units_sold_lag_1" in model.named_steps["preprocess"].feature_names_in_
+
+
+def test_search_with_native_categoricals(isolated, synthetic_df):
+    model, _ = model_trainer.search_models(
+        synthetic_df(200),
+        search_space={"hist_gradient_boosting": {"max_iter": [10]}},
+        workers=1,
+        encoding="ordinal",
+    )
+    estimator = model.named_steps["model"]
+    assert list(estimator.is_categorical_[:4]) == [True] * 4
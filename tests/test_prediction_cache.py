@@ -0,0 +1,81 @@
+import time
+
+import prediction_cache
+from prediction_cache import PredictionCache, SqliteCacheBackend, cache_key
+
+
+def test_cache_key_is_order_independent():
+    a = cache_key("predict", {"Store ID": "S001", "Price": 1.5}, "v1")
+    b = cache_key("predict", {"Price": 1.5, "Store ID": "S001"}, "v1")
+    assert a == b
+    assert a != cache_key("predict", {"Store ID": "S001", "Price": 1.5}, "v2")
+
+
+def test_lru_eviction():
+    cache = PredictionCache(max_size=2, ttl=0)
+    cache.set("a", "v1", 1.0)
+    cache.set("b", "v1", 2.0)
+    assert cache.get("a", "v1") == 1.0
+    cache.set("c", "v1", 3.0)
+
+    assert cache.get("b", "v1") is None
+    assert cache.get("a", "v1") == 1.0
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expiry():
+    cache = PredictionCache(max_size=10, ttl=0.01)
+    cache.set("a", "v1", 1.0)
+    time.sleep(0.02)
+    assert cache.get("a", "v1") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_new_model_version_invalidates_entries():
+    cache = PredictionCache(max_size=10, ttl=0)
+    cache.set("a", "v1", 1.0)
+    assert cache.get("b", "v2") is None
+    assert cache.stats()["size"] == 0
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_get_or_compute_many_only_computes_misses():
+    cache = PredictionCache(max_size=10, ttl=0)
+    cache.set("b", "v1", 20.0)
+    calls = []
+
+    def compute(positions):
+        calls.append(positions)
+        return [float(p) for p in positions]
+
+    assert cache.get_or_compute_many(["a", "b", "c"], "v1", compute) == [0.0, 20.0, 2.0]
+    assert calls == [[0, 2]]
+    assert cache.get_or_compute_many(["a", "c"], "v1", compute) == [0.0, 2.0]
+    assert len(calls) == 1
+
+
+def test_sqlite_backend_shares_hits_between_caches(tmp_path):
+    path = tmp_path / "predictions.sqlite"
+    writer = PredictionCache(max_size=10, ttl=60, backend=SqliteCacheBackend(path))
+    reader = PredictionCache(max_size=10, ttl=60, backend=SqliteCacheBackend(path))
+
+    writer.set("a", "v1", {"prediction": 1.0})
+    assert reader.get("a", "v1") == {"prediction": 1.0}
+    assert reader.stats()["hits"] == 1
+
+
+def test_sqlite_backend_prunes_expired_and_oldest_rows(tmp_path, monkeypatch):
+    backend = SqliteCacheBackend(tmp_path / "predictions.sqlite", ttl=60, max_rows=3, prune_every=5)
+    now = [1000.0]
+    monkeypatch.setattr(prediction_cache.time, "time", lambda: now[0])
+    backend.set("stale", "v1", 0.0)
+    now[0] += 120
+    for i in range(4):
+        now[0] += 1
+        backend.set(f"k{i}", "v1", float(i))
+
+    # The fifth write triggers pruning: "stale" expired and "k0" is over the cap.
+    assert backend.pruned == 2
+    assert backend.get("stale", ttl=0) is None
+    assert backend.get("k0", ttl=0) is None
+    assert backend.get("k3", ttl=0) == 3.0
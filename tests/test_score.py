@@ -0,0 +1,78 @@
+import pickle
+
+import pandas as pd
+import pytest
+
+import model_trainer
+from data_transformation import transform
+from score import ChunkWriter, score_file
+
+
+def _raw_frame(synthetic_df, rows: int) -> pd.DataFrame:
+    df = synthetic_df(rows).drop(columns=["day_of_week", "month", "day", "is_weekend"])
+    df.insert(0, "Date", pd.date_range("2023-01-01", periods=rows, freq="D").strftime("%Y-%m-%d"))
+    return df
+
+
+@pytest.fixture()
+def model_path(tmp_path, monkeypatch, synthetic_df):
+    monkeypatch.setattr(model_trainer, "mlflow", None)
+    monkeypatch.setattr(model_trainer, "save_best_model", lambda *args, **kwargs: False)
+    model, _ = model_trainer.train_model(
+        transform(_raw_frame(synthetic_df, 60)), n_estimators=5, random_state=0
+    )
+    path = tmp_path / "model.pkl"
+    path.write_bytes(pickle.dumps(model))
+    return path, model
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_score_file_csv_matches_in_memory(tmp_path, model_path, workers, synthetic_df):
+    path, model = model_path
+    raw = _raw_frame(synthetic_df, 45)
+    input_path = tmp_path / "input.csv"
+    raw.to_csv(input_path, index=False)
+    output_path = tmp_path / "out.csv"
+
+    rows = score_file(input_path, output_path, model_path=path, chunksize=10, workers=workers)
+
+    assert rows == 45
+    scored = pd.read_csv(output_path)
+    expected = model.predict(transform(raw)[model_trainer.FEATURE_COLUMNS])
+    assert scored["prediction"].to_numpy() == pytest.approx(expected)
+
+
+def test_score_file_parquet(tmp_path, model_path, synthetic_df):
+    pytest.importorskip("pyarrow")
+    path, _ = model_path
+    input_path = tmp_path / "input.parquet"
+    _raw_frame(synthetic_df, 25).to_parquet(input_path, index=False)
+    output_path = tmp_path / "out.parquet"
+
+    assert score_file(input_path, output_path, model_path=path, chunksize=7) == 25
+    assert len(pd.read_parquet(output_path)) == 25
+
+
+def test_parquet_writer_keeps_one_schema_across_chunks(tmp_path):
+    pytest.importorskip("pyarrow")
+    first = pd.DataFrame(
+        {"Store ID": [None, None], "Discount": [1, 2], "Units Sold": [3, 4], "prediction": [1.0, 2.0]}
+    )
+    # Later chunks infer other dtypes: NaN turns the int columns into floats.
+    second = pd.DataFrame(
+        {"Store ID": ["S1", "S2"], "Discount": [3, None], "Units Sold": [None, 5.5], "prediction": [3.0, 4.0]}
+    )
+    writer = ChunkWriter(tmp_path / "out.parquet")
+    writer.write(first)
+    writer.write(second)
+    writer.close()
+
+    out = pd.read_parquet(tmp_path / "out.parquet")
+    assert out["Store ID"].isna().tolist() == [True, True, False, False]
+    assert out["Discount"].isna().tolist() == [False, False, False, True]
+    assert out["Units Sold"].tolist()[3] == 5.5
+
+
+def test_score_file_missing_model(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        score_file(tmp_path / "in.csv", tmp_path / "out.csv", model_path=tmp_path / "none.pkl")
@@ -0,0 +1,94 @@
+import pickle
+
+import numpy as np
+import pytest
+
+import predict_pipeline
+from explainer import ModelExplainer
+from feature_schema import FEATURE_COLUMNS
+from segment_models import SegmentRouter, segment_dir, train_segment_models
+
+
+@pytest.fixture()
+def trained(synthetic_df, trained_model):
+    df = synthetic_df(600)
+    df = df[df["Category"] != "Home"]  # served by the global model
+    trained_model(df, n_estimators=5)
+    manifest = train_segment_models(df, by=["Category"], n_estimators=5, workers=1, min_rows=50)
+    yield df, manifest, segment_dir(["Category"]) / "manifest.json"
+    predict_pipeline.set_segment_manifest(None)
+
+
+def test_train_writes_one_model_per_segment(trained):
+    df, manifest, manifest_path = trained
+    assert set(manifest["segments"]) == {"Clothing", "Electronics"}
+    for slug, entry in manifest["segments"].items():
+        assert (manifest_path.parent / entry["model"]).exists()
+        assert (manifest_path.parent / f"{slug}.json").exists()
+        assert entry["rows"] == (df["Category"] == slug).sum()
+    entries = manifest["segments"].values()
+    assert manifest["weighted_mae"] == pytest.approx(
+        sum(e["mae"] * e["rows"] for e in entries) / sum(e["rows"] for e in entries)
+    )
+
+    # A worse retrain keeps the stored segment model, and the weighted MAE
+    # describes the stored models.
+    again = train_segment_models(df, by=["Category"], n_estimators=1, workers=1, min_rows=50)
+    assert again["segments"]["Clothing"]["mae"] <= manifest["segments"]["Clothing"]["mae"]
+    assert again["weighted_mae"] <= manifest["weighted_mae"]
+
+
+def test_router_routes_rows_and_falls_back(trained, synthetic_df):
+    df, manifest, manifest_path = trained
+    predict_pipeline.set_segment_manifest(manifest_path)
+    rows = synthetic_df(60)[FEATURE_COLUMNS]
+
+    expected = np.empty(len(rows))
+    with open("artifacts/models/best_model.pkl", "rb") as f:
+        global_model = pickle.load(f)
+    for category, group in rows.groupby("Category"):
+        path = manifest_path.parent / f"{category}.pkl"
+        model = global_model
+        if category != "Home":
+            with path.open("rb") as f:
+                model = pickle.load(f)
+        expected[rows.index.get_indexer(group.index)] = model.predict(group)
+
+    np.testing.assert_allclose(predict_pipeline.predict(rows), expected)
+    records = rows.head(3).to_dict(orient="records")
+    assert predict_pipeline.predict_records(records) == pytest.approx(expected[:3].tolist())
+
+
+def test_explain_uses_each_rows_segment_model(trained, synthetic_df):
+    _df, _manifest, manifest_path = trained
+    predict_pipeline.set_segment_manifest(manifest_path)
+    rows = synthetic_df(30)[FEATURE_COLUMNS].reset_index(drop=True)
+
+    explained = predict_pipeline.explain_batch(rows, top_n=3)
+    for category, group in rows.groupby("Category"):
+        path = manifest_path.parent / f"{category}.pkl"
+        if category == "Home":
+            path = manifest_path.parents[2] / "best_model.pkl"
+        with path.open("rb") as f:
+            expected = ModelExplainer(pickle.load(f)).explain(group, top_n=3)
+        assert [explained[i] for i in group.index] == expected
+
+    records = rows.head(4).to_dict(orient="records")
+    results = predict_pipeline.explain_records(records, top_n=3)
+    assert [r["contributions"] for r in results] == explained[:4]
+    assert [r["prediction"] for r in results] == pytest.approx(
+        predict_pipeline.predict(rows.head(4)).tolist()
+    )
+
+
+def test_router_lru_cap(trained):
+    df, manifest, manifest_path = trained
+    router = SegmentRouter(manifest_path, max_loaded=1)
+    rows = df[FEATURE_COLUMNS]
+    for category in ["Clothing", "Electronics", "Clothing"]:
+        router.route(rows[rows["Category"] == category], fallback=None)
+
+    stats = router.stats()
+    assert stats["loaded"] == 1
+    assert (stats["loads"], stats["evictions"]) == (3, 2)
+    assert stats["loaded_segments"]["Clothing"]["size_mb"] > 0
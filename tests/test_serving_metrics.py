@@ -0,0 +1,46 @@
+import serving_metrics
+from app import PredictRequest
+from predict_pipeline import predict_records
+from prediction_cache import get_cache
+from serving_metrics import Histogram
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("demo_seconds", "Demo.", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, "fit")
+
+    lines = histogram.render()
+    assert 'demo_seconds_bucket{stage="fit",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{stage="fit",le="1"} 2' in lines
+    assert 'demo_seconds_bucket{stage="fit",le="+Inf"} 3' in lines
+    assert 'demo_seconds_count{stage="fit"} 3' in lines
+
+
+def test_metrics_endpoint_reports_stages_and_routes(client, ensure_model, sample_payload):
+    get_cache().clear()
+    payload = dict(sample_payload(), Price=31.25)
+    assert client.post("/predict", json=payload).status_code == 200
+    assert client.post("/explain", json=payload).status_code == 200
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    stages = ["validate", "model_load", "cache_lookup", "dataframe", "preprocess", "predict"]
+    for name in stages + ["shap", "serialize"]:
+        assert f'inventory_stage_seconds_count{{stage="{name}"}}' in text
+    assert 'inventory_request_seconds_count{method="POST",route="/predict"}' in text
+    assert 'inventory_requests_total{method="POST",route="/predict",status="200"}' in text
+    assert "inventory_prediction_cache_lookups" in text
+
+
+def test_profile_slow_dumps_profiles(ensure_model, tmp_path, monkeypatch, sample_payload):
+    monkeypatch.setattr(serving_metrics, "PROFILE_SLOW_MS", 1e-6)
+    monkeypatch.setattr(serving_metrics, "PROFILE_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(serving_metrics, "PROFILE_DIR", tmp_path)
+    get_cache().clear()
+
+    predict_records([PredictRequest(**sample_payload()).to_feature_dict()])
+
+    assert list(tmp_path.glob("*-predict_records-*.prof"))
@@ -0,0 +1,63 @@
+import json
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+import app
+from warmup import StartupState
+
+
+def test_app_import_defers_heavy_modules():
+    src = Path(__file__).resolve().parents[1] / "src"
+    code = (
+        "import json, sys, app; "
+        "print(json.dumps([m for m in ('sklearn', 'shap', 'numba', 'mlflow') if m in sys.modules]))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=src, capture_output=True, text=True, check=True
+    )
+    assert json.loads(result.stdout.splitlines()[-1]) == []
+
+
+def test_ready_is_503_until_prewarmed(client, monkeypatch):
+    monkeypatch.setattr(app, "startup", StartupState())
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["phase"] == "cold"
+    assert client.get("/health").status_code == 200
+
+
+def test_blocking_prewarm_reports_timings(ensure_model, monkeypatch, sample_payload):
+    monkeypatch.setenv("PREWARM", "blocking")
+    monkeypatch.setattr(app, "startup", StartupState(import_seconds=0.5))
+
+    with TestClient(app.app) as warm_client:
+        response = warm_client.get("/ready")
+        assert response.status_code == 200
+        body = response.json()
+        assert body["ready"] and body["import_seconds"] == 0.5
+        for timing in ("model_load_seconds", "warm_predict_seconds", "warm_explain_seconds"):
+            assert body[timing] >= 0
+
+        assert warm_client.post("/predict", json=sample_payload()).status_code == 200
+        assert warm_client.get("/ready").json()["first_prediction_seconds"] > 0
+
+
+def test_info_is_safe_while_timings_are_recorded():
+    state = StartupState()
+    done = threading.Event()
+
+    def record():
+        for i in range(50_000):
+            state.record(f"step_{i}_seconds", 0.0)
+        done.set()
+
+    writer = threading.Thread(target=record)
+    writer.start()
+    while not done.is_set():
+        state.info()
+    writer.join()
+    assert len(state.info()) == 4 + 50_000